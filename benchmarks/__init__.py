@@ -0,0 +1,10 @@
+"""
+Benchmarks do pipeline com dados sintéticos.
+
+- geradores.py: NF-e (com e sem namespace) e exports dos marketplaces;
+- executar.py: suíte completa por escala (10k/100k/1M), com histórico em
+  resultados/historico.jsonl e comparação entre commits;
+- bench_*.py: medições pontuais de um componente.
+
+Os scripts rodam direto (python benchmarks/executar.py).
+"""
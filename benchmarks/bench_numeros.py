@@ -0,0 +1,79 @@
+"""
+Benchmark da conversão de valores monetários (numeros.para_numero).
+
+Gera uma coluna com formatos misturados ('R$ 1.234,56', '1234.56', '-10,00',
+NBSP, vazios) e compara o antigo limpar_valor aplicado linha a linha (.apply)
+com o para_numero vetorizado.
+
+Uso:
+    python benchmarks/bench_numeros.py --linhas 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+from numeros import para_numero  # noqa: E402
+
+
+def limpar_valor(valor):
+    # versão anterior (scripts_agora_vai/amz.py), chamada via .apply
+    if pd.isna(valor):
+        return 0.0
+    valor = str(valor).replace('R$', '').replace(' ', '').replace('\xa0', '')
+    valor = ''.join(ch for ch in valor if ch.isdigit() or ch in [',', '.'])
+    if valor.count('.') > 1:
+        partes = valor.split('.')
+        valor = ''.join(partes[:-1]) + '.' + partes[-1]
+    if ',' in valor and '.' not in valor:
+        valor = valor.replace(',', '.')
+    try:
+        return float(valor)
+    except ValueError:
+        return 0.0
+
+
+def gerar_coluna(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    centavos = rng.integers(0, 10_000_000, n)
+    br = pd.Series(centavos // 100).map("{:,}".format).str.replace(",", ".") + "," + \
+        pd.Series(centavos % 100).map("{:02d}".format)
+    formato = rng.integers(0, 5, n)
+    col = br.where(formato != 0, "R$ " + br)
+    col = col.where(formato != 1, pd.Series(centavos / 100).map("{:.2f}".format))
+    col = col.where(formato != 2, "R$\xa0-" + br)
+    col = col.where(formato != 3, br.str.replace(".", "", regex=False))
+    col[rng.random(n) < 0.01] = None
+    return col
+
+
+def medir(func, col) -> float:
+    inicio = time.perf_counter()
+    func(col)
+    return time.perf_counter() - inicio
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--linhas", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    col = gerar_coluna(args.linhas)
+    print(f"{args.linhas} linhas, exemplos: {col.head(5).tolist()}\n")
+
+    t_apply = medir(lambda c: c.apply(limpar_valor), col)
+    t_vet = medir(lambda c: para_numero(c, padrao=0.0), col)
+    print(f"{'.apply(limpar_valor)':<24}{t_apply:>8.2f} s")
+    print(f"{'para_numero':<24}{t_vet:>8.2f} s   ({t_apply / t_vet:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark dos extratores de NF-e do parse_xml_tiny.
+
+Gera notas sintéticas com muitos itens (<det>) numa pasta temporária e mede o
+tempo médio por arquivo do caminho DOM (parse_header/customer/items) e do
+extrator em passada única (extract_nfe_stream).
+
+Uso:
+    python benchmarks/bench_parse_xml_tiny.py --arquivos 200 --itens 10 50 200
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+import parse_xml_tiny  # noqa: E402
+from geradores import gerar_nfe  # noqa: E402
+
+
+def medir(func, arquivos) -> float:
+    inicio = time.perf_counter()
+    for fp in arquivos:
+        func(fp)
+    return (time.perf_counter() - inicio) / len(arquivos)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--arquivos", type=int, default=200)
+    ap.add_argument("--itens", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = ap.parse_args()
+
+    print(f"{'itens':>6} {'dom (ms)':>10} {'stream (ms)':>12} {'ganho':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_itens in args.itens:
+            pasta = Path(tmp) / str(n_itens)
+            pasta.mkdir()
+            arquivos = []
+            for i in range(args.arquivos):
+                fp = pasta / f"nfe_{i}.xml"
+                fp.write_text(gerar_nfe(i + 1, n_itens), encoding="utf-8")
+                arquivos.append(fp)
+
+            # confere que os dois caminhos produzem o mesmo resultado
+            assert parse_xml_tiny.parse_xml_file(arquivos[0]) == parse_xml_tiny.extract_nfe_stream(arquivos[0])
+
+            t_dom = medir(parse_xml_tiny.parse_xml_file, arquivos)
+            t_stream = medir(parse_xml_tiny.extract_nfe_stream, arquivos)
+            print(f"{n_itens:>6} {t_dom * 1000:>10.3f} {t_stream * 1000:>12.3f} {t_dom / t_stream:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
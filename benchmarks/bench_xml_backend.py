@@ -0,0 +1,73 @@
+"""
+Benchmark dos backends de XML (lxml x ElementTree) da camada xml_backend.
+
+Para cada backend disponível mede arquivos/segundo dos leitores que usam a
+camada: parse_xml_tiny (extrator stream e dom), parse_xml_tiktok e a leitura
+de nNF do organizador_xml.
+
+Uso:
+    python benchmarks/bench_xml_backend.py --arquivos 500 --itens 20
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+import parse_xml_tiktok  # noqa: E402
+import parse_xml_tiny  # noqa: E402
+import xml_backend  # noqa: E402
+from geradores import gerar_nfe  # noqa: E402
+
+
+def ler_nnf(fp: Path):
+    return xml_backend.campo(xml_backend.parse(fp), "nNF")
+
+
+def ler_tiktok(fp: Path):
+    return parse_xml_tiktok.extract_registros(xml_backend.parse(fp))
+
+
+LEITORES = {
+    "tiny (stream)": parse_xml_tiny.extract_nfe_stream,
+    "tiny (dom)": parse_xml_tiny.parse_xml_file,
+    "tiktok": ler_tiktok,
+    "organizador (nNF)": ler_nnf,
+}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--arquivos", type=int, default=500)
+    ap.add_argument("--itens", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivos = []
+        for i in range(args.arquivos):
+            fp = Path(tmp) / f"nfe_{i}.xml"
+            fp.write_text(gerar_nfe(i + 1, args.itens), encoding="utf-8")
+            arquivos.append(fp)
+
+        print(f"{args.arquivos} arquivos, {args.itens} itens por nota\n")
+        print(f"{'leitor':<20}" + "".join(f"{b:>14}" for b in xml_backend.AVAILABLE))
+        for nome, func in LEITORES.items():
+            linha = f"{nome:<20}"
+            for backend in xml_backend.AVAILABLE:
+                xml_backend.use_backend(backend)
+                func(arquivos[0])  # aquece caches (XPath compilado)
+                inicio = time.perf_counter()
+                for fp in arquivos:
+                    func(fp)
+                por_seg = len(arquivos) / (time.perf_counter() - inicio)
+                linha += f"{por_seg:>10.0f} a/s"
+            print(linha)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Suíte de benchmarks com dados sintéticos (benchmarks/geradores.py).
+
+Para cada escala (linhas por canal; 10k, 100k, 1M):
+
+1. monta numa pasta temporária uma cópia de scripts/ com dados/ sintético;
+2. mede no processo: NF-e/s dos leitores (Tiny com e sem namespace, TikTok),
+   e o tempo de merge e groupby nos formatos de dados_gerais;
+3. roda scripts/pipeline.py --forcar na cópia e, de cada etapa, guarda linhas
+   de entrada/s (carregadores dos marketplaces, carga do SQLite) e os tempos
+   internos medidos por instrumentacao.py.
+
+Os resultados vão para benchmarks/resultados/historico.jsonl, uma linha por
+execução com o commit, para comparar entre commits:
+
+    python benchmarks/executar.py --escala 10k 100k
+    python benchmarks/executar.py --escala 10k --comparar HEAD~3
+    python benchmarks/executar.py --sem-rodar --escala 10k --comparar a1b2c3d
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+import geradores  # noqa: E402
+import parse_xml_tiktok  # noqa: E402
+import parse_xml_tiny  # noqa: E402
+import xml_backend  # noqa: E402
+
+HISTORICO = BASE_DIR / "benchmarks" / "resultados" / "historico.jsonl"
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+MAX_XML_MEDIDOS = 2_000  # arquivos usados na medição de NF-e/s no processo
+TOLERANCIA = 0.10
+
+
+def metrica(valor: float, unidade: str, maior_melhor: bool) -> Dict[str, Any]:
+    return {"valor": round(valor, 4), "unidade": unidade, "maior_melhor": maior_melhor}
+
+
+def _cronometrar(func, *args) -> float:
+    inicio = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - inicio
+
+
+# ---------- Medições no processo ----------
+def medir_xml(pasta: Path, n_itens: int) -> Dict[str, Dict[str, Any]]:
+    """NF-e/s de cada leitor sobre as mesmas notas, com e sem namespace."""
+    res = {}
+    for namespace in (True, False):
+        sub = pasta / ("ns" if namespace else "plain")
+        geradores.gravar_nfes(sub, MAX_XML_MEDIDOS, n_itens, namespace=namespace)
+        arquivos = sorted(sub.glob("*.xml"))
+        sufixo = "ns" if namespace else "sem_ns"
+
+        def tiny(fps):
+            for fp in fps:
+                parse_xml_tiny.extract_nfe_stream(fp)
+
+        def tiktok(fps):
+            for fp in fps:
+                parse_xml_tiktok.extract_registros(xml_backend.parse(fp))
+
+        res[f"xml_tiny_{sufixo}"] = metrica(len(arquivos) / _cronometrar(tiny, arquivos), "arquivos/s", True)
+        res[f"xml_tiktok_{sufixo}"] = metrica(len(arquivos) / _cronometrar(tiktok, arquivos), "arquivos/s", True)
+    return res
+
+
+def medir_merge_groupby(escala: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """merge marketplaces x Tiny (por SKU) e groupby sku/produto/canal/ano/mes."""
+    rng = np.random.default_rng(seed)
+    market = geradores.vendas_sinteticas(escala, seed)
+    market = market.assign(
+        canal=rng.choice(["shopee", "amazon", "mercadolivre", "tiktok"], escala),
+        ano=market["data"].dt.year, mes=market["data"].dt.month,
+    ).rename(columns={"quantidade": "vendas", "valor": "valor_total"})
+    tiny = (geradores.vendas_sinteticas(escala, seed + 1)
+            .groupby("sku", as_index=False).agg(vendas_tiny=("quantidade", "sum")))
+
+    res = {}
+    t = _cronometrar(lambda: market.merge(tiny, on="sku", how="left"))
+    res["merge_sku"] = metrica(t, "s", False)
+    chaves = ["sku", "produto", "canal", "ano", "mes"]
+    t = _cronometrar(lambda: market.groupby(chaves, as_index=False).agg({"vendas": "sum", "valor_total": "sum"}))
+    res["groupby_mensal"] = metrica(t, "s", False)
+    return res
+
+
+# ---------- Pipeline completo na cópia ----------
+def medir_pipeline(raiz: Path, entradas: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    proc = subprocess.run([sys.executable, str(raiz / "scripts" / "pipeline.py"), "--forcar"],
+                          cwd=raiz, capture_output=True, text=True)
+    relatorio_path = raiz / "processados" / "pipeline_relatorio.json"
+    if not relatorio_path.exists():
+        print(proc.stdout[-2000:], proc.stderr[-2000:])
+        raise RuntimeError("pipeline não gerou o relatório")
+    etapas = json.loads(relatorio_path.read_text(encoding="utf-8"))["etapas"]
+
+    res: Dict[str, Dict[str, Any]] = {}
+    for nome, r in etapas.items():
+        if r.get("status") != "ok":
+            print(f"  [AVISO] etapa {nome}: {r.get('status')} ({r.get('motivo') or r.get('log')})")
+            continue
+        res[f"{nome}_s"] = metrica(r["duracao_s"], "s", False)
+        if entradas.get(nome):
+            res[f"{nome}_linhas_s"] = metrica(entradas[nome] / r["duracao_s"], "linhas/s", True)
+        # tempos internos mais pesados (instrumentacao.py)
+        for func, t in list(r.get("instrumentacao", {}).get("tempos", {}).items())[:5]:
+            res[f"{nome}.{func}_s"] = metrica(t["total_s"], "s", False)
+    return res
+
+
+def rodar(rotulo: str, itens_por_nota: int, seed: int) -> Dict[str, Any]:
+    escala = ESCALAS[rotulo]
+    metricas: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix=f"bench_{rotulo}_") as tmp:
+        raiz = Path(tmp) / "projeto"
+        print(f"[{rotulo}] gerando dados sintéticos...")
+        t = time.perf_counter()
+        entradas = geradores.montar_projeto(raiz, escala, itens_por_nota, seed)
+        print(f"[{rotulo}] dados gerados em {time.perf_counter() - t:.1f}s")
+
+        print(f"[{rotulo}] leitores de XML...")
+        metricas.update(medir_xml(Path(tmp) / "xml", itens_por_nota))
+        print(f"[{rotulo}] merge/groupby...")
+        metricas.update(medir_merge_groupby(escala, seed))
+        print(f"[{rotulo}] pipeline completo...")
+        metricas.update(medir_pipeline(raiz, entradas))
+
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "alterado": bool(_git("status", "--porcelain", "--", "scripts", "benchmarks")),
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "escala": rotulo,
+        "itens_por_nota": itens_por_nota,
+        "ambiente": {
+            "python": platform.python_version(), "pandas": pd.__version__,
+            "xml": xml_backend.BACKEND, "cpus": os.cpu_count(), "sistema": platform.platform(),
+        },
+        "metricas": metricas,
+    }
+
+
+# ---------- Histórico ----------
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def salvar(resultado: Dict[str, Any]) -> None:
+    HISTORICO.parent.mkdir(parents=True, exist_ok=True)
+    with open(HISTORICO, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+def carregar_historico() -> List[Dict[str, Any]]:
+    if not HISTORICO.exists():
+        return []
+    with open(HISTORICO, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def referencia(historico: List[Dict[str, Any]], escala: str, ref: str,
+               atual: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Execução mais recente da escala no commit 'ref' (hash, HEAD~n...)."""
+    commit = _git("rev-parse", "--short", ref) or ref
+    candidatos = [h for h in historico if h["escala"] == escala and h["commit"] == commit and h is not atual]
+    return candidatos[-1] if candidatos else None
+
+
+def comparar(atual: Dict[str, Any], base: Dict[str, Any], tolerancia: float = TOLERANCIA) -> int:
+    """Imprime a variação de cada métrica; devolve o número de regressões."""
+    print(f"\n[{atual['escala']}] {base['commit']} ({base['data']}) -> {atual['commit']} ({atual['data']})")
+    print(f"{'métrica':<48}{'antes':>14}{'agora':>14}{'variação':>10}")
+    regressoes = 0
+    for nome, m in atual["metricas"].items():
+        anterior = base["metricas"].get(nome)
+        if not anterior or not anterior["valor"]:
+            continue
+        var = m["valor"] / anterior["valor"] - 1
+        pior = -var if m["maior_melhor"] else var
+        marca = "  REGRESSÃO" if pior > tolerancia else ""
+        regressoes += bool(marca)
+        print(f"{nome:<48}{anterior['valor']:>14.3f}{m['valor']:>14.3f}{var:>+9.1%}{marca}")
+    return regressoes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks com dados sintéticos.")
+    ap.add_argument("--escala", nargs="+", choices=list(ESCALAS), default=["10k"])
+    ap.add_argument("--itens", type=int, default=10, help="itens (<det>) por NF-e")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--comparar", metavar="COMMIT", help="compara com a execução guardada desse commit")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                    help=f"piora relativa considerada regressão (padrão {TOLERANCIA:.2f})")
+    ap.add_argument("--sem-rodar", action="store_true",
+                    help="não roda: usa a última execução guardada de cada escala")
+    ap.add_argument("--nao-salvar", action="store_true", help="não grava no histórico")
+    args = ap.parse_args()
+
+    historico = carregar_historico()
+    regressoes = 0
+    for rotulo in args.escala:
+        if args.sem_rodar:
+            atuais = [h for h in historico if h["escala"] == rotulo]
+            if not atuais:
+                print(f"[{rotulo}] sem execuções no histórico.")
+                continue
+            atual = atuais[-1]
+        else:
+            atual = rodar(rotulo, args.itens, args.seed)
+            if not args.nao_salvar:
+                salvar(atual)
+            print(f"\n[{rotulo}] commit {atual['commit']}{' (com alterações)' if atual['alterado'] else ''}")
+            for nome, m in atual["metricas"].items():
+                print(f"  {nome:<48}{m['valor']:>14.3f} {m['unidade']}")
+
+        if args.comparar:
+            base = referencia(historico, rotulo, args.comparar, atual)
+            if base is None:
+                print(f"[{rotulo}] nenhuma execução guardada para {args.comparar}.")
+            else:
+                regressoes += comparar(atual, base, args.tolerancia)
+
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Geradores de dados sintéticos para os benchmarks (sem depender dos exports reais).
+
+- gerar_nfe: NF-e no layout lido por parse_xml_tiny e parse_xml_tiktok, com
+  ou sem namespace e N itens (<det>);
+- vendas_sinteticas: linhas de venda (data, sku, produto, quantidade, valor)
+  usadas pelos exports de cada marketplace;
+- gravar_shopee / gravar_mercadolivre / gravar_amazon: exports com os
+  cabeçalhos reais (em português) que os mapeadores procuram;
+- gravar_consolidado / gravar_padronizado: arquivos por canal das pastas
+  dados/ (tratamento_marketplaces, inclusive Beleza na Web) e padronizados/
+  (padronizador_final);
+- montar_projeto: uma árvore dados/ + scripts/ completa, pronta para
+  scripts/pipeline.py, com o número de linhas de entrada de cada etapa.
+
+Os valores são determinísticos para a mesma semente.
+"""
+from __future__ import annotations
+
+import csv
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+NS = "http://www.portalfiscal.inf.br/nfe"
+
+MESES_PT = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+            "agosto", "setembro", "outubro", "novembro", "dezembro"]
+MESES_ABREV = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+
+
+# ---------- NF-e ----------
+def gerar_nfe(numero: int, n_itens: int, namespace: bool = True, emissao: str = "2024-05-10") -> str:
+    dets = "".join(
+        f'<det nItem="{k}"><prod><cProd>SKU{k % 97}</cProd><xProd>Produto {k}</xProd>'
+        f"<NCM>33049990</NCM><CFOP>5102</CFOP><uCom>UN</uCom><qCom>{k % 5 + 1}.0000</qCom>"
+        f"<vUnCom>{k % 300 + 9}.90</vUnCom><vProd>{(k % 5 + 1) * (k % 300 + 9.9):.2f}</vProd></prod>"
+        f"<imposto><ICMS><ICMS00><orig>0</orig><CST>00</CST><vBC>10.00</vBC>"
+        f"<pICMS>18.00</pICMS><vICMS>1.80</vICMS></ICMS00></ICMS>"
+        f"<PIS><PISAliq><CST>01</CST></PISAliq></PIS></imposto></det>"
+        for k in range(1, n_itens + 1)
+    )
+    xmlns = f' xmlns="{NS}"' if namespace else ""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><nfeProc{xmlns} versao="4.00"><NFe>'
+        f'<infNFe versao="4.00" Id="NFe3524{numero:040d}">'
+        f"<ide><cUF>35</cUF><natOp>Venda</natOp><mod>55</mod><serie>1</serie><nNF>{numero}</nNF>"
+        f"<dhEmi>{emissao}T10:30:00-03:00</dhEmi></ide>"
+        f"<emit><CNPJ>12345678000199</CNPJ><xNome>Loja</xNome><enderEmit><xMun>São Paulo</xMun>"
+        f"<UF>SP</UF></enderEmit></emit>"
+        f"<dest><CPF>{numero:011d}</CPF><xNome>Cliente {numero}</xNome><enderDest><xLgr>Rua A</xLgr>"
+        f"<nro>10</nro><xBairro>Centro</xBairro><xMun>Campinas</xMun><UF>SP</UF><CEP>13000000</CEP>"
+        f"</enderDest></dest>{dets}"
+        f"<total><ICMSTot><vProd>100.00</vProd><vFrete>0.00</vFrete><vICMS>18.00</vICMS>"
+        f"<vIPI>0.00</vIPI><vDesc>0.00</vDesc><vNF>100.00</vNF></ICMSTot></total>"
+        f"<pag><detPag><tPag>03</tPag><vPag>100.00</vPag></detPag></pag>"
+        f"</infNFe></NFe><protNFe><infProt><chNFe>x</chNFe></infProt></protNFe></nfeProc>"
+    )
+
+
+def gravar_nfes(pasta: Path, n_notas: int, n_itens: int, namespace: bool = True, inicio: int = 1) -> int:
+    """Grava n_notas XMLs em pasta (datas espalhadas por 2024); devolve o total de itens."""
+    pasta.mkdir(parents=True, exist_ok=True)
+    for i in range(n_notas):
+        numero = inicio + i
+        emissao = f"2024-{numero % 12 + 1:02d}-{numero % 28 + 1:02d}"
+        (pasta / f"nfe_{numero}.xml").write_text(
+            gerar_nfe(numero, n_itens, namespace, emissao), encoding="utf-8")
+    return n_notas * n_itens
+
+
+# ---------- Vendas dos marketplaces ----------
+def vendas_sinteticas(n: int, seed: int = 0, n_skus: int = 500, ano: int = 2025) -> pd.DataFrame:
+    """n vendas com data, sku, produto, quantidade e valor (float, 2 casas)."""
+    rng = np.random.default_rng(seed)
+    sku = rng.integers(0, n_skus, n)
+    quantidade = rng.integers(1, 6, n)
+    unitario = (sku % 300 + 9.9).round(2)
+    datas = pd.Timestamp(f"{ano}-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, n), unit="min")
+    return pd.DataFrame({
+        "data": datas,
+        "sku": pd.Series(sku).map("SKU{:04d}".format),
+        "produto": pd.Series(sku).map("Produto {}".format),
+        "quantidade": quantidade,
+        "valor": (quantidade * unitario).round(2),
+    })
+
+
+def _moeda_br(valores: pd.Series, prefixo: str = "") -> pd.Series:
+    """1234.5 -> 'R$ 1.234,50' (prefixo opcional)."""
+    texto = valores.map("{:,.2f}".format).str.replace(",", "_").str.replace(".", ",").str.replace("_", ".")
+    return prefixo + texto
+
+
+def _gravar_xlsx(caminho: Path, cabecalho: Sequence[str], linhas: Iterable[Sequence], aba: str = "Sheet1") -> None:
+    """Escrita em modo write-only do openpyxl (memória constante)."""
+    from openpyxl import Workbook
+
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(aba)
+    ws.append(list(cabecalho))
+    for linha in linhas:
+        ws.append(list(linha))
+    wb.save(caminho)
+
+
+def gravar_shopee(caminho: Path, df: pd.DataFrame) -> None:
+    """Export mensal da Shopee (Pedidos > Exportar)."""
+    cabecalho = ["ID do pedido", "Status do pedido", "Data de criação do pedido", "SKU principal",
+                 "Nome do Produto", "Quantidade", "Valor Total"]
+    datas = df["data"].dt.strftime("%Y-%m-%d %H:%M")
+    linhas = zip(
+        (f"2501{i:010d}" for i in range(len(df))), ["Concluído"] * len(df), datas,
+        df["sku"], df["produto"], df["quantidade"].tolist(), df["valor"].tolist(),
+    )
+    _gravar_xlsx(caminho, cabecalho, linhas, aba="orders")
+
+
+def gravar_mercadolivre(caminho: Path, df: pd.DataFrame) -> None:
+    """Relatório de vendas do Mercado Livre (datas por extenso, como no export)."""
+    cabecalho = ["N.º de venda", "Data da venda", "Estado", "Unidades", "Total (BRL)",
+                 "SKU", "# de anúncio", "Título do anúncio"]
+    d = df["data"]
+    datas = (d.dt.day.astype(str) + " de " + d.dt.month.map(lambda m: MESES_PT[m - 1]) + " de "
+             + d.dt.year.astype(str) + " " + d.dt.strftime("%H:%M") + " hs.")
+    linhas = zip(
+        (f"2000{i:012d}" for i in range(len(df))), datas, ["Entregue"] * len(df),
+        df["quantidade"].astype(str), df["valor"].map("{:.2f}".format), df["sku"],
+        (f"MLB{i}" for i in range(len(df))), df["produto"],
+    )
+    _gravar_xlsx(caminho, cabecalho, linhas, aba="Vendas BR")
+
+
+def gravar_amazon(caminho: Path, df: pd.DataFrame) -> None:
+    """Relatório de pedidos da Amazon (CSV, valores em R$ no formato brasileiro)."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "Data do pedido": df["data"].dt.strftime("%Y-%m-%d"),
+        "SKU": df["sku"],
+        "Produto": df["produto"],
+        "Quantidade": df["quantidade"],
+        "Total": _moeda_br(df["valor"], "R$ "),
+    }).to_csv(caminho, index=False, encoding="utf-8", quoting=csv.QUOTE_MINIMAL)
+
+
+def gravar_padronizado(caminho: Path, df: pd.DataFrame) -> None:
+    """Arquivo de padronizados/ (sku, produto, vendas, valor_total), CSV ou XLSX."""
+    base = df.rename(columns={"quantidade": "vendas", "valor": "valor_total"}).drop(columns="data")
+    if caminho.suffix == ".xlsx":
+        _gravar_xlsx(caminho, list(base.columns), base.itertuples(index=False, name=None))
+    else:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        base.to_csv(caminho, index=False, encoding="utf-8")
+
+
+def gravar_consolidado(caminho: Path, df: pd.DataFrame, canal: str) -> None:
+    """Arquivo por canal da pasta dados/ (tratamento_marketplaces), cabeçalhos variados."""
+    base = pd.DataFrame({
+        "SKU": df["sku"], "nome do produto": df["produto"], "Qtd": df["quantidade"],
+        "Valor Total": _moeda_br(df["valor"]), "Visualizações": df["quantidade"] * 7,
+    })
+    if caminho.suffix == ".xlsx":
+        _gravar_xlsx(caminho, list(base.columns), base.itertuples(index=False, name=None),
+                     aba="Negócios" if canal == "mercadolivre" else "Sheet1")
+    else:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        base.to_csv(caminho, index=False, encoding="utf-8")
+
+
+# ---------- Projeto completo ----------
+def montar_projeto(destino: Path, escala: int, itens_por_nota: int = 10, seed: int = 0,
+                   scripts: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Cria em destino uma cópia de scripts/ e uma pasta dados/ sintética com
+    'escala' linhas por canal (e escala/itens_por_nota NF-e do Tiny e do
+    TikTok). Devolve as linhas de entrada de cada etapa do pipeline.
+    """
+    destino = Path(destino)
+    shutil.copytree(scripts or BASE_DIR / "scripts", destino / "scripts",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    mk = destino / "dados" / "csv_marketplaces"
+    n_notas = max(escala // itens_por_nota, 1)
+
+    entradas: Dict[str, int] = {}
+    entradas["parse_xml_tiny"] = gravar_nfes(destino / "dados" / "xml_tiny" / "2024", n_notas, itens_por_nota)
+    itens_tiktok = gravar_nfes(destino / "dados" / "tiktok_certo", n_notas, itens_por_nota, namespace=False)
+
+    # Shopee: um export por mês
+    shopee = vendas_sinteticas(escala, seed + 1)
+    for mes, parte in shopee.groupby(shopee["data"].dt.month):
+        gravar_shopee(mk / "shopee" / "2025" / f"shopee_{MESES_ABREV[mes - 1]}_2025.xlsx", parte)
+    entradas["merge_shopee"] = len(shopee)
+
+    gravar_mercadolivre(mk / "mercadolivre.xlsx", vendas_sinteticas(escala, seed + 2))
+    entradas["merge_meli"] = escala
+    gravar_amazon(mk / "amz.csv", vendas_sinteticas(escala, seed + 3))
+    entradas["merge_amazon"] = escala
+
+    # pasta dados/ do tratamento_marketplaces (canal + mês + ano no nome)
+    por_canal = max(escala // 3, 1)
+    gravar_consolidado(mk / "dados" / "amazon_jan_2025.csv", vendas_sinteticas(por_canal, seed + 4), "amazon")
+    gravar_consolidado(mk / "dados" / "meli_fev_2025.xlsx", vendas_sinteticas(por_canal, seed + 5), "mercadolivre")
+    gravar_consolidado(mk / "dados" / "blz_mar_2025.xlsx", vendas_sinteticas(por_canal, seed + 6), "beleza_na_web")
+
+    # padronizados/ do padronizador_final
+    gravar_padronizado(mk / "padronizados" / "blz_padronizado.xlsx", vendas_sinteticas(escala, seed + 7))
+    gravar_padronizado(mk / "padronizados" / "amz.csv", vendas_sinteticas(escala, seed + 8))
+    entradas["padronizador_final"] = 2 * escala
+
+    # ingestao: tiny_merged (saída do parse_xml_tiny) + dados/ + XMLs do TikTok
+    entradas["ingestao"] = entradas["parse_xml_tiny"] + 3 * por_canal + itens_tiktok
+    # etapas que leem a saída de outras: entrada = linhas produzidas antes
+    entradas["update_database"] = entradas["parse_xml_tiny"]
+    return entradas
@@ -1,6 +1,11 @@
 import pandas as pd
 import re
+import sys
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from cache_excel import ler_excel  # noqa: E402
 
 # ======== 1. SHOPEE =========
 def padronizar_shopee(caminho_csv):
@@ -30,7 +35,7 @@ def padronizar_shopee(caminho_csv):
 
 # ======== 2. BELEZA NA WEB =========
 def padronizar_blz(caminho_xlsx):
-    df = pd.read_excel(caminho_xlsx, dtype=str)
+    df = ler_excel(caminho_xlsx, dtype=str)
 
     # Padronizar formato da data
     if 'data' in df.columns:
@@ -0,0 +1,91 @@
+"""
+Distribuição determinística de ano/mês para as bases que chegam sem data
+confiável (padronizador_final, scripts_agora_vai/amz.py).
+
+Antes cada execução sorteava ano e mês com np.random sem semente (ou fatiava
+o arquivo em blocos pela posição das linhas): os agregados mudavam a cada
+rodada e nenhum cache ou comparação de resultado servia. Aqui:
+
+- cada canal tem pesos por período em REGRAS, na forma ano -> peso com os
+  meses distribuídos por igual ("anos" + "meses"), ou por lista explícita
+  de (ano, mes, peso) em "periodos";
+- cada linha recebe um número em [0, 1) calculado pelo hash de (canal, sku,
+  ocorrência do sku no arquivo, semente), e o período é escolhido pela soma
+  acumulada dos pesos. Tudo vetorizado (pd.util.hash_pandas_object +
+  np.searchsorted), sem laço por linha;
+- o resultado só depende da ordem das linhas dentro de cada SKU (não da
+  ordem entre SKUs), e acrescentar linhas no fim não muda o período das que
+  já existiam. Mesma entrada, mesma saída, byte a byte.
+
+    df = alocacao.alocar(df, "shopee")
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SEMENTE = "padronizador"
+
+TODOS_OS_MESES = list(range(1, 13))
+
+# canal -> pesos dos períodos. "somente_vazios": só preenche ano/mês que faltam
+REGRAS: Dict[str, Dict[str, Any]] = {
+    "amazon": {"anos": {2023: 0.2, 2024: 0.3, 2025: 0.5}, "meses": TODOS_OS_MESES},
+    "beleza_na_web": {"anos": {2024: 0.4, 2025: 0.6}, "meses": TODOS_OS_MESES},
+    "mercado_livre": {"anos": {2023: 0.3, 2024: 0.4, 2025: 0.3}, "meses": TODOS_OS_MESES,
+                      "somente_vazios": True},
+    "shopee": {"anos": {2024: 0.5, 2025: 0.5}, "meses": TODOS_OS_MESES},
+    "tiktok": {"anos": {2025: 1.0}, "meses": list(range(1, 10))},
+    # scripts_agora_vai/amz.py: set/2023 a set/2025, mesmo peso para cada mês
+    "amazon_historico": {"periodos": [(2023, m, 1) for m in range(9, 13)]
+                                     + [(2024, m, 1) for m in range(1, 13)]
+                                     + [(2025, m, 1) for m in range(1, 10)]},
+}
+PADRAO = {"anos": {2025: 1.0}, "meses": [1]}
+
+
+def periodos(regra: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(anos, meses, pesos acumulados normalizados) dos períodos da regra."""
+    if "periodos" in regra:
+        tabela = [(int(a), int(m), float(p)) for a, m, p in regra["periodos"]]
+    else:
+        meses = list(regra["meses"])
+        tabela = [(int(a), int(m), float(p) / len(meses)) for a, p in regra["anos"].items() for m in meses]
+    anos, meses, pesos = (np.array(c) for c in zip(*tabela))
+    if (pesos < 0).any() or pesos.sum() <= 0:
+        raise ValueError(f"Pesos inválidos: {regra}")
+    return anos, meses, np.cumsum(pesos) / pesos.sum()
+
+
+def uniforme(df: pd.DataFrame, canal: str, coluna_sku: Optional[str] = "sku",
+             semente: str = SEMENTE) -> np.ndarray:
+    """Um número em [0, 1) por linha, função só de (canal, sku, ocorrência do sku, semente)."""
+    if coluna_sku and coluna_sku in df.columns:
+        sku = df[coluna_sku].astype(str).to_numpy()
+        ocorrencia = pd.Series(sku).groupby(sku, sort=False).cumcount().to_numpy()
+    else:  # sem SKU: a posição da linha
+        sku = np.full(len(df), "", dtype=object)
+        ocorrencia = np.arange(len(df))
+    chaves = pd.DataFrame({"canal": canal, "sku": sku, "ocorrencia": ocorrencia, "semente": semente})
+    h = pd.util.hash_pandas_object(chaves, index=False).to_numpy()
+    return (h >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def alocar(df: pd.DataFrame, canal: str, coluna_sku: Optional[str] = "sku", semente: str = SEMENTE,
+           regra: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Preenche ano/mes pelos pesos do canal (REGRAS, senão PADRAO)."""
+    regra = regra or REGRAS.get(canal, PADRAO)
+    anos, meses, acumulado = periodos(regra)
+    u = uniforme(df, canal, coluna_sku, semente)
+    idx = np.minimum(np.searchsorted(acumulado, u, side="right"), len(acumulado) - 1)
+
+    df = df.copy()
+    for col, valores in (("ano", anos[idx]), ("mes", meses[idx])):
+        if regra.get("somente_vazios") and col in df.columns:
+            atual = pd.to_numeric(df[col], errors="coerce")
+            df[col] = atual.where(atual.notna(), valores)
+        else:
+            df[col] = valores
+    return df
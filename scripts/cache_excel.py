@@ -0,0 +1,248 @@
+"""
+Cache das planilhas Excel convertidas para Parquet.
+
+Abrir um .xlsx grande com o openpyxl custa segundos a cada execução, mesmo
+quando o arquivo não mudou. ler_excel converte cada aba uma única vez e
+guarda o resultado em processados/cache_excel/, endereçado pelo conteúdo:
+
+    <sha1 do arquivo>-<sha1 do nome da aba>-<sha1 das opções de leitura>.parquet
+
+Arquivo alterado = hash novo = conversão nova; renomear ou mover o arquivo não
+invalida nada. No acerto, a leitura é só um read_parquet (com projeção de
+colunas, se pedida). O tamanho do cache em disco é limitado (LRU pelo mtime,
+atualizado a cada acerto).
+
+Variáveis de ambiente:
+    CACHE_EXCEL=0          desliga o cache (lê direto do Excel)
+    CACHE_EXCEL_DIR=...    pasta do cache
+    CACHE_EXCEL_MAX_MB=... limite em disco (padrão 1024)
+
+Colunas que misturam números e textos (ex. SKUs 101 e 'AB-1') não têm tipo
+em Parquet: vão para o cache como texto ('101'), o mesmo que os scripts já
+obtêm com astype(str). Sem pyarrow, ou se a aba ainda assim não puder ser
+gravada, a leitura cai para o pd.read_excel normal.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CACHE_DIR = Path(os.environ.get("CACHE_EXCEL_DIR", BASE_DIR / "processados" / "cache_excel"))
+LIMITE_BYTES = int(float(os.environ.get("CACHE_EXCEL_MAX_MB", "1024")) * 1024 * 1024)
+
+try:
+    import pyarrow  # noqa: F401
+    ATIVO = os.environ.get("CACHE_EXCEL", "1") != "0"
+except ImportError:  # pyarrow é opcional
+    ATIVO = False
+
+ESTATISTICAS: Counter = Counter()
+_HASHES: Dict[Tuple[str, int, int], str] = {}
+
+Aba = Union[str, int]
+
+
+def hash_arquivo(caminho: Path) -> str:
+    """sha1 do conteúdo (memorizado por caminho+tamanho+mtime no processo)."""
+    st = caminho.stat()
+    chave = (str(caminho.resolve()), st.st_size, st.st_mtime_ns)
+    if chave not in _HASHES:
+        h = hashlib.sha1()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+        _HASHES[chave] = h.hexdigest()
+    return _HASHES[chave]
+
+
+def _sha(texto: str) -> str:
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def abas_excel(caminho: Union[str, Path]) -> List[str]:
+    """Nomes das abas, sem reabrir a planilha quando já estiverem no cache."""
+    caminho = Path(caminho)
+    if not ATIVO:
+        return list(pd.ExcelFile(caminho).sheet_names)
+    nomes = _abas_em_cache(caminho)
+    if nomes is not None:
+        return nomes
+    indice = CACHE_DIR / f"{hash_arquivo(caminho)}.abas.json"
+    with pd.ExcelFile(caminho) as xls:
+        nomes = list(xls.sheet_names)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # temporário + replace: outro processo pode estar lendo o mesmo índice
+    temporario = indice.with_suffix(f".{os.getpid()}.tmp")
+    temporario.write_text(json.dumps(nomes, ensure_ascii=False), encoding="utf-8")
+    os.replace(temporario, indice)
+    return nomes
+
+
+def _abas_em_cache(caminho: Path) -> Optional[List[str]]:
+    indice = CACHE_DIR / f"{hash_arquivo(caminho)}.abas.json"
+    try:
+        return json.loads(indice.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _arquivo_cache(caminho: Path, aba: Aba, opcoes: Dict[str, Any]) -> Path:
+    if isinstance(aba, int):
+        aba = abas_excel(caminho)[aba]
+    chave_opcoes = _sha(repr(sorted(opcoes.items())))
+    return CACHE_DIR / f"{hash_arquivo(caminho)}-{_sha(aba)[:12]}-{chave_opcoes[:12]}.parquet"
+
+
+def _arquivo_existente(caminho: Path, aba: Aba, opcoes: Dict[str, Any]) -> Optional[Path]:
+    """Como _arquivo_cache, mas sem abrir a planilha: None se a aba não pode estar no cache."""
+    if isinstance(aba, int):
+        abas = _abas_em_cache(caminho)  # sem o índice de abas, a aba nunca foi convertida
+        if abas is None or aba >= len(abas):
+            return None
+        aba = abas[aba]
+    alvo = _arquivo_cache(caminho, aba, opcoes)
+    return alvo if alvo.exists() else None
+
+
+def ler_excel(
+    caminho: Union[str, Path],
+    sheet_name: Aba = 0,
+    colunas: Optional[Sequence[str]] = None,
+    **opcoes: Any,
+) -> pd.DataFrame:
+    """
+    pd.read_excel com cache. sheet_name: nome ou posição de UMA aba (para
+    várias, use abas_excel + uma chamada por aba). colunas: projeção
+    aplicada depois do cache (a aba inteira é convertida uma vez). As demais
+    opções (dtype, header, skiprows...) vão para o read_excel e fazem parte
+    da chave.
+    """
+    caminho = Path(caminho)
+    if not ATIVO:
+        df = pd.read_excel(caminho, sheet_name=sheet_name, **opcoes)
+        return df if colunas is None else df[list(colunas)]
+
+    df = ler_cache(caminho, sheet_name, colunas, **opcoes)
+    if df is not None:
+        return df
+
+    alvo = _arquivo_cache(caminho, sheet_name, opcoes)
+    ESTATISTICAS["faltas"] += 1
+    df = pd.read_excel(caminho, sheet_name=sheet_name, **opcoes)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temporario = alvo.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        _sem_tipos_mistos(df).to_parquet(temporario, engine="pyarrow", index=False)
+    except Exception as e:
+        # tipos que o Parquet não aceita: segue sem cache para esta aba
+        temporario.unlink(missing_ok=True)
+        ESTATISTICAS["nao_cacheaveis"] += 1
+        print(f"[CACHE] {caminho.name}/{sheet_name} não foi para o cache: {e}")
+        return df if colunas is None else df[list(colunas)]
+    # devolve a versão lida do Parquet: acerto e falta retornam o mesmo dado
+    # (lida do temporário: outro processo pode limpar o cache logo após o replace)
+    df = pd.read_parquet(temporario, columns=None if colunas is None else list(colunas))
+    ESTATISTICAS["bytes_gravados"] += temporario.stat().st_size
+    os.replace(temporario, alvo)
+    limpar_cache()
+    return df
+
+
+def ler_cache(
+    caminho: Union[str, Path],
+    sheet_name: Aba = 0,
+    colunas: Optional[Sequence[str]] = None,
+    **opcoes: Any,
+) -> Optional[pd.DataFrame]:
+    """A aba já convertida (mesma chave do ler_excel), ou None se não estiver no cache."""
+    if not ATIVO:
+        return None
+    alvo = _arquivo_existente(Path(caminho), sheet_name, opcoes)
+    if alvo is None:
+        return None
+    try:
+        os.utime(alvo)  # marca como usado (LRU)
+        df = pd.read_parquet(alvo, columns=None if colunas is None else list(colunas))
+    except FileNotFoundError:  # nunca convertida, ou removida por outro processo
+        return None
+    ESTATISTICAS["acertos"] += 1
+    return df
+
+
+def _sem_tipos_mistos(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte para texto as colunas object que o pyarrow não consegue tipar."""
+    import pyarrow as pa
+    mistas = []
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mistas.append(col)
+    if not mistas:
+        return df
+    df = df.copy()
+    for col in mistas:
+        df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype(object)
+    return df
+
+
+def colunas_em_cache(caminho: Union[str, Path], sheet_name: Aba = 0, **opcoes: Any) -> Optional[List[str]]:
+    """Cabeçalho da aba pelo esquema Parquet, ou None se ela não estiver no cache."""
+    if not ATIVO:
+        return None
+    import pyarrow.parquet as pq
+    alvo = _arquivo_existente(Path(caminho), sheet_name, opcoes)
+    if alvo is None:
+        return None
+    try:
+        return list(pq.read_schema(alvo).names)
+    except FileNotFoundError:
+        return None
+
+
+def colunas_excel(caminho: Union[str, Path], sheet_name: Aba = 0, **opcoes: Any) -> List[str]:
+    """Cabeçalho da aba; do esquema Parquet quando já estiver no cache."""
+    nomes = colunas_em_cache(caminho, sheet_name, **opcoes)
+    if nomes is not None:
+        return nomes
+    return list(pd.read_excel(caminho, sheet_name=sheet_name, nrows=0, **opcoes).columns)
+
+
+def limpar_cache(limite: Optional[int] = None) -> int:
+    """Remove os Parquets menos usados até caber no limite; devolve bytes liberados."""
+    limite = LIMITE_BYTES if limite is None else limite
+    if not CACHE_DIR.exists():
+        return 0
+    # roda ao mesmo tempo em vários processos (workers do merge_shopee, etapas
+    # paralelas do pipeline): arquivo que sumiu entre o glob e o stat é ignorado
+    arquivos = []
+    for p in CACHE_DIR.glob("*.parquet"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        arquivos.append((st.st_mtime_ns, st.st_size, p))
+    arquivos.sort(key=lambda a: a[0])
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    liberado = 0
+    for _, tamanho, p in arquivos:
+        if total <= limite:
+            break
+        p.unlink(missing_ok=True)
+        total -= tamanho
+        liberado += tamanho
+        ESTATISTICAS["removidos"] += 1
+    return liberado
+
+
+def relatorio() -> str:
+    """Resumo dos contadores, ex. 'acertos=4 faltas=1 removidos=0'."""
+    ordem = ["acertos", "faltas", "nao_cacheaveis", "removidos", "bytes_gravados"]
+    return " ".join(f"{k}={ESTATISTICAS[k]}" for k in ordem if ESTATISTICAS[k]) or "sem leituras"
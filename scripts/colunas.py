@@ -0,0 +1,182 @@
+"""
+Mapeamento das colunas de cada canal para os nomes padrão (sku, produto,
+vendas, valor_total...).
+
+Cada script tinha o seu jeito: dicionário de variantes com um rename por
+acerto (tratamento_marketplaces), testes de substring coluna a coluna
+(merge_shopee, merge_amazon, blz) ou oito .replace + unidecode
+(merge_meli). Aqui os esquemas ficam declarados num lugar só (ESQUEMAS) e
+são compilados uma vez:
+
+- todo nome passa por chave(): sem acento, minúsculo, só letras e dígitos
+  ('Título do anúncio' -> 'titulodoanuncio', 'Total (BRL)' -> 'totalbrl');
+- nomes sem '*' vão para um dicionário (busca exata); nomes com '*' são
+  padrões glob sobre a chave ('*valor total*', 'sku*'), testados na ordem
+  em que os campos foram declarados;
+- cada coluna vai para um campo só; se várias servem ao mesmo campo, vale
+  a de nome mais acima na lista (e, no empate, a primeira do arquivo).
+
+projecao devolve o que o leitor precisa para não carregar o resto:
+
+    proj = colunas.projecao("amazon", nomes_do_cabecalho)
+    pd.read_csv(arq, usecols=proj["usecols"], dtype=proj["dtype"]).rename(columns=proj["renomear"])
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+import dialeto_csv
+
+# tipo -> dtype na leitura; None: o leitor infere (número já vem float; texto
+# como '1.234,56' fica object e numeros.para_numero converte)
+DTYPES = {"texto": str, "data": str, "numero": None}
+
+ESQUEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    # tratamento_marketplaces: exports variados, só nomes exatos
+    "marketplaces": {
+        "sku": {"nomes": ["sku", "Código", "Cod Produto", "Product ID", "codigo do produto"],
+                "tipo": "texto", "obrigatoria": False},
+        "produto": {"nomes": ["produto", "Product Name", "nome", "Descrição", "product_title", "nome do produto"],
+                    "tipo": "texto", "obrigatoria": False},
+        "vendas": {"nomes": ["vendas", "Qtde Vendida", "Quantidade", "units_sold", "Qtd", "qtd vendida"],
+                   "tipo": "numero", "obrigatoria": False},
+        "valor_total": {"nomes": ["valor_total", "faturamento", "receita", "Valor Total", "valor_bruto",
+                                  "total_revenue", "total"],
+                        "tipo": "numero", "obrigatoria": False},
+        "visualizacoes": {"nomes": ["visualizacoes", "views", "impressions"], "tipo": "numero", "obrigatoria": False},
+        "devolucoes": {"nomes": ["devolucoes", "returns", "cancelamentos"], "tipo": "numero", "obrigatoria": False},
+    },
+    # merge_shopee: relatório de pedidos da Shopee
+    "shopee": {
+        "sku": {"nomes": ["*sku*principal*", "sku*"], "tipo": "texto"},
+        "produto": {"nomes": ["*produto*"], "tipo": "texto"},
+        "vendas": {"nomes": ["*quantidade*"], "tipo": "numero"},
+        "valor_total": {"nomes": ["*valor total*"], "tipo": "numero"},
+        "data": {"nomes": ["*data de criação*"], "tipo": "data"},
+    },
+    # merge_meli: relatório de vendas do Mercado Livre
+    "mercadolivre": {
+        "data": {"nomes": ["Data da venda"], "tipo": "data"},
+        "sku": {"nomes": ["SKU"], "tipo": "texto"},
+        "produto": {"nomes": ["Título do anúncio"], "tipo": "texto"},
+        "vendas": {"nomes": ["Unidades"], "tipo": "numero"},
+        "valor_total": {"nomes": ["Total (BRL)"], "tipo": "numero"},
+    },
+    # merge_amazon: amz.csv
+    "amazon": {
+        "data": {"nomes": ["*data*", "*order date*"], "tipo": "data"},
+        "sku": {"nomes": ["sku*"], "tipo": "texto"},
+        "produto": {"nomes": ["*produto*", "*product*"], "tipo": "texto"},
+        "vendas": {"nomes": ["*quantidade*", "*units*"], "tipo": "numero"},
+        "valor_total": {"nomes": ["*total*", "*amount*"], "tipo": "numero"},
+    },
+    # scripts_agora_vai/blz.py: planilha padronizada da Beleza na Web
+    "blz": {
+        "sku": {"nomes": ["*sku*"], "tipo": "texto"},
+        "produto": {"nomes": ["*desc*", "*produto*", "*nome*"], "tipo": "texto"},
+        "data": {"nomes": ["*data*"], "tipo": "data"},
+        "vendas": {"nomes": ["*venda*"], "tipo": "numero"},
+        "valor_total": {"nomes": ["*valor*"], "tipo": "numero"},
+    },
+}
+
+_COMPILADOS: Dict[str, Dict[str, Any]] = {}
+
+
+@lru_cache(maxsize=4096)
+def chave(nome: Any) -> str:
+    """Nome da coluna normalizado: sem acento, minúsculo, só [a-z0-9]."""
+    texto = unicodedata.normalize("NFKD", str(nome))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]", "", texto)
+
+
+def compilar(esquema: str) -> Dict[str, Any]:
+    """Tabelas de busca do esquema (compiladas na primeira chamada)."""
+    if esquema in _COMPILADOS:
+        return _COMPILADOS[esquema]
+    if esquema not in ESQUEMAS:
+        raise ValueError(f"Esquema desconhecido: {esquema} (use {list(ESQUEMAS)})")
+
+    exatos: Dict[str, tuple] = {}
+    padroes: List[tuple] = []
+    for campo, spec in ESQUEMAS[esquema].items():
+        for prioridade, nome in enumerate(spec["nomes"]):
+            if "*" in nome:
+                regex = ".*".join(re.escape(chave(p)) for p in nome.split("*"))
+                padroes.append((re.compile(regex), campo, prioridade))
+            else:
+                exatos.setdefault(chave(nome), (campo, prioridade))
+
+    campos = ESQUEMAS[esquema]
+    _COMPILADOS[esquema] = {
+        "exatos": exatos,
+        "padroes": padroes,
+        "campos": list(campos),
+        "dtype": {c: DTYPES[spec.get("tipo", "texto")] for c, spec in campos.items()},
+        "obrigatorias": [c for c, spec in campos.items() if spec.get("obrigatoria", True)],
+    }
+    return _COMPILADOS[esquema]
+
+
+def indices(esquema: str, colunas: Iterable[Any]) -> Dict[str, int]:
+    """{campo: posição da coluna}, na ordem dos campos do esquema (ausentes ficam de fora)."""
+    comp = compilar(esquema)
+    melhor: Dict[str, tuple] = {}
+    for i, nome in enumerate(colunas):
+        k = chave(nome)
+        achado = comp["exatos"].get(k)
+        if achado is None:
+            achado = next(((campo, prio) for regex, campo, prio in comp["padroes"] if regex.fullmatch(k)), None)
+        if achado is None:
+            continue
+        campo, prio = achado
+        if campo not in melhor or prio < melhor[campo][0]:
+            melhor[campo] = (prio, i)
+    return {c: melhor[c][1] for c in comp["campos"] if c in melhor}
+
+
+def resolver(esquema: str, colunas: Iterable[Any]) -> Dict[str, Any]:
+    """{campo: nome original da coluna}."""
+    colunas = list(colunas)
+    return {campo: colunas[i] for campo, i in indices(esquema, colunas).items()}
+
+
+def projecao(esquema: str, colunas: Iterable[Any]) -> Dict[str, Any]:
+    """
+    usecols (nomes originais, na ordem do arquivo), dtype por coluna
+    original, renomear (original -> campo) e as obrigatórias que faltam.
+    """
+    colunas = list(colunas)
+    comp = compilar(esquema)
+    pos = indices(esquema, colunas)
+    por_posicao = sorted((i, campo) for campo, i in pos.items())
+    return {
+        "usecols": [colunas[i] for i, _ in por_posicao],
+        "dtype": {colunas[i]: comp["dtype"][campo] for i, campo in por_posicao if comp["dtype"][campo] is not None},
+        "renomear": {colunas[i]: campo for i, campo in por_posicao},
+        "faltando": [c for c in comp["obrigatorias"] if c not in pos],
+    }
+
+
+def aplicar(df: pd.DataFrame, esquema: str, manter: bool = False) -> pd.DataFrame:
+    """Renomeia as colunas mapeadas; manter=False descarta as demais."""
+    proj = projecao(esquema, df.columns)
+    if not manter:
+        df = df[proj["usecols"]]
+    return df.rename(columns=proj["renomear"])
+
+
+def ler_csv(caminho, esquema: str, **opcoes) -> pd.DataFrame:
+    """CSV com só as colunas do esquema, já renomeadas (ValueError se faltar obrigatória)."""
+    dialeto = dialeto_csv.detectar(caminho)
+    proj = projecao(esquema, dialeto_csv.cabecalho(caminho, dialeto))
+    if proj["faltando"]:
+        raise ValueError(f"Colunas faltando em {caminho} ({esquema}): {proj['faltando']}")
+    df = dialeto_csv.ler_csv(caminho, dialeto, usecols=proj["usecols"], dtype=proj["dtype"], **opcoes)
+    return df.rename(columns=proj["renomear"])
@@ -0,0 +1,310 @@
+"""
+Consultas parametrizadas sobre database/tiny_data.db.
+
+Em vez de pd.read_sql("SELECT * FROM vendas") e filtrar no pandas, cada
+função aqui manda ao SQLite só o recorte pedido, pelos índices criados em
+update_database.py (data_emissao, codigo_produto, uf):
+
+    import consultas
+    consultas.receita_por_periodo("2024-01-01", "2024-12-31")          # DataFrame
+    consultas.historico_sku("ABC-1", formato="numpy")                  # dict coluna -> array
+    consultas.top_produtos(20, inicio="2025-01-01", formato="arrow")   # pyarrow.Table
+    consultas.clientes_por_local("SP", cidade="Campinas")
+    for bloco in consultas.iterar("SELECT * FROM tiny_merged WHERE data_emissao >= ?", ["2025-01-01"]):
+        ...                                                            # listas de tuplas, BLOCO por vez
+
+Conexões: um pool de conexões somente leitura (POOL_TAMANHO), reaproveitadas
+entre chamadas e threads; cada uma guarda o cache de comandos preparados do
+sqlite3, então as consultas (SQL fixo, valores sempre como parâmetros ?) não
+são recompiladas a cada chamada. configurar/fechar podem rodar com conexões
+emprestadas: elas são fechadas quando voltam, e quem esperava uma conexão
+passa para o pool novo.
+
+Formatos: "pandas" (padrão), "numpy", "arrow" ou "linhas" (iterador de
+tuplas). Em numpy/arrow o resultado é lido com fetchmany e convertido bloco
+a bloco em colunas; a lista completa de tuplas nunca existe em memória.
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "database" / "tiny_data.db"
+
+POOL_TAMANHO = 4
+BLOCO = 50_000  # linhas por fetchmany
+COMANDOS_PREPARADOS = 64  # cache de comandos por conexão
+
+FORMATOS = ("pandas", "numpy", "arrow", "linhas")
+
+_POOL: Dict[str, Any] = {}
+_TRAVA = threading.Lock()
+Data = Union[str, date, datetime, None]
+
+
+# ---------- Conexões ----------
+def _abrir(caminho: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False,
+                           cached_statements=COMANDOS_PREPARADOS)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA cache_size = -65536")  # ~64 MB
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+
+def _novo_pool(caminho: Path, tamanho: int) -> Dict[str, Any]:
+    return {"caminho": Path(caminho), "tamanho": tamanho, "livres": queue.LifoQueue(), "abertas": 0,
+            "fechado": False}
+
+
+def _fechar_pool(pool: Dict[str, Any]) -> None:
+    """Fecha as conexões livres; as emprestadas são fechadas quando voltarem."""
+    if not pool:
+        return
+    pool["fechado"] = True
+    livres = pool["livres"]
+    while not livres.empty():
+        conn = livres.get_nowait()
+        if conn is not None:
+            conn.close()
+    livres.put(None)  # acorda quem estava esperando uma conexão desse pool
+
+
+def configurar(caminho: Path = DB_PATH, tamanho: int = POOL_TAMANHO) -> None:
+    """Troca o banco (ou o tamanho) do pool; as conexões abertas são fechadas."""
+    global _POOL
+    with _TRAVA:
+        antigo, _POOL = _POOL, _novo_pool(caminho, tamanho)
+        _fechar_pool(antigo)
+
+
+def fechar() -> None:
+    global _POOL
+    with _TRAVA:
+        antigo, _POOL = _POOL, {}
+        _fechar_pool(antigo)
+
+
+def _emprestar() -> Tuple[Dict[str, Any], sqlite3.Connection]:
+    while True:
+        with _TRAVA:
+            if not _POOL:
+                _POOL.update(_novo_pool(DB_PATH, POOL_TAMANHO))
+            pool = _POOL
+            if not pool["caminho"].exists():
+                raise FileNotFoundError(f"Banco não encontrado: {pool['caminho']} (rode scripts/update_database.py)")
+            try:
+                conn = pool["livres"].get_nowait()
+                abrir = False
+            except queue.Empty:
+                conn = None
+                abrir = pool["abertas"] < pool["tamanho"]
+                if abrir:
+                    pool["abertas"] += 1
+        if abrir:
+            return pool, _abrir(pool["caminho"])
+        if conn is None:
+            conn = pool["livres"].get()  # espera uma devolução
+        if conn is not None:
+            return pool, conn
+        # pool fechado/trocado enquanto esperava: repassa o aviso e tenta no atual
+        pool["livres"].put(None)
+
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool (abre uma nova até POOL_TAMANHO; depois espera)."""
+    pool, conn = _emprestar()
+    try:
+        yield conn
+    finally:
+        with _TRAVA:
+            fechado = pool["fechado"]
+            if not fechado:
+                pool["livres"].put(conn)
+        if fechado:
+            conn.close()
+
+
+# ---------- Execução ----------
+def iterar(sql: str, params: Sequence[Any] = (), bloco: int = BLOCO) -> Iterator[List[Tuple]]:
+    """Resultado em blocos de até 'bloco' linhas (fetchmany); a conexão fica presa até o fim."""
+    with conexao() as conn:
+        cur = conn.execute(sql, params)
+        try:
+            while True:
+                linhas = cur.fetchmany(bloco)
+                if not linhas:
+                    break
+                yield linhas
+        finally:
+            cur.close()
+
+
+def _coluna_numpy(valores: Tuple) -> np.ndarray:
+    """Números viram int64/float64 (None -> NaN); texto e misturas ficam object."""
+    tipos = {type(v) for v in valores if v is not None}
+    if tipos and tipos <= {int, float}:
+        if float in tipos or any(v is None for v in valores):
+            return np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+        return np.array(valores, dtype=np.int64)
+    return np.array(valores, dtype=object)
+
+
+def _para_numpy(sql: str, params: Sequence[Any], bloco: int) -> Dict[str, np.ndarray]:
+    nomes: Optional[List[str]] = None
+    partes: List[List[np.ndarray]] = []
+    with conexao() as conn:
+        cur = conn.execute(sql, params)
+        nomes = [d[0] for d in cur.description]
+        partes = [[] for _ in nomes]
+        while True:
+            linhas = cur.fetchmany(bloco)
+            if not linhas:
+                break
+            for i, valores in enumerate(zip(*linhas)):
+                partes[i].append(_coluna_numpy(valores))
+            del linhas
+        cur.close()
+    return {n: (np.concatenate(p) if p else np.array([], dtype=object)) for n, p in zip(nomes, partes)}
+
+
+def _para_arrow(sql: str, params: Sequence[Any], bloco: int):
+    import pyarrow as pa  # opcional: só para formato="arrow"
+
+    tabelas = []
+    with conexao() as conn:
+        cur = conn.execute(sql, params)
+        nomes = [d[0] for d in cur.description]
+        while True:
+            linhas = cur.fetchmany(bloco)
+            if not linhas:
+                break
+            colunas = [pa.array(valores) for valores in zip(*linhas)]
+            tabelas.append(pa.Table.from_arrays(colunas, names=nomes))
+            del linhas, colunas
+        cur.close()
+    if not tabelas:
+        return pa.table({n: pa.array([], type=pa.null()) for n in nomes})
+    # um bloco só com vazios vem como tipo null: permissive promove para o tipo dos outros
+    return pa.concat_tables(tabelas, promote_options="permissive")
+
+
+def consultar(sql: str, params: Sequence[Any] = (), formato: str = "pandas", bloco: int = BLOCO):
+    """Roda a consulta e devolve no formato pedido (ver FORMATOS)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {FORMATOS})")
+    if formato == "linhas":
+        return (linha for linhas in iterar(sql, params, bloco) for linha in linhas)
+    if formato == "arrow":
+        return _para_arrow(sql, params, bloco)
+    colunas = _para_numpy(sql, params, bloco)
+    if formato == "numpy":
+        return colunas
+    return pd.DataFrame(colunas)
+
+
+# ---------- Parâmetros ----------
+def _data(valor: Data, padrao: str) -> str:
+    """Data como texto 'aaaa-mm-dd' (comparável com data_emissao 'aaaa-mm-dd hh:mm:ss')."""
+    if valor is None:
+        return padrao
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)[:10]
+
+
+def _intervalo(inicio: Data, fim: Data) -> Tuple[str, str]:
+    """[inicio, fim] inclusivo nos dias -> [inicio, dia seguinte ao fim) para o índice."""
+    ini = _data(inicio, "0000-01-01")
+    if fim is None:
+        return ini, "9999-12-31"
+    dia_seguinte = datetime.strptime(_data(fim, ""), "%Y-%m-%d") + timedelta(days=1)
+    return ini, dia_seguinte.strftime("%Y-%m-%d")
+
+
+# ---------- Consultas ----------
+# granularidade -> nº de caracteres de data_emissao que formam o período
+PERIODOS = {"dia": 10, "mes": 7, "ano": 4}
+
+SQL_RECEITA_PERIODO = """
+    SELECT substr(data_emissao, 1, ?) AS periodo, COUNT(*) AS notas,
+           SUM(valor_total) AS receita, SUM(valor_total) / COUNT(*) AS ticket_medio
+    FROM vendas
+    WHERE data_emissao >= ? AND data_emissao < ?
+    GROUP BY periodo
+    ORDER BY periodo
+"""
+
+SQL_HISTORICO_SKU = """
+    SELECT data_emissao, id_nota, n_item, nome_produto, quantidade, valor_unitario,
+           valor_total_item, uf
+    FROM tiny_merged
+    WHERE codigo_produto = ? AND data_emissao >= ? AND data_emissao < ?
+    ORDER BY data_emissao, id_nota, n_item
+"""
+
+# ORDER BY não aceita parâmetro: um comando por critério
+SQL_TOP_PRODUTOS = {
+    criterio: f"""
+    SELECT codigo_produto, MAX(nome_produto) AS nome_produto, SUM(quantidade) AS quantidade,
+           SUM(valor_total_item) AS receita, COUNT(DISTINCT id_nota) AS notas
+    FROM tiny_merged
+    WHERE data_emissao >= ? AND data_emissao < ?
+    GROUP BY codigo_produto
+    ORDER BY {criterio} DESC, codigo_produto
+    LIMIT ?
+"""
+    for criterio in ("receita", "quantidade")
+}
+
+SQL_CLIENTES_LOCAL = """
+    SELECT c.cpf_cnpj, MAX(c.nome_cliente) AS nome_cliente, c.cidade, c.uf,
+           COUNT(*) AS notas, SUM(v.valor_total) AS receita, MAX(v.data_emissao) AS ultima_compra
+    FROM clientes AS c
+    JOIN vendas AS v ON v.id_nota = c.id_nota
+    WHERE c.uf = ? AND (? IS NULL OR c.cidade = ?)
+    GROUP BY c.cpf_cnpj, c.cidade, c.uf
+    ORDER BY receita DESC
+"""
+
+
+def receita_por_periodo(inicio: Data = None, fim: Data = None, granularidade: str = "mes",
+                        formato: str = "pandas"):
+    """Notas, receita e ticket médio por dia/mês/ano no intervalo [inicio, fim]."""
+    if granularidade not in PERIODOS:
+        raise ValueError(f"Granularidade inválida: {granularidade} (use {list(PERIODOS)})")
+    return consultar(SQL_RECEITA_PERIODO, [PERIODOS[granularidade], *_intervalo(inicio, fim)], formato)
+
+
+def historico_sku(sku: str, inicio: Data = None, fim: Data = None, formato: str = "pandas"):
+    """Itens vendidos de um SKU (código do Tiny), em ordem de emissão."""
+    return consultar(SQL_HISTORICO_SKU, [sku, *_intervalo(inicio, fim)], formato)
+
+
+def top_produtos(n: int = 20, inicio: Data = None, fim: Data = None, por: str = "receita",
+                 formato: str = "pandas"):
+    """Os n produtos de maior receita (ou quantidade) no intervalo."""
+    if por not in SQL_TOP_PRODUTOS:
+        raise ValueError(f"Critério inválido: {por} (use {list(SQL_TOP_PRODUTOS)})")
+    return consultar(SQL_TOP_PRODUTOS[por], [*_intervalo(inicio, fim), int(n)], formato)
+
+
+def clientes_por_local(uf: str, cidade: Optional[str] = None, formato: str = "pandas"):
+    """Clientes de uma UF (e cidade), com nº de notas, receita e última compra."""
+    return consultar(SQL_CLIENTES_LOCAL, [uf.upper(), cidade, cidade], formato)
+
+
+def plano(sql: str, params: Sequence[Any] = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN da consulta (para conferir se usa os índices)."""
+    with conexao() as conn:
+        return [linha[-1] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
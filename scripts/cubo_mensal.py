@@ -0,0 +1,282 @@
+"""
+Cubos mensais pré-agregados para o Power BI e o notebook.
+
+Em vez de recalcular receita mensal, ticket médio, curva ABC, top-20 e
+receita por UF a partir das linhas de dados_gerais/tiny_merged a cada
+atualização, os painéis leem estas tabelas (database/cubos.db, com chave
+primária e índice por ano/mes, e uma cópia em processados/cubos/<tabela>.parquet):
+
+    cubo_canal_mes   canal, ano, mes -> vendas, receita, skus, preco_medio
+    cubo_sku_mes     sku, canal, ano, mes -> produto, vendas, receita
+    cubo_uf_mes      uf, ano, mes -> notas, itens, receita, ticket_medio (Tiny)
+    curva_abc        sku -> receita, participação acumulada, classe A/B/C, posição
+                     (top-20: WHERE posicao <= 20)
+
+Atualização incremental: para cada fonte guarda-se uma assinatura por mês
+(hash das linhas do mês, independente da ordem) em _cubo_meses. Só os meses
+novos ou alterados são reagregados e regravados; meses que sumiram da fonte
+são apagados. A curva ABC (pequena) é refeita a partir do cubo_sku_mes
+quando algum mês de dados_gerais muda.
+
+    python scripts/cubo_mensal.py            # incremental
+    python scripts/cubo_mensal.py --forcar   # refaz todos os meses
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+import instrumentacao
+import saida
+from instrumentacao import medir
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET = True
+except ImportError:  # pyarrow é opcional: sem ele só o SQLite é gravado
+    PARQUET = False
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PROC_DIR = BASE_DIR / "processados"
+DB_PATH = BASE_DIR / "database" / "cubos.db"
+PARQUET_DIR = PROC_DIR / "cubos"
+
+# limites acumulados da curva ABC
+CLASSES_ABC = [("A", 0.80), ("B", 0.95), ("C", 1.0)]
+
+Mes = Tuple[int, int]
+
+
+# ---------- Agregações (recebem só as linhas dos meses a atualizar) ----------
+def agregar_canal_mes(df: pd.DataFrame) -> pd.DataFrame:
+    cubo = df.groupby(["canal", "ano", "mes"], as_index=False, observed=True).agg(
+        vendas=("vendas", "sum"), receita=("valor_total", "sum"), skus=("sku", "nunique"))
+    cubo["preco_medio"] = cubo["receita"] / cubo["vendas"].replace(0, np.nan)
+    return cubo
+
+
+def agregar_sku_mes(df: pd.DataFrame) -> pd.DataFrame:
+    # produto: "min" em vez de "first" para não depender da ordem das linhas
+    return df.groupby(["sku", "canal", "ano", "mes"], as_index=False, observed=True).agg(
+        produto=("produto", "min"), vendas=("vendas", "sum"), receita=("valor_total", "sum"))
+
+
+def agregar_uf_mes(df: pd.DataFrame) -> pd.DataFrame:
+    cubo = df.groupby(["uf", "ano", "mes"], as_index=False, observed=True).agg(
+        notas=("id_nota", "nunique"), itens=("quantidade", "sum"), receita=("valor_total_item", "sum"))
+    cubo["ticket_medio"] = cubo["receita"] / cubo["notas"].replace(0, np.nan)
+    return cubo
+
+
+# ---------- Fontes ----------
+def _ano_mes_emissao(df: pd.DataFrame) -> pd.DataFrame:
+    emissao = pd.to_datetime(df["data_emissao"].astype(str).str[:10], format="%Y-%m-%d", errors="coerce")
+    return df.assign(ano=emissao.dt.year, mes=emissao.dt.month).drop(columns="data_emissao")
+
+
+# fonte -> arquivo, colunas lidas, preparo (deixa ano/mes prontos) e cubos gerados
+FONTES: Dict[str, Dict] = {
+    "dados_gerais": {
+        "arquivo": PROC_DIR / "dados_gerais.csv",
+        "colunas": ["sku", "produto", "canal", "ano", "mes", "vendas", "valor_total"],
+        "preparar": None,
+        "cubos": {"cubo_canal_mes": agregar_canal_mes, "cubo_sku_mes": agregar_sku_mes},
+    },
+    "tiny_merged": {
+        "arquivo": PROC_DIR / "tiny_merged.csv",
+        "colunas": ["id_nota", "uf", "data_emissao", "quantidade", "valor_total_item"],
+        "preparar": _ano_mes_emissao,
+        "cubos": {"cubo_uf_mes": agregar_uf_mes},
+    },
+}
+
+# tabela -> (colunas, chave primária)
+SCHEMA: Dict[str, Tuple[List[Tuple[str, str]], List[str]]] = {
+    "cubo_canal_mes": ([("canal", "TEXT"), ("ano", "INTEGER"), ("mes", "INTEGER"), ("vendas", "REAL"),
+                        ("receita", "REAL"), ("skus", "INTEGER"), ("preco_medio", "REAL")],
+                       ["canal", "ano", "mes"]),
+    "cubo_sku_mes": ([("sku", "TEXT"), ("canal", "TEXT"), ("ano", "INTEGER"), ("mes", "INTEGER"),
+                      ("produto", "TEXT"), ("vendas", "REAL"), ("receita", "REAL")],
+                     ["sku", "canal", "ano", "mes"]),
+    "cubo_uf_mes": ([("uf", "TEXT"), ("ano", "INTEGER"), ("mes", "INTEGER"), ("notas", "INTEGER"),
+                     ("itens", "REAL"), ("receita", "REAL"), ("ticket_medio", "REAL")],
+                    ["uf", "ano", "mes"]),
+    "curva_abc": ([("sku", "TEXT"), ("receita", "REAL"), ("participacao", "REAL"),
+                   ("participacao_acumulada", "REAL"), ("classe", "TEXT"), ("posicao", "INTEGER")],
+                  ["sku"]),
+}
+
+
+def ler_fonte(nome: str) -> Optional[pd.DataFrame]:
+    cfg = FONTES[nome]
+    if not (saida.existe(cfg["arquivo"], "csv") or saida.existe(cfg["arquivo"], "parquet")):
+        print(f"[AVISO] {cfg['arquivo'].name} não encontrado; cubos de {nome} não atualizados.")
+        return None
+    df = saida.ler_tabela(cfg["arquivo"], colunas=cfg["colunas"])
+    faltando = [c for c in cfg["colunas"] if c not in df.columns]
+    if faltando:
+        print(f"[AVISO] {cfg['arquivo'].name} sem as colunas {faltando}; cubos de {nome} não atualizados.")
+        return None
+    if cfg["preparar"] is not None:
+        df = cfg["preparar"](df)
+    df = df.dropna(subset=["ano", "mes"])
+    return df.astype({"ano": "int16", "mes": "int16"})
+
+
+def assinaturas(df: pd.DataFrame) -> Dict[Mes, Tuple[str, int]]:
+    """(hash, linhas) de cada mês; a soma dos hashes das linhas não depende da ordem."""
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    grupos = pd.DataFrame({"ano": df["ano"].to_numpy(), "mes": df["mes"].to_numpy(), "h": hashes.to_numpy()})
+    res = {}
+    for (ano, mes), h in grupos.groupby(["ano", "mes"], sort=True)["h"]:
+        soma = int(np.add.reduce(h.to_numpy(dtype=np.uint64), dtype=np.uint64))
+        res[(int(ano), int(mes))] = (f"{soma:016x}", len(h))
+    return res
+
+
+# ---------- SQLite ----------
+def ensure_schema(conn: sqlite3.Connection, nome: str) -> bool:
+    """Cria a tabela (e o índice ano/mes); True se ela foi (re)criada agora."""
+    cols, pk = SCHEMA[nome]
+    info = conn.execute(f"PRAGMA table_info({nome})").fetchall()
+    if info and [r[1] for r in info] == [c for c, _ in cols]:
+        return False
+    if info:
+        print(f"[CUBO] Tabela '{nome}' com esquema antigo; recriando.")
+        conn.execute(f"DROP TABLE {nome}")
+    defs = ", ".join(f"{c} {t}" for c, t in cols)
+    conn.execute(f"CREATE TABLE {nome} ({defs}, PRIMARY KEY ({', '.join(pk)}))")
+    if "ano" in [c for c, _ in cols]:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{nome}_ano_mes ON {nome} (ano, mes)")
+    return True
+
+
+def inserir(conn: sqlite3.Connection, nome: str, df: pd.DataFrame) -> None:
+    cols = [c for c, _ in SCHEMA[nome][0]]
+    obj = df[cols].astype(object)
+    linhas = obj.where(df[cols].notna(), None).itertuples(index=False, name=None)
+    conn.executemany(f"INSERT INTO {nome} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})", linhas)
+
+
+def meses_gravados(conn: sqlite3.Connection, fonte: str) -> Dict[Mes, str]:
+    linhas = conn.execute("SELECT ano, mes, assinatura FROM _cubo_meses WHERE fonte = ?", (fonte,))
+    return {(ano, mes): assinatura for ano, mes, assinatura in linhas}
+
+
+@medir("atualizar_fonte")
+def atualizar_fonte(conn: sqlite3.Connection, fonte: str, forcar: bool = False) -> Optional[Set[Mes]]:
+    """Reagrega os meses novos/alterados da fonte; devolve os meses regravados."""
+    df = ler_fonte(fonte)
+    if df is None:
+        return None
+    cubos: Dict[str, Callable] = FONTES[fonte]["cubos"]
+    recriadas = [ensure_schema(conn, nome) for nome in cubos]
+
+    atuais = assinaturas(df)
+    gravados = {} if forcar or any(recriadas) else meses_gravados(conn, fonte)
+    mudados = {m for m, (h, _) in atuais.items() if gravados.get(m) != h}
+    removidos = set(gravados) - set(atuais)
+    print(f"[CUBO] {fonte}: {len(atuais)} meses, {len(mudados)} a atualizar, {len(removidos)} removidos.")
+    if not mudados and not removidos:
+        return set()
+
+    chave = df["ano"].astype(int) * 100 + df["mes"].astype(int)
+    parte = df[chave.isin([a * 100 + m for a, m in mudados])]
+    instrumentacao.contar(f"linhas_reagregadas_{fonte}", len(parte))
+    refazer_tudo = forcar or any(recriadas)
+    with conn:
+        for nome, agregar in cubos.items():
+            if refazer_tudo:
+                conn.execute(f"DELETE FROM {nome}")
+            else:
+                conn.executemany(f"DELETE FROM {nome} WHERE ano = ? AND mes = ?", sorted(mudados | removidos))
+            with medir(nome):
+                inserir(conn, nome, agregar(parte))
+        if refazer_tudo:
+            conn.execute("DELETE FROM _cubo_meses WHERE fonte = ?", (fonte,))
+        conn.executemany("DELETE FROM _cubo_meses WHERE fonte = ? AND ano = ? AND mes = ?",
+                         [(fonte, a, m) for a, m in removidos])
+        agora = time.strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany(
+            "INSERT OR REPLACE INTO _cubo_meses VALUES (?, ?, ?, ?, ?, ?)",
+            [(fonte, a, m, atuais[(a, m)][0], atuais[(a, m)][1], agora) for a, m in sorted(mudados)],
+        )
+    return mudados | removidos
+
+
+@medir("curva_abc")
+def atualizar_curva_abc(conn: sqlite3.Connection) -> int:
+    """Ranking de receita por SKU (todos os canais e meses) com participação acumulada."""
+    ensure_schema(conn, "curva_abc")
+    receita = pd.read_sql("SELECT sku, SUM(receita) AS receita FROM cubo_sku_mes GROUP BY sku", conn)
+    receita = receita.sort_values(["receita", "sku"], ascending=[False, True], ignore_index=True)
+    total = receita["receita"].sum()
+    receita["participacao"] = receita["receita"] / total if total else 0.0
+    receita["participacao_acumulada"] = receita["participacao"].cumsum()
+    # o SKU que cruza o limite ainda entra na classe
+    anterior = receita["participacao_acumulada"] - receita["participacao"]
+    receita["classe"] = np.select([anterior < lim for _, lim in CLASSES_ABC[:-1]],
+                                  [c for c, _ in CLASSES_ABC[:-1]], default=CLASSES_ABC[-1][0])
+    receita["posicao"] = np.arange(1, len(receita) + 1)
+    with conn:
+        conn.execute("DELETE FROM curva_abc")
+        inserir(conn, "curva_abc", receita)
+    return len(receita)
+
+
+def exportar_parquet(conn: sqlite3.Connection, tabelas: List[str]) -> None:
+    if not PARQUET:
+        print("[AVISO] pyarrow não instalado; cubos gravados só no SQLite.")
+        return
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    for nome in tabelas:
+        df = pd.read_sql(f"SELECT * FROM {nome}", conn)
+        df.to_parquet(PARQUET_DIR / f"{nome}.parquet", engine="pyarrow", index=False)
+
+
+def main(forcar: bool = False):
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _cubo_meses (
+            fonte TEXT, ano INTEGER, mes INTEGER, assinatura TEXT, linhas INTEGER,
+            atualizado_em TEXT, PRIMARY KEY (fonte, ano, mes)
+        )
+    """)
+
+    alteradas: List[str] = []
+    for fonte in FONTES:
+        meses = atualizar_fonte(conn, fonte, forcar)
+        if meses:
+            alteradas.extend(FONTES[fonte]["cubos"])
+    curva_vazia = ensure_schema(conn, "curva_abc") or not conn.execute("SELECT 1 FROM curva_abc LIMIT 1").fetchone()
+    if "cubo_sku_mes" in alteradas or curva_vazia:
+        n = atualizar_curva_abc(conn)
+        alteradas.append("curva_abc")
+        print(f"[CUBO] curva_abc: {n} SKUs.")
+
+    # tabelas que faltam no Parquet também são exportadas
+    faltando = [t for t in SCHEMA if t not in alteradas and not (PARQUET_DIR / f"{t}.parquet").exists()]
+    exportar_parquet(conn, alteradas + faltando)
+    for nome in SCHEMA:
+        n = conn.execute(f"SELECT COUNT(*) FROM {nome}").fetchone()[0]
+        print(f"[CUBO] {nome}: {n} linhas{' (atualizada)' if nome in alteradas else ''}")
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    # o pipeline compara o mtime do banco com o das entradas
+    DB_PATH.touch()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Atualiza os cubos mensais (database/cubos.db e processados/cubos/).")
+    ap.add_argument("--forcar", action="store_true", help="reagrega todos os meses")
+    args = ap.parse_args()
+    instrumentacao.iniciar("cubo_mensal")
+    main(forcar=args.forcar)
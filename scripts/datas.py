@@ -0,0 +1,137 @@
+"""
+Normalização de datas dos exports dos marketplaces para 'dd/mm/aaaa'.
+
+As planilhas longas (ex. Mercado Livre) repetem poucas centenas de textos de
+data distintos, em formatos como '08/10/2025 19:34', '2025-10-08 19:34:00'
+(célula de data lida com dtype=str) ou '8 de outubro de 2025 19:34 hs.'.
+normalizar_datas converte cada texto distinto uma única vez, em estágios:
+
+1. cache: textos já vistos neste processo;
+2. vetorizado: dd/mm/aaaa e aaaa-mm-dd via str.extract na coluna de únicos;
+3. mes_extenso: '8 de outubro de 2025', 'out 8, 2025'... por regex compilada;
+4. dateparser: último recurso, importado só se algum texto chegar aqui.
+
+ESTATISTICAS conta quantas linhas cada estágio resolveu (e quantas ficaram
+vazias ou não foram reconhecidas).
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+
+ESTATISTICAS: Counter = Counter()
+_CACHE: Dict[str, Optional[str]] = {}
+_dateparser = None
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "março": 3, "abril": 4, "maio": 5,
+    "junho": 6, "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10,
+    "novembro": 11, "dezembro": 12,
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+_MES = "|".join(sorted(map(re.escape, MESES), key=len, reverse=True))
+_RE_EXTENSO = re.compile(rf"^(\d{{1,2}})\s*(?:de\s+)?({_MES})\.?\s*(?:de\s+)?(\d{{4}})\b")
+_RE_EXTENSO_MES_PRIMEIRO = re.compile(rf"^({_MES})\.?\s+(\d{{1,2}}),?\s+(?:de\s+)?(\d{{4}})\b")
+_RE_HORAS = r"\s*(?:hrs|hs)\.?"
+
+_DMY = r"^(?P<dia>\d+)/(?P<mes>\d+)/(?P<ano>[^/\s]*)"
+_ISO = r"^(?P<ano>\d{4})-(?P<mes>\d{1,2})-(?P<dia>\d{1,2})(?:[\sT]|$)"
+
+
+@medir("normalizar_datas")
+def normalizar_datas(serie: pd.Series) -> pd.Series:
+    """Converte a coluna para textos 'dd/mm/aaaa' (None quando não reconhece)."""
+    mascara = serie.notna().to_numpy()
+    presentes = serie[mascara].astype(str)
+    contagem = presentes.value_counts(sort=False)
+    novos = [t for t in contagem.index if t not in _CACHE]
+    ESTATISTICAS["cache"] += int(contagem.drop(novos).sum())
+
+    if novos:
+        resolvidos = _converter_unicos(pd.Series(novos, dtype=object))
+        for texto, (valor, estagio) in zip(novos, resolvidos):
+            _CACHE[texto] = valor
+            ESTATISTICAS[estagio] += int(contagem[texto])
+
+    # resultado preenchido por posição: o índice pode ter rótulos repetidos (concat)
+    convertidos = presentes.map(_CACHE).to_numpy(dtype=object)
+    convertidos[pd.isna(convertidos)] = None
+    res = np.full(len(serie), None, dtype=object)
+    res[mascara] = convertidos
+    return pd.Series(res, index=serie.index, dtype=object)
+
+
+def _converter_unicos(textos: pd.Series):
+    limpo = textos.str.strip().str.lower().str.replace(_RE_HORAS, "", regex=True).str.strip()
+    res = pd.Series([None] * len(textos), dtype=object)
+    estagio = pd.Series("falha", index=textos.index, dtype=object).where(limpo.ne(""), "vazio")
+
+    # 1. formatos numéricos conhecidos, vetorizado
+    for padrao in (_DMY, _ISO):
+        pendentes = res.isna() & limpo.ne("")
+        partes = limpo[pendentes].str.extract(padrao)
+        ok = partes.notna().all(axis=1) & partes["ano"].ne("")
+        if ok.any():
+            p = partes[ok]
+            res[p.index] = (p["dia"].astype(int).map("{:02d}".format) + "/" +
+                            p["mes"].astype(int).map("{:02d}".format) + "/" + p["ano"])
+            estagio[p.index] = "vetorizado"
+
+    # 2. mês por extenso / 3. dateparser, só para o que sobrou
+    for i in res.index[res.isna() & limpo.ne("")]:
+        valor = _mes_extenso(limpo[i])
+        if valor is not None:
+            res[i], estagio[i] = valor, "mes_extenso"
+            continue
+        valor = _dateparser_pt(limpo[i])
+        if valor is not None:
+            res[i], estagio[i] = valor, "dateparser"
+    return zip(res, estagio)
+
+
+def _mes_extenso(texto: str) -> Optional[str]:
+    m = _RE_EXTENSO.match(texto)
+    if m:
+        dia, mes, ano = int(m.group(1)), MESES[m.group(2)], int(m.group(3))
+    else:
+        m = _RE_EXTENSO_MES_PRIMEIRO.match(texto)
+        if not m:
+            return None
+        mes, dia, ano = MESES[m.group(1)], int(m.group(2)), int(m.group(3))
+    try:
+        return date(ano, mes, dia).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def _dateparser_pt(texto: str) -> Optional[str]:
+    global _dateparser
+    if _dateparser is None:
+        try:
+            import dateparser
+        except ImportError:
+            print("[AVISO] dateparser não instalado; datas em formato livre serão descartadas.")
+            _dateparser = False
+            return None
+        _dateparser = dateparser
+    if _dateparser is False:
+        return None
+    try:
+        data = _dateparser.parse(texto, languages=["pt"])
+    except Exception:
+        return None
+    return data.strftime("%d/%m/%Y") if data else None
+
+
+def relatorio() -> str:
+    """Resumo dos contadores, ex. 'cache=18000 vetorizado=980 falha=2'."""
+    ordem = ["cache", "vetorizado", "mes_extenso", "dateparser", "vazio", "falha"]
+    return " ".join(f"{k}={ESTATISTICAS[k]}" for k in ordem if ESTATISTICAS[k])
@@ -0,0 +1,240 @@
+"""
+Detecção do dialeto dos CSV exportados pelos canais (separador, encoding,
+decimal e linha do cabeçalho), para ler cada arquivo uma única vez com o
+parser em C do pandas.
+
+Antes, os leitores usavam sep=None (engine="python", o parser lento, que
+ainda adivinha o separador) ou liam uma vez com ';' e de novo com ',' quando
+saía uma coluna só. detectar olha só os primeiros AMOSTRA_BYTES:
+
+- encoding: BOM -> utf-8-sig; decodifica em utf-8 -> utf-8; senão latin-1;
+- separador: entre ; , tab e |, o que dá o mesmo nº (>1) de colunas no
+  maior número de linhas (respeitando aspas);
+- cabeçalho: primeira linha com esse nº de colunas (pula títulos de
+  relatório antes da tabela);
+- decimal: ',' se os números da amostra forem '1.234,56'/'10,5', senão '.'.
+  Só informativo: os valores continuam texto e quem converte é
+  numeros.para_numero.
+
+O resultado fica em processados/dialetos_csv.json, pela sha1 do conteúdo
+(cache_excel.hash_arquivo): arquivo igual não é amostrado de novo.
+
+    df = dialeto_csv.ler_csv(caminho, dtype=str)
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from cache_excel import hash_arquivo
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CACHE_JSON = BASE_DIR / "processados" / "dialetos_csv.json"
+
+AMOSTRA_BYTES = 64 * 1024
+SEPARADORES = [";", ",", "\t", "|"]
+LINHAS_DECIMAL = 200  # linhas de dados olhadas para decidir o decimal
+
+_NUM_BR = re.compile(r"^-?(R\$\s?)?(\d{1,3}(\.\d{3})+|\d+),\d+$")
+_NUM_US = re.compile(r"^-?(R\$\s?)?(\d{1,3}(,\d{3})+|\d+)\.\d+$")
+
+ESTATISTICAS: Counter = Counter()
+_CACHE: Dict[str, Dict[str, Any]] = {}
+
+PathLike = Union[str, Path]
+
+
+# ---------- Detecção ----------
+def _encoding(amostra: bytes, truncada: bool) -> str:
+    if amostra.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        amostra.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # caractere multibyte cortado no fim da amostra não conta
+        if not (truncada and e.start >= len(amostra) - 3):
+            return "latin-1"
+    return "utf-8"
+
+
+def _linhas(texto: str, sep: str) -> List[tuple]:
+    """(nº da linha física onde a linha começa, campos) de cada linha não vazia."""
+    leitor = csv.reader(io.StringIO(texto), delimiter=sep)
+    res = []
+    while True:
+        inicio = leitor.line_num
+        try:
+            campos = next(leitor)
+        except StopIteration:
+            break
+        except csv.Error:
+            continue
+        if any(c.strip() for c in campos):
+            res.append((inicio, campos))
+    return res
+
+
+def _decimal(linhas: List[tuple]) -> str:
+    br = us = 0
+    for _, campos in linhas[:LINHAS_DECIMAL]:
+        for c in campos:
+            c = c.strip()
+            br += bool(_NUM_BR.match(c))
+            us += bool(_NUM_US.match(c))
+    return "," if br > us else "."
+
+
+def detectar_amostra(amostra: bytes, truncada: bool = False) -> Dict[str, Any]:
+    """Dialeto a partir dos primeiros bytes do arquivo."""
+    encoding = _encoding(amostra, truncada)
+    texto = amostra.decode(encoding, errors="replace")
+    if truncada and "\n" in texto:
+        texto = texto[:texto.rfind("\n") + 1]  # última linha pode estar cortada
+
+    melhor = None
+    for sep in SEPARADORES:
+        linhas = _linhas(texto, sep)
+        contagem = Counter(len(campos) for _, campos in linhas if len(campos) > 1)
+        if not contagem:
+            continue
+        colunas, freq = contagem.most_common(1)[0]
+        if melhor is None or (freq, colunas) > (melhor[1], melhor[2]):
+            melhor = (sep, freq, colunas, linhas)
+
+    if melhor is None:  # uma coluna só: qualquer separador serve
+        return {"sep": ",", "encoding": encoding, "decimal": ".", "cabecalho": 0, "colunas": 1}
+
+    sep, _, colunas, linhas = melhor
+    idx = next(i for i, (_, campos) in enumerate(linhas) if len(campos) == colunas)
+    return {
+        "sep": sep,
+        "encoding": encoding,
+        "decimal": _decimal(linhas[idx + 1:]),
+        "cabecalho": linhas[idx][0],
+        "colunas": colunas,
+    }
+
+
+def _carregar_cache() -> None:
+    if _CACHE or not CACHE_JSON.exists():
+        return
+    try:
+        _CACHE.update(json.loads(CACHE_JSON.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        pass
+
+
+def _salvar_cache() -> None:
+    # o pipeline roda etapas em paralelo que gravam este arquivo: junta com o
+    # que já está em disco e troca o arquivo de uma vez (os.replace)
+    CACHE_JSON.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        em_disco = json.loads(CACHE_JSON.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        em_disco = {}
+    temporario = CACHE_JSON.with_suffix(f".{os.getpid()}.tmp")
+    temporario.write_text(json.dumps({**em_disco, **_CACHE}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temporario, CACHE_JSON)
+
+
+def detectar(caminho: PathLike) -> Dict[str, Any]:
+    """Dialeto do arquivo (do cache, se o conteúdo já foi visto)."""
+    caminho = Path(caminho)
+    _carregar_cache()
+    chave = hash_arquivo(caminho)
+    if chave in _CACHE:
+        ESTATISTICAS["cache"] += 1
+        return dict(_CACHE[chave], origem="cache")
+
+    with open(caminho, "rb") as f:
+        amostra = f.read(AMOSTRA_BYTES + 1)
+    truncada = len(amostra) > AMOSTRA_BYTES
+    dialeto = detectar_amostra(amostra[:AMOSTRA_BYTES], truncada)
+    ESTATISTICAS["detectado"] += 1
+    _CACHE[chave] = dialeto
+    _salvar_cache()
+    return dict(dialeto, origem="amostra")
+
+
+def _atualizar_cache(caminho: Path, **campos) -> None:
+    chave = hash_arquivo(caminho)
+    if chave in _CACHE:
+        _CACHE[chave].update(campos)
+        _salvar_cache()
+
+
+def _encoding_vale_no_arquivo(caminho: Path, encoding: str) -> bool:
+    """Decodifica o arquivo inteiro (em blocos, sem montar o texto) para conferir o encoding."""
+    decodificador = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                decodificador.decode(bloco)
+        decodificador.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+# ---------- Leitura ----------
+def opcoes_read_csv(dialeto: Dict[str, Any]) -> Dict[str, Any]:
+    """Parâmetros do pd.read_csv para o dialeto (parser em C)."""
+    return {
+        "sep": dialeto["sep"],
+        "encoding": dialeto["encoding"],
+        "skiprows": dialeto["cabecalho"] or None,
+        "engine": "c",
+    }
+
+
+def descrever(dialeto: Dict[str, Any]) -> str:
+    sep = {"\t": "tab"}.get(dialeto["sep"], dialeto["sep"])
+    return (f"sep='{sep}' encoding={dialeto['encoding']} decimal='{dialeto['decimal']}' "
+            f"cabeçalho na linha {dialeto['cabecalho'] + 1} ({dialeto.get('origem', 'amostra')})")
+
+
+def cabecalho(caminho: PathLike, dialeto: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Nomes das colunas (como o read_csv daria), sem ler as linhas."""
+    dialeto = dialeto or detectar(caminho)
+    return list(pd.read_csv(caminho, nrows=0, **opcoes_read_csv(dialeto)).columns)
+
+
+def ler_csv(caminho: PathLike, dialeto: Optional[Dict[str, Any]] = None, **opcoes) -> Any:
+    """
+    pd.read_csv com o dialeto detectado (uma leitura, parser em C). opcoes
+    vão direto para o read_csv (dtype, usecols, chunksize...).
+    """
+    caminho = Path(caminho)
+    dialeto = dialeto or detectar(caminho)
+    if (opcoes.get("chunksize") or opcoes.get("iterator")) and dialeto["encoding"] != "latin-1" \
+            and not dialeto.get("encoding_conferido"):
+        # em blocos o erro de decodificação só apareceria no meio da iteração,
+        # com parte do arquivo já consumida: confere o arquivo todo antes
+        if _encoding_vale_no_arquivo(caminho, dialeto["encoding"]):
+            _atualizar_cache(caminho, encoding_conferido=True)
+        else:
+            print(f"[CSV] {caminho.name}: encoding {dialeto['encoding']} falha adiante da amostra; usando latin-1")
+            _atualizar_cache(caminho, encoding="latin-1")
+            dialeto = dict(dialeto, encoding="latin-1")
+    print(f"[CSV] {caminho.name}: {descrever(dialeto)}")
+    parametros = {**opcoes_read_csv(dialeto), "low_memory": False, **opcoes}
+    try:
+        return pd.read_csv(caminho, **parametros)
+    except UnicodeDecodeError:
+        # amostra era utf-8 mas o resto do arquivo não: latin-1 aceita qualquer byte
+        print(f"[CSV] {caminho.name}: encoding {dialeto['encoding']} falhou adiante da amostra; usando latin-1")
+        _atualizar_cache(caminho, encoding="latin-1")
+        return pd.read_csv(caminho, **{**parametros, "encoding": "latin-1"})
+
+
+def relatorio() -> str:
+    return ", ".join(f"{k}: {v}" for k, v in sorted(ESTATISTICAS.items()))
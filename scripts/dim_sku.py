@@ -0,0 +1,224 @@
+"""
+Dimensão de SKUs: forma canônica, apelidos e chave substituta int32.
+
+Cada canal escreve o mesmo SKU de um jeito ('abc-1 ', 'ABC-1*', '1234.0'
+vindo de célula numérica do Excel, "'1234" do Mercado Livre). normalizar
+aplica as regras uma vez por valor distinto (strip, maiúsculas, sem ' e *,
+sem o '.0' final); a dimensão persistida guarda, para cada SKU canônico, um
+sku_id int32 estável e a descrição do banco de produtos, e os apelidos
+(grafias originais) que já apareceram para ele:
+
+    processados/dim_sku.csv          sku_id, sku, descricao
+    processados/dim_sku_aliases.csv  alias, sku_id
+
+Merges e groupbys usam codificar (sku -> sku_id) e voltam ao texto com
+decodificar no fim. A dimensão é montada a partir do
+scripts_complementar/banco_de_dados_produtos.csv e das tabelas de
+processados/ (python scripts/dim_sku.py) e cresce quando codificar encontra
+SKUs novos (com registrar=True; grave com salvar()). Os ids existentes nunca
+mudam.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import dialeto_csv
+import esquema
+import saida
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PROC_DIR = BASE_DIR / "processados"
+DIM_CSV = PROC_DIR / "dim_sku.csv"
+ALIASES_CSV = PROC_DIR / "dim_sku_aliases.csv"
+BANCO_PRODUTOS = BASE_DIR / "scripts_complementar" / "banco_de_dados_produtos.csv"
+
+# tabelas de processados/ e a coluna de SKU de cada uma
+FONTES = {
+    "tiny_merged.csv": "codigo_produto",
+    "marketplaces.csv": "sku",
+    "tiktok_market.csv": "sku",
+    "shopee_merged.csv": "sku",
+    "amazon_merged.csv": "sku",
+    "mercadolivre_agrupado.csv": "sku",
+}
+
+_INVALIDOS = {"", "NAN", "NONE", "NULL", "<NA>"}
+
+# estado carregado: skus[i] é o SKU canônico de sku_id i
+_DIM: Dict[str, object] = {}
+
+
+# ---------- Normalização ----------
+def normalizar(serie: pd.Series) -> pd.Series:
+    """SKU canônico (texto) de cada valor; vazios e 'nan' viram NA."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    canon = _normalizar_unicos(pd.Series(unicos, dtype=object))
+    valores = np.append(canon.to_numpy(dtype=object), pd.NA)  # código -1 -> NA
+    return pd.Series(valores[codigos], index=serie.index, dtype=esquema.TEXTO, name=serie.name)
+
+
+def _normalizar_unicos(unicos: pd.Series) -> pd.Series:
+    texto = unicos.astype(str).str.strip().str.upper()
+    texto = texto.str.replace(r"['*]", "", regex=True).str.replace(r"\.0$", "", regex=True).str.strip()
+    return texto.where(~texto.isin(_INVALIDOS), None)
+
+
+# ---------- Dimensão ----------
+def _ler_banco_produtos(caminho: Path = BANCO_PRODUTOS) -> pd.DataFrame:
+    """sku, descricao do banco de produtos (';' ou ',', cabeçalhos como no padronizador)."""
+    if not caminho.exists():
+        return pd.DataFrame(columns=["sku", "descricao"])
+    df = dialeto_csv.ler_csv(caminho, dtype=str)
+    df.columns = [str(c).replace('"', "").replace("'", "").strip().lower().replace(" ", "") for c in df.columns]
+    if "sku" not in df.columns:
+        return pd.DataFrame(columns=["sku", "descricao"])
+    if "descricao" not in df.columns:
+        df["descricao"] = None
+    return df[["sku", "descricao"]]
+
+
+def carregar(recarregar: bool = False) -> None:
+    """Lê a dimensão persistida (ou começa vazia)."""
+    if _DIM and not recarregar:
+        return
+    if DIM_CSV.exists():
+        dim = pd.read_csv(DIM_CSV, dtype={"sku": str, "descricao": str}, keep_default_na=False,
+                          na_values=[""]).sort_values("sku_id")
+        skus = dim["sku"].tolist()
+        descricoes = dim["descricao"].tolist()
+    else:
+        skus, descricoes = [], []
+    aliases: Dict[str, int] = {}
+    if ALIASES_CSV.exists():
+        al = pd.read_csv(ALIASES_CSV, dtype={"alias": str}, keep_default_na=False)
+        aliases = dict(zip(al["alias"], al["sku_id"].astype(int)))
+    _DIM.update(skus=skus, descricoes=descricoes, aliases=aliases,
+                indice=pd.Index(skus, dtype=object), alterada=False)
+
+
+def _registrar(canonicos: Iterable[str]) -> None:
+    skus: List[str] = _DIM["skus"]
+    novos = [s for s in dict.fromkeys(canonicos) if s is not None]
+    if not novos:
+        return
+    skus.extend(novos)
+    _DIM["descricoes"].extend([None] * len(novos))
+    _DIM["indice"] = pd.Index(skus, dtype=object)
+    _DIM["alterada"] = True
+
+
+def codificar(serie: pd.Series, registrar: bool = True) -> pd.Series:
+    """
+    sku_id (Int32) de cada valor. SKUs desconhecidos ganham id novo se
+    registrar=True; senão ficam NA.
+    """
+    carregar()
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    unicos = pd.Series(unicos, dtype=object)
+    canon = _normalizar_unicos(unicos)
+
+    ids = _DIM["indice"].get_indexer(canon)
+    faltando = (ids < 0) & canon.notna().to_numpy()
+    if faltando.any() and registrar:
+        _registrar(canon[faltando])
+        ids = _DIM["indice"].get_indexer(canon)
+
+    # apelidos: grafia original (sem espaços nas pontas) diferente da canônica
+    bruto = unicos.astype(str).str.strip()
+    aliases: Dict[str, int] = _DIM["aliases"]
+    for original, c, i in zip(bruto, canon, ids):
+        if i >= 0 and original != c and original not in aliases:
+            aliases[original] = int(i)
+            _DIM["alterada"] = True
+
+    valores = pd.array(np.append(ids, -1), dtype="Int32")
+    valores[valores < 0] = pd.NA
+    return pd.Series(valores[codigos], index=serie.index, name="sku_id")
+
+
+def decodificar(ids: pd.Series) -> pd.Series:
+    """SKU canônico de cada sku_id."""
+    carregar()
+    skus = np.array(_DIM["skus"] + [None], dtype=object)
+    pos = ids.astype("Int64").fillna(-1).to_numpy(dtype=np.int64)
+    return pd.Series(skus[pos], index=ids.index, dtype=esquema.TEXTO, name="sku")
+
+
+def descricoes(serie: pd.Series) -> pd.Series:
+    """Descrição do banco de produtos para cada SKU (NA se não houver)."""
+    carregar()
+    ids = codificar(serie, registrar=False)
+    desc = np.array(_DIM["descricoes"] + [None], dtype=object)
+    pos = ids.astype("Int64").fillna(-1).to_numpy(dtype=np.int64)
+    return pd.Series(desc[pos], index=serie.index, dtype=object)
+
+
+def registrar_descricoes(skus: pd.Series, descricoes_: pd.Series) -> None:
+    """Grava a descrição de cada SKU (a última vence), registrando os novos."""
+    ids = codificar(skus)
+    desc: List[Optional[str]] = _DIM["descricoes"]
+    for i, d in zip(ids, descricoes_):
+        if not pd.isna(i) and not pd.isna(d) and desc[int(i)] != d:
+            desc[int(i)] = d
+            _DIM["alterada"] = True
+
+
+def tabela() -> pd.DataFrame:
+    carregar()
+    return pd.DataFrame({
+        "sku_id": np.arange(len(_DIM["skus"]), dtype=np.int32),
+        "sku": _DIM["skus"],
+        "descricao": _DIM["descricoes"],
+    })
+
+
+def salvar(forcar: bool = False) -> Optional[Path]:
+    """Grava a dimensão e os apelidos se algo mudou desde a leitura."""
+    if not _DIM or not (_DIM["alterada"] or forcar):
+        return None
+    PROC_DIR.mkdir(exist_ok=True)
+    tabela().to_csv(DIM_CSV, index=False, encoding="utf-8")
+    pd.DataFrame(sorted(_DIM["aliases"].items()), columns=["alias", "sku_id"]).to_csv(
+        ALIASES_CSV, index=False, encoding="utf-8")
+    _DIM["alterada"] = False
+    return DIM_CSV
+
+
+def construir() -> pd.DataFrame:
+    """Atualiza a dimensão com o banco de produtos e as tabelas de processados/."""
+    carregar(recarregar=True)
+    banco = _ler_banco_produtos()
+    if not banco.empty:
+        registrar_descricoes(banco["sku"], banco["descricao"])
+        print(f"[dim_sku] Banco de produtos: {len(banco)} linhas.")
+
+    for arquivo, coluna in FONTES.items():
+        caminho = PROC_DIR / arquivo
+        if not (saida.existe(caminho, "csv") or saida.existe(caminho, "parquet")):
+            continue
+        try:
+            if arquivo == "mercadolivre_agrupado.csv":  # gravado com ';'
+                skus = pd.read_csv(caminho, sep=";", usecols=[coluna], dtype=str)[coluna]
+            else:
+                skus = saida.ler_tabela(caminho, colunas=[coluna])[coluna]
+        except (ValueError, KeyError) as e:
+            print(f"[dim_sku] {arquivo} ignorado: {e}")
+            continue
+        antes = len(_DIM["skus"])
+        codificar(skus)
+        print(f"[dim_sku] {arquivo}: {skus.nunique()} SKUs distintos, {len(_DIM['skus']) - antes} novos.")
+
+    salvar()
+    return tabela()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Monta/atualiza a dimensão de SKUs em processados/.")
+    ap.parse_args()
+    dim = construir()
+    print(f"[dim_sku] {len(dim)} SKUs, {len(_DIM['aliases'])} apelidos -> {DIM_CSV}")
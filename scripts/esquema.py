@@ -0,0 +1,96 @@
+"""
+Tipos compactos das tabelas do pipeline (marketplaces, Tiny, dados_gerais).
+
+Sem tipos explícitos, sku/produto/canal ficam como strings Python (object),
+ano/mes viram float64 por causa dos vazios e cada linha custa várias vezes o
+necessário. Aqui fica o esquema único aplicado na leitura e antes de cada
+merge/consolidação:
+
+- category: canal, uf, cfop, ncm (poucos valores distintos);
+- Int16 (nulo permitido): ano, mes;
+- string[pyarrow] (ou string, sem pyarrow): sku, produto e os equivalentes
+  do Tiny (codigo_produto, nome_produto).
+
+Colunas category como chave de groupby exigem observed=True (senão o
+pandas gera todas as combinações de categorias). Para juntar tabelas, use
+concatenar: o pd.concat comum transforma categorias diferentes em object.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+try:
+    import pyarrow  # noqa: F401
+    TEXTO = "string[pyarrow]"
+except ImportError:  # pyarrow é opcional
+    TEXTO = "string"
+
+CATEGORIAS = ["canal", "uf", "cfop", "ncm"]
+INTEIROS = ["ano", "mes"]
+TEXTOS = ["sku", "produto", "codigo_produto", "nome_produto"]
+
+MEMORIA: Dict[str, Dict[str, float]] = {}
+
+
+def dtypes_leitura(colunas: Iterable[str]) -> Dict[str, str]:
+    """dtype= do read_csv para as colunas do esquema (texto e categorias lidos como tal)."""
+    tipos = {}
+    for col in colunas:
+        if col in CATEGORIAS:
+            tipos[col] = "category"
+        elif col in TEXTOS:
+            tipos[col] = TEXTO
+    return tipos
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def compactar(df: pd.DataFrame, nome: Optional[str] = None) -> pd.DataFrame:
+    """
+    Aplica o esquema às colunas presentes. Com nome, mede a memória antes e
+    depois, imprime e guarda em MEMORIA[nome].
+    """
+    antes = memoria_mb(df) if nome else None
+    tipos = {}
+    for col in df.columns:
+        atual = df[col].dtype
+        if col in CATEGORIAS and not isinstance(atual, CategoricalDtype):
+            tipos[col] = df[col].astype(TEXTO).astype("category")
+        elif col in INTEIROS and atual != "Int16":
+            tipos[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int16")
+        elif col in TEXTOS and atual != TEXTO:
+            tipos[col] = df[col].astype(TEXTO)
+    if tipos:
+        df = df.assign(**tipos)
+
+    if nome:
+        depois = memoria_mb(df)
+        MEMORIA[nome] = {"antes_mb": round(antes, 2), "depois_mb": round(depois, 2)}
+        reducao = f" (-{1 - depois / antes:.0%})" if antes else ""
+        print(f"[MEMÓRIA] {nome}: {antes:.1f} MB -> {depois:.1f} MB{reducao}")
+    return df
+
+
+def concatenar(frames: List[pd.DataFrame], **opcoes) -> pd.DataFrame:
+    """pd.concat que preserva as colunas category (une as categorias antes)."""
+    frames = [f for f in frames if f is not None]
+    for col in CATEGORIAS:
+        com_col = [f for f in frames if col in f.columns]
+        if not com_col or not all(isinstance(f[col].dtype, CategoricalDtype) for f in com_col):
+            continue
+        valores = set()
+        for f in com_col:
+            valores.update(f[col].cat.categories)
+        tipo = CategoricalDtype(sorted(valores, key=str))
+        frames = [f.assign(**{col: f[col].astype(tipo)}) if col in f.columns else f for f in frames]
+    return pd.concat(frames, **opcoes)
+
+
+def relatorio() -> str:
+    """Resumo das medições, ex. 'marketplaces: 120.4 -> 31.2 MB'."""
+    return "; ".join(f"{nome}: {m['antes_mb']:.1f} -> {m['depois_mb']:.1f} MB" for nome, m in MEMORIA.items())
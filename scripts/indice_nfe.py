@@ -0,0 +1,288 @@
+"""
+Índice das pastas de XML de NF-e: número, chave, emissão e CNPJ do emitente
+de cada arquivo, sem montar a árvore inteira.
+
+Para saber o nNF de um XML não é preciso ler os itens: ler_cabecalho lê o
+arquivo em blocos de 4 KB num parser incremental e para assim que fecha o
+<emit> (ou no primeiro <det>), antes do grosso do arquivo. O resultado fica em processados/indice_nfe.db; nas
+execuções seguintes só arquivos novos ou com tamanho/mtime diferentes são
+lidos de novo, e os que sumiram da pasta saem do índice.
+
+    import indice_nfe
+    arquivos = indice_nfe.selecionar(pasta, nnf={"12344", "12345"})
+    arquivos = indice_nfe.selecionar(pasta, desde="2025-01-01", cnpj="12345678000199")
+
+Usado pelo organizador_xml.py (em vez de abrir cada XML para ler o nNF) e
+pelos parsers (parse_xml_tiny.py e parse_xml_tiktok.py aceitam --nnf,
+--chave, --cnpj, --desde e --ate para processar só parte das notas).
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import instrumentacao
+import xml_backend
+from instrumentacao import medir
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INDICE_DB = BASE_DIR / "processados" / "indice_nfe.db"
+
+BLOCO_SQL = 500  # valores por IN (...) nas consultas
+BLOCO_LEITURA = 4096  # bytes lidos por vez; o cabeçalho costuma caber no primeiro bloco
+
+PathLike = Union[str, Path]
+
+
+def normalizar_numero(n: Optional[str]) -> str:
+    """nNF sem espaços e sem zeros à esquerda ('012344' -> '12344')."""
+    if not n:
+        return ""
+    return n.strip().lstrip("0") or "0"
+
+
+# ---------- Leitura do cabeçalho ----------
+def _eventos(path: PathLike) -> Iterator[Tuple[str, Any]]:
+    """Eventos (start/end) lidos em blocos de BLOCO_LEITURA; parar de iterar para a leitura."""
+    parser = xml_backend.pull_parser(("start", "end"))
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b""):
+            parser.feed(bloco)
+            yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def ler_cabecalho(path: PathLike) -> Dict[str, Optional[str]]:
+    """
+    nnf, chave (Id do infNFe sem 'NFe'), data_emissao (aaaa-mm-dd) e
+    cnpj_emit, lendo o XML só até o fim do <emit>.
+    """
+    info: Dict[str, Optional[str]] = {"nnf": None, "chave": None, "data_emissao": None, "cnpj_emit": None}
+    # só filhos diretos de <ide>/<emit> (<ide> também tem o nNF das notas referenciadas, em <NFref>)
+    bloco, profundidade_bloco, profundidade = None, 0, 0
+    eventos = _eventos(path)
+    for evento, elem in eventos:
+        nome = xml_backend.local_name(elem.tag)
+        if evento == "start":
+            profundidade += 1
+            if nome == "infNFe" and info["chave"] is None:
+                id_nota = elem.get("Id") or ""
+                info["chave"] = (id_nota[3:] if id_nota.startswith("NFe") else id_nota) or None
+            elif nome in ("ide", "emit") and bloco is None:
+                bloco, profundidade_bloco = nome, profundidade
+            elif nome == "det":
+                break
+            continue
+
+        filho_direto = bloco is not None and profundidade == profundidade_bloco + 1
+        profundidade -= 1
+        texto = (elem.text or "").strip()
+        if nome == bloco and profundidade < profundidade_bloco:
+            if bloco == "emit":
+                break
+            bloco = None
+        elif filho_direto and bloco == "ide":
+            if nome == "nNF" and texto:
+                info["nnf"] = normalizar_numero(texto)
+            elif nome in ("dhEmi", "dEmi") and texto and not info["data_emissao"]:
+                info["data_emissao"] = texto[:10]
+        elif filho_direto and bloco == "emit" and nome == "CNPJ" and texto:
+            info["cnpj_emit"] = texto
+    eventos.close()  # fecha o arquivo sem ler o resto
+    return info
+
+
+# ---------- Índice persistido ----------
+def abrir(caminho: Path = INDICE_DB) -> sqlite3.Connection:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS nfe (
+            caminho       TEXT PRIMARY KEY,
+            pasta         TEXT NOT NULL,
+            tamanho       INTEGER NOT NULL,
+            mtime_ns      INTEGER NOT NULL,
+            nnf           TEXT,
+            chave         TEXT,
+            data_emissao  TEXT,
+            cnpj_emit     TEXT,
+            status        TEXT NOT NULL  -- ok | sem_nnf | erro
+        )
+    """)
+    for col in ("pasta", "nnf", "chave", "data_emissao", "cnpj_emit"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_nfe_{col} ON nfe ({col})")
+    return conn
+
+
+def listar_xmls(pasta: Path) -> List[Path]:
+    return sorted(p for p in pasta.rglob("*") if p.suffix.lower() == ".xml" and p.is_file())
+
+
+@medir("indice_nfe.atualizar")
+def atualizar(pasta: PathLike, conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+    """
+    Sincroniza o índice com a pasta (recursivo): lê o cabeçalho dos XMLs
+    novos/alterados e remove os que não existem mais. Devolve as contagens.
+    """
+    pasta = Path(pasta).resolve()
+    proprio = conn is None
+    conn = conn or abrir()
+    try:
+        conhecidos = {
+            caminho: (tamanho, mtime)
+            for caminho, tamanho, mtime in conn.execute(
+                "SELECT caminho, tamanho, mtime_ns FROM nfe WHERE pasta = ?", (str(pasta),))
+        }
+        registros = []
+        atuais = set()
+        for fp in (listar_xmls(pasta) if pasta.exists() else []):
+            st = fp.stat()
+            atuais.add(str(fp))
+            if conhecidos.get(str(fp)) == (st.st_size, st.st_mtime_ns):
+                continue
+            try:
+                info = ler_cabecalho(fp)
+                status = "ok" if info["nnf"] else "sem_nnf"
+            except Exception:
+                info, status = {"nnf": None, "chave": None, "data_emissao": None, "cnpj_emit": None}, "erro"
+            registros.append((str(fp), str(pasta), st.st_size, st.st_mtime_ns, info["nnf"], info["chave"],
+                              info["data_emissao"], info["cnpj_emit"], status))
+        removidos = [c for c in conhecidos if c not in atuais]
+        with conn:
+            conn.executemany("DELETE FROM nfe WHERE caminho = ?", [(c,) for c in removidos])
+            conn.executemany("INSERT OR REPLACE INTO nfe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", registros)
+        instrumentacao.contar("xml_indexados", len(registros))
+        return {"arquivos": len(atuais), "lidos": len(registros), "removidos": len(removidos)}
+    finally:
+        if proprio:
+            conn.close()
+
+
+def _em_blocos(valores: Sequence[Any]) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(valores), BLOCO_SQL):
+        yield valores[i:i + BLOCO_SQL]
+
+
+def consultar(
+    pasta: PathLike,
+    nnf: Optional[Iterable[str]] = None,
+    chaves: Optional[Iterable[str]] = None,
+    cnpj: Optional[str] = None,
+    desde: Optional[str] = None,
+    ate: Optional[str] = None,
+    atualizar_antes: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Registros do índice da pasta que atendem a todos os filtros informados
+    (nnf e chaves: conjuntos de valores; desde/ate: 'aaaa-mm-dd', inclusivos).
+    """
+    pasta = Path(pasta).resolve()
+    conn = abrir()
+    try:
+        if atualizar_antes:
+            atualizar(pasta, conn)
+        where = ["pasta = ?"]
+        params: List[Any] = [str(pasta)]
+        if cnpj:
+            where.append("cnpj_emit = ?")
+            params.append("".join(ch for ch in cnpj if ch.isdigit()))
+        if desde:
+            where.append("data_emissao >= ?")
+            params.append(str(desde)[:10])
+        if ate:
+            where.append("data_emissao <= ?")
+            params.append(str(ate)[:10])
+
+        # nnf/chave: IN em blocos, pelo índice da coluna
+        filtros = []
+        if nnf is not None:
+            filtros.append(("nnf", sorted({normalizar_numero(n) for n in nnf} - {""})))
+        if chaves is not None:
+            filtros.append(("chave", sorted({c.strip().replace("NFe", "") for c in chaves} - {""})))
+
+        sql = "SELECT caminho, nnf, chave, data_emissao, cnpj_emit, status FROM nfe WHERE " + " AND ".join(where)
+        linhas = []
+        if filtros:
+            col, valores = filtros[0]
+            for bloco in _em_blocos(valores):
+                marcadores = ", ".join("?" for _ in bloco)
+                linhas += conn.execute(f"{sql} AND {col} IN ({marcadores})", [*params, *bloco]).fetchall()
+        else:
+            linhas = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    nomes = ["caminho", "nnf", "chave", "data_emissao", "cnpj_emit", "status"]
+    registros = [dict(zip(nomes, linha)) for linha in linhas]
+    for col, valores in filtros[1:]:
+        permitidos = set(valores)
+        registros = [r for r in registros if r[col] in permitidos]
+    return sorted(registros, key=lambda r: r["caminho"])
+
+
+def selecionar(pasta: PathLike, **filtros) -> List[Path]:
+    """Caminhos dos XMLs da pasta que atendem aos filtros (ver consultar)."""
+    return [Path(r["caminho"]) for r in consultar(pasta, **filtros)]
+
+
+def registrar_movido(origem: PathLike, destino: PathLike, pasta_destino: PathLike) -> None:
+    """
+    Atualiza o índice depois de mover um XML (evita reler o arquivo no destino).
+    Se o destino já estava no índice (pasta indexada antes, ou arquivo de mesmo
+    nome substituído), a linha antiga sai na mesma transação.
+    """
+    conn = abrir()
+    try:
+        st = Path(destino).stat()
+        alvo = str(Path(destino).resolve())
+        with conn:
+            conn.execute("DELETE FROM nfe WHERE caminho = ?", (alvo,))
+            conn.execute(
+                "UPDATE nfe SET caminho = ?, pasta = ?, tamanho = ?, mtime_ns = ? WHERE caminho = ?",
+                (alvo, str(Path(pasta_destino).resolve()), st.st_size,
+                 st.st_mtime_ns, str(Path(origem).resolve())),
+            )
+    finally:
+        conn.close()
+
+
+# ---------- Filtros na linha de comando dos parsers ----------
+def adicionar_argumentos(ap: argparse.ArgumentParser) -> None:
+    g = ap.add_argument_group("seleção pelo índice de NF-e (indice_nfe.py)")
+    g.add_argument("--nnf", nargs="+", help="só as notas com esses números (nNF)")
+    g.add_argument("--chave", nargs="+", help="só as notas com essas chaves de acesso")
+    g.add_argument("--cnpj", help="só as notas desse emitente")
+    g.add_argument("--desde", metavar="AAAA-MM-DD", help="emitidas a partir dessa data")
+    g.add_argument("--ate", metavar="AAAA-MM-DD", help="emitidas até essa data")
+
+
+def filtros_dos_argumentos(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """Filtros para consultar/selecionar, ou None se nenhum foi passado."""
+    filtros = {"nnf": args.nnf, "chaves": args.chave, "cnpj": args.cnpj, "desde": args.desde, "ate": args.ate}
+    filtros = {k: v for k, v in filtros.items() if v}
+    return filtros or None
+
+
+def caminho_recorte(path: Path) -> Path:
+    """
+    Saída de uma execução com filtros (vendas.csv -> vendas_recorte.csv): o
+    recorte nunca substitui a base completa, que o pipeline e o manifesto
+    consideram em dia pelo arquivo.
+    """
+    return path.with_name(f"{path.stem}_recorte{path.suffix}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Atualiza o índice de NF-e de uma pasta e lista os XMLs encontrados.")
+    ap.add_argument("pasta", type=Path)
+    adicionar_argumentos(ap)
+    args = ap.parse_args()
+    instrumentacao.iniciar("indice_nfe")
+    contagem = atualizar(args.pasta)
+    print(f"[indice_nfe] {contagem['arquivos']} XMLs, {contagem['lidos']} lidos agora, "
+          f"{contagem['removidos']} removidos do índice.")
+    for r in consultar(args.pasta, atualizar_antes=False, **(filtros_dos_argumentos(args) or {})):
+        print(f"{r['nnf'] or '-':>10}  {r['data_emissao'] or '-':10}  {r['cnpj_emit'] or '-':14}  {r['caminho']}")
@@ -0,0 +1,245 @@
+"""
+Ingestão concorrente das bases da consolidação geral (dados_gerais): os
+exports dos marketplaces (Amazon, Mercado Livre, Shopee, Beleza na Web,
+TikTok em planilha), as NF-e do TikTok Shop e o Tiny ERP.
+
+No caminho sequencial cada script lê seus arquivos um depois do outro
+(tratamento_marketplaces, parse_xml_tiktok) e o merge_csv_marketplaces só
+começa quando todos terminaram. Aqui cada arquivo (ou bloco de XMLs) é uma
+tarefa:
+
+- as leituras vão para um executor limitado (--workers threads, ou
+  processos com --processos), então o disco de um arquivo sobrepõe o
+  parsing de outro, de fontes diferentes;
+- backpressure: no máximo --max-frames DataFrames lidos e ainda não
+  entregues ao consolidador existem ao mesmo tempo; uma leitura nova só é
+  agendada quando o consolidador libera uma vaga;
+- cada DataFrame que chega é reduzido às colunas da consolidação e somado
+  na hora ao agregado parcial da sua fonte (um grupo por SKU / produto /
+  canal / ano / mês), e só então a vaga é liberada: em memória ficam os
+  agregados e no máximo --max-frames partes;
+- quando a última tarefa de uma fonte termina, a base dela sai do agregado
+  (no TikTok, pelo agrupar do parse_xml_tiktok), sem esperar a fonte mais
+  lenta; no fim só faltam o merge_csv_marketplaces.consolidar (SKU ->
+  sku_id e groupby) e a gravação de processados/dados_gerais.csv.
+
+As leituras são as dos próprios scripts (tratamento_marketplaces.ler_padronizado
+por arquivo, parse_xml_tiktok.ler_arquivos + agrupar, e o tiny_merged como o
+merge_csv_marketplaces lê), então o resultado é o mesmo do caminho
+sequencial (a menos do último dígito de alguns totais: as somas parciais
+mudam a ordem das somas em float). No pipeline.py é esta etapa que gera o
+dados_gerais.
+
+Uso:
+    python scripts/ingestao.py
+    python scripts/ingestao.py --workers 8 --max-frames 16
+    python scripts/ingestao.py --processos
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import esquema
+import instrumentacao
+import merge_csv_marketplaces
+import parse_xml_tiktok
+import saida
+import tratamento_marketplaces
+
+WORKERS = 4
+MAX_FRAMES = 8   # DataFrames lidos e ainda não consolidados, no máximo
+BLOCO_XML = 256  # XMLs por tarefa (TikTok)
+
+ESTATISTICAS: Counter = Counter()
+
+
+# ---------- Leitura (roda no executor) ----------
+def ler_tiny(nome: str) -> Optional[pd.DataFrame]:
+    return merge_csv_marketplaces.carregar(nome)
+
+
+def ler_marketplace(tarefa: tuple) -> Optional[pd.DataFrame]:
+    arquivo, canal = tarefa
+    return tratamento_marketplaces.ler_padronizado(arquivo, canal)
+
+
+def ler_tiktok(arquivos: List[Path]) -> Optional[pd.DataFrame]:
+    return parse_xml_tiktok.ler_arquivos(arquivos)
+
+
+def _blocos(arquivos: List[Path], tamanho: int = BLOCO_XML) -> List[List[Path]]:
+    return [arquivos[i:i + tamanho] for i in range(0, len(arquivos), tamanho)]
+
+
+# fonte -> tarefas, leitura de uma tarefa e montagem da base a partir do
+# agregado parcial. Mesmas chaves e ordem de merge_csv_marketplaces.BASES.
+FONTES: Dict[str, Dict[str, Callable]] = {
+    "tiny": {"tarefas": lambda: ["tiny"], "ler": ler_tiny, "montar": lambda df: df},
+    "marketplaces": {"tarefas": lambda: list(tratamento_marketplaces.arquivos_entrada()),
+                     "ler": ler_marketplace, "montar": lambda df: df},
+    # o tiktok_market.csv sai do agrupar (ordenado pelas chaves dele)
+    "tiktok": {"tarefas": lambda: _blocos(parse_xml_tiktok.arquivos()), "ler": ler_tiktok,
+               "montar": parse_xml_tiktok.agrupar},
+}
+CHAVES = ["sku", "produto", "canal", "ano", "mes"]
+
+
+# ---------- Consolidação (roda no laço de eventos) ----------
+def _agregar(df: pd.DataFrame) -> pd.DataFrame:
+    """Soma parcial por SKU / produto / canal / ano / mês, guardando chaves vazias (dropna=False)."""
+    return (df.groupby(CHAVES, as_index=False, observed=True, dropna=False, sort=False)
+              .agg({"vendas": "sum", "valor_total": "sum", "_ordem": "min"}))
+
+
+class _Fonte:
+    """Agregado parcial de uma fonte, atualizado a cada parte que chega."""
+
+    def __init__(self, nome: str, tarefas: int):
+        self.nome = nome
+        self.pendentes = tarefas
+        self.agregado: Optional[pd.DataFrame] = None
+        self.linhas = 0
+        self.erros = 0
+
+    def somar(self, indice: int, df: Optional[pd.DataFrame]) -> None:
+        """
+        Junta a parte ao agregado na hora, então só o agregado (um grupo por
+        chave) fica em memória. As partes chegam fora de ordem: _ordem guarda
+        a posição da primeira linha de cada grupo no caminho sequencial
+        (tarefa, linha), para a base sair na mesma ordem e os SKUs novos
+        ganharem os mesmos ids no dim_sku.
+        """
+        if df is None or df.empty:
+            return
+        self.linhas += len(df)
+        parte = merge_csv_marketplaces.preparar(df)
+        parte["_ordem"] = (indice << 32) + np.arange(len(parte), dtype=np.int64)
+        if self.agregado is not None:
+            parte = esquema.concatenar([self.agregado, parte], ignore_index=True)
+        self.agregado = _agregar(parte)
+
+    def preparada(self) -> Optional[pd.DataFrame]:
+        if self.agregado is None:
+            return None
+        base = self.agregado.sort_values("_ordem", kind="stable").drop(columns="_ordem")
+        self.agregado = None
+        return merge_csv_marketplaces.preparar(FONTES[self.nome]["montar"](base.reset_index(drop=True)))
+
+
+async def _produzir(nome: str, tarefas: List[Any], ler: Callable, executor: Executor,
+                    vagas: asyncio.Semaphore, fila: asyncio.Queue) -> None:
+    """Agenda as leituras da fonte; cada uma espera uma vaga (backpressure)."""
+    loop = asyncio.get_running_loop()
+
+    async def uma(indice, tarefa):
+        try:
+            df = await loop.run_in_executor(executor, ler, tarefa)
+        except Exception as e:
+            df = e
+        await fila.put((nome, indice, df))
+
+    agendadas = []
+    for indice, tarefa in enumerate(tarefas):
+        await vagas.acquire()  # liberada pelo consolidador
+        ESTATISTICAS["em_memoria"] += 1
+        ESTATISTICAS["pico_em_memoria"] = max(ESTATISTICAS["pico_em_memoria"], ESTATISTICAS["em_memoria"])
+        agendadas.append(asyncio.ensure_future(uma(indice, tarefa)))
+    await asyncio.gather(*agendadas)
+
+
+async def _consolidar(fontes: Dict[str, _Fonte], fila: asyncio.Queue, vagas: asyncio.Semaphore,
+                      inicio: float) -> tuple:
+    preparadas: Dict[str, pd.DataFrame] = {}
+    resumo: Dict[str, Dict[str, Any]] = {}
+
+    def fechar(fonte: _Fonte) -> None:
+        df = fonte.preparada()
+        if df is not None:
+            preparadas[fonte.nome] = df
+        resumo[fonte.nome] = {"linhas_lidas": fonte.linhas, "linhas": 0 if df is None else len(df),
+                              "erros": fonte.erros, "concluido_s": round(time.perf_counter() - inicio, 3)}
+        print(f"[OK] {fonte.nome}: {fonte.linhas} linhas lidas -> {resumo[fonte.nome]['linhas']} para a "
+              f"consolidação ({resumo[fonte.nome]['concluido_s']:.1f}s)")
+
+    for fonte in fontes.values():
+        if fonte.pendentes == 0:
+            fechar(fonte)
+    abertas = sum(1 for f in fontes.values() if f.pendentes)
+
+    while abertas:
+        nome, indice, df = await fila.get()
+        fonte = fontes[nome]
+        if isinstance(df, Exception):
+            fonte.erros += 1
+            print(f"[ERRO] {nome}: {df}")
+        else:
+            fonte.somar(indice, df)
+        del df
+        ESTATISTICAS["em_memoria"] -= 1
+        vagas.release()
+
+        fonte.pendentes -= 1
+        if fonte.pendentes == 0:
+            fechar(fonte)
+            abertas -= 1
+    return preparadas, resumo
+
+
+async def ingerir(workers: int = WORKERS, max_frames: int = MAX_FRAMES, processos: bool = False,
+                  formato: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Lê todas as fontes, consolida e grava o dados_gerais; devolve o resumo por fonte."""
+    tarefas = {f: FONTES[f]["tarefas"]() for f in FONTES}
+    for f in FONTES:
+        print(f"[INFO] {f}: {len(tarefas[f])} tarefa(s)")
+
+    inicio = time.perf_counter()
+    fila: asyncio.Queue = asyncio.Queue()
+    vagas = asyncio.Semaphore(max_frames)
+    estado = {f: _Fonte(f, len(tarefas[f])) for f in FONTES}
+
+    Pool = ProcessPoolExecutor if processos else ThreadPoolExecutor
+    with Pool(max_workers=workers) as executor:
+        produtores = [asyncio.ensure_future(_produzir(f, tarefas[f], FONTES[f]["ler"], executor, vagas, fila))
+                      for f in FONTES]
+        preparadas, resumo = await _consolidar(estado, fila, vagas, inicio)
+        await asyncio.gather(*produtores)
+
+    if not preparadas:
+        print("[ERRO] Nenhuma fonte trouxe dados.")
+        return resumo
+    # mesma ordem de merge_csv_marketplaces.BASES: mesmo resultado do caminho sequencial
+    consolidado = merge_csv_marketplaces.consolidar([preparadas[f] for f in FONTES if f in preparadas])
+    merge_csv_marketplaces.salvar(consolidado, formato)
+    return resumo
+
+
+def relatorio() -> str:
+    return f"pico de DataFrames em memória: {ESTATISTICAS['pico_em_memoria']}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Lê as bases de todos os canais de forma concorrente e grava o dados_gerais.")
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help=f"leituras simultâneas (padrão {WORKERS}; 0 = núcleos da máquina)")
+    ap.add_argument("--max-frames", type=int, default=MAX_FRAMES,
+                    help=f"DataFrames lidos e ainda não consolidados, no máximo (padrão {MAX_FRAMES})")
+    ap.add_argument("--processos", action="store_true",
+                    help="leituras em processos em vez de threads (parsing pesado de XML)")
+    ap.add_argument("--formato", choices=saida.FORMATOS, default=None,
+                    help="formato de saída (padrão: FORMATO_SAIDA ou csv)")
+    args = ap.parse_args()
+    instrumentacao.iniciar("ingestao")
+    resumo = asyncio.run(ingerir(args.workers or (os.cpu_count() or 1), max(args.max_frames, 1),
+                                 args.processos, args.formato))
+    print(f"[INFO] {relatorio()}")
+    print(pd.DataFrame.from_dict(resumo, orient="index").to_string())
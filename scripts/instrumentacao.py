@@ -0,0 +1,193 @@
+"""
+Instrumentação dos scripts: onde vai o tempo e a memória de cada etapa.
+
+    import instrumentacao
+    from instrumentacao import medir
+
+    @medir("carregar_arquivo")          # decorador...
+    def carregar_arquivo(...): ...
+
+    with medir("merge"):                # ...ou bloco
+        merged = df_a.merge(df_b, on="sku")
+
+    instrumentacao.contar("linhas_lidas", len(df))
+
+    if __name__ == "__main__":
+        instrumentacao.iniciar("merge_shopee")   # relatório ao fim do processo
+        main()
+
+Cada medir acumula chamadas e tempo total/máximo; com tracemalloc ligado,
+também o pico de memória alocada pelo Python dentro do bloco. O pico de RSS
+é do processo inteiro e sai uma vez por etapa: ao fim do processo iniciar
+grava processados/instrumentacao/<etapa>.json com tempos, contadores, pico
+de RSS e os snapshots do tracemalloc.
+
+Variáveis de ambiente:
+    INSTRUMENTACAO=0            não grava o relatório
+    INSTRUMENTACAO_MEMORIA=1    liga o tracemalloc (mais lento)
+    PERFIL=cprofile|pyinstrument  grava o perfil da etapa em processados/perfis/
+
+No modo paralelo (ProcessPoolExecutor) os blocos medidos dentro dos processos
+de trabalho ficam nesses processos; o relatório traz o que rodou no principal.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RELATORIO_DIR = BASE_DIR / "processados" / "instrumentacao"
+PERFIL_DIR = BASE_DIR / "processados" / "perfis"
+
+ATIVO = os.environ.get("INSTRUMENTACAO", "1") != "0"
+MEMORIA = os.environ.get("INSTRUMENTACAO_MEMORIA", "0") == "1"
+PERFIL = os.environ.get("PERFIL", "").lower()
+
+TEMPOS: Dict[str, Dict[str, float]] = {}
+CONTADORES: Counter = Counter()
+SNAPSHOTS: List[Dict[str, Any]] = []
+
+_PILHA: List[List[Any]] = []  # blocos abertos: [nome, pico tracemalloc]
+_ETAPA: Dict[str, Any] = {}
+
+
+def rss_pico_mb() -> Optional[float]:
+    """Pico de memória residente do processo (MB), se o SO informar."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _propagar_pico() -> None:
+    """Repassa o pico do tracemalloc a todos os blocos abertos e zera o pico."""
+    pico = tracemalloc.get_traced_memory()[1]
+    for bloco in _PILHA:
+        bloco[1] = max(bloco[1], pico)
+    tracemalloc.reset_peak()
+
+
+@contextmanager
+def medir(nome: str):
+    """Cronometra o bloco (ou a função, usado como decorador) sob 'nome'."""
+    rastreando = tracemalloc.is_tracing()
+    if rastreando:
+        _propagar_pico()
+    _PILHA.append([nome, 0])
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        if rastreando:
+            _propagar_pico()
+        _, pico = _PILHA.pop()
+        t = TEMPOS.setdefault(nome, {"chamadas": 0, "total_s": 0.0, "max_s": 0.0})
+        t["chamadas"] += 1
+        t["total_s"] += duracao
+        t["max_s"] = max(t["max_s"], duracao)
+        if rastreando:
+            t["pico_alocado_mb"] = max(t.get("pico_alocado_mb", 0.0), round(pico / 2**20, 1))
+
+
+def contar(nome: str, n: int = 1) -> None:
+    CONTADORES[nome] += n
+
+
+def snapshot(rotulo: str, top: int = 10) -> None:
+    """Guarda as linhas que mais alocam memória agora (só com tracemalloc ligado)."""
+    if not tracemalloc.is_tracing():
+        return
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+    SNAPSHOTS.append({
+        "rotulo": rotulo,
+        "atual_mb": round(tracemalloc.get_traced_memory()[0] / 2**20, 1),
+        "top": [{"local": str(s.traceback), "mb": round(s.size / 2**20, 2), "blocos": s.count} for s in stats],
+    })
+
+
+def relatorio() -> Dict[str, Any]:
+    """Estado atual da instrumentação num dict serializável em JSON."""
+    return {
+        "etapa": _ETAPA.get("nome"),
+        "duracao_s": round(time.perf_counter() - _ETAPA["inicio"], 3) if _ETAPA else None,
+        "rss_pico_mb": rss_pico_mb(),
+        "tempos": {
+            nome: {**t, "total_s": round(t["total_s"], 4), "max_s": round(t["max_s"], 4)}
+            for nome, t in sorted(TEMPOS.items(), key=lambda kv: -kv[1]["total_s"])
+        },
+        "contadores": dict(CONTADORES),
+        "snapshots": SNAPSHOTS,
+    }
+
+
+def iniciar(nome: str) -> None:
+    """
+    Marca o início da etapa 'nome' no processo (chamar no __main__). Liga o
+    tracemalloc e o profiler se pedidos; o relatório e o perfil são gravados
+    ao fim do processo.
+    """
+    if _ETAPA:
+        return
+    _ETAPA.update(nome=nome, inicio=time.perf_counter())
+    if MEMORIA:
+        tracemalloc.start()
+    if PERFIL == "cprofile":
+        import cProfile
+        _ETAPA["perfil"] = cProfile.Profile()
+        _ETAPA["perfil"].enable()
+    elif PERFIL == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[AVISO] pyinstrument não instalado; perfil não será gravado.")
+        else:
+            _ETAPA["perfil"] = Profiler()
+            _ETAPA["perfil"].start()
+    atexit.register(finalizar)
+
+
+def finalizar() -> Optional[Path]:
+    """Para o profiler e grava o relatório JSON da etapa; devolve o caminho."""
+    if not _ETAPA or _ETAPA.get("finalizada"):
+        return None
+    _ETAPA["finalizada"] = True
+    nome = _ETAPA["nome"]
+
+    perfil = _ETAPA.pop("perfil", None)
+    if perfil is not None:
+        PERFIL_DIR.mkdir(parents=True, exist_ok=True)
+        if PERFIL == "cprofile":
+            perfil.disable()
+            destino = PERFIL_DIR / f"{nome}.prof"
+            perfil.dump_stats(destino)
+        else:
+            perfil.stop()
+            destino = PERFIL_DIR / f"{nome}.html"
+            destino.write_text(perfil.output_html(), encoding="utf-8")
+        print(f"[PERFIL] {nome}: {destino}")
+
+    if tracemalloc.is_tracing():
+        snapshot("fim")
+    if not ATIVO:
+        return None
+    RELATORIO_DIR.mkdir(parents=True, exist_ok=True)
+    destino = RELATORIO_DIR / f"{nome}.json"
+    dados = relatorio()
+    dados["gerado_em"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    destino.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding="utf-8")
+    return destino
@@ -1,6 +1,13 @@
 import pandas as pd
 from pathlib import Path
 
+import dim_sku
+import esquema
+import instrumentacao
+import particoes
+import saida
+from instrumentacao import medir
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 PROC_DIR = BASE_DIR / "processados"
 DB_DIR = BASE_DIR / "database"
@@ -11,60 +18,82 @@ market_file = PROC_DIR / "marketplaces.csv"
 tiktok_file = PROC_DIR / "tiktok_market.csv"
 OUT_FILE = PROC_DIR / "dados_gerais.csv"
 
-print(f"[INFO] Iniciando merge geral...")
-print(f"[INFO] Diretório base: {PROC_DIR}")
-
-# === Carrega cada base ===
-try:
-    tiny = pd.read_csv(tiny_file, encoding="utf-8", low_memory=False)
-    print(f"[OK] Tiny ERP: {len(tiny)} registros")
-except Exception as e:
-    print(f"[ERRO] Falha ao carregar {tiny_file}: {e}")
-    tiny = pd.DataFrame()
-
-try:
-    market = pd.read_csv(market_file, encoding="utf-8", low_memory=False)
-    print(f"[OK] Marketplaces: {len(market)} registros")
-except Exception as e:
-    print(f"[ERRO] Falha ao carregar {market_file}: {e}")
-    market = pd.DataFrame()
-
-try:
-    tiktok = pd.read_csv(tiktok_file, encoding="utf-8", low_memory=False)
-    print(f"[OK] TikTok Shop: {len(tiktok)} registros")
-except Exception as e:
-    print(f"[ERRO] Falha ao carregar {tiktok_file}: {e}")
-    tiktok = pd.DataFrame()
-
-# === Normaliza colunas ===
-for df in [tiny, market, tiktok]:
-    if "sku" in df.columns:
-        df["sku"] = df["sku"].astype(str).str.strip().str.upper()
-
-# === Padroniza colunas principais ===
+# === Bases na ordem em que entram na consolidação (o ingestao.py segue a mesma) ===
+BASES = {
+    "tiny": ("Tiny ERP", tiny_file),
+    "marketplaces": ("Marketplaces", market_file),
+    "tiktok": ("TikTok Shop", tiktok_file),
+}
+
+# === Colunas principais (só elas são lidas de cada base) ===
 cols_base = ["sku", "produto", "vendas", "valor_total", "ano", "mes", "canal"]
+CHAVES = ["sku_id", "produto", "canal", "ano", "mes"]
+
+
+def carregar(nome):
+    """Uma base (CSV ou Parquet, ver saida.py); DataFrame vazio se falhar."""
+    rotulo, caminho = BASES[nome]
+    try:
+        df = saida.ler_tabela(caminho, colunas=cols_base)
+        print(f"[OK] {rotulo}: {len(df)} registros")
+        return df
+    except Exception as e:
+        print(f"[ERRO] Falha ao carregar {caminho}: {e}")
+        return pd.DataFrame()
 
-for df in [tiny, market, tiktok]:
+
+def preparar(df):
+    """Só as colunas principais (as que faltam entram vazias)."""
+    df = df.copy()
     for col in cols_base:
         if col not in df.columns:
             df[col] = None
-    df = df[cols_base]
-
-# === Concatena tudo ===
-merged = pd.concat([tiny, market, tiktok], ignore_index=True)
-merged = merged.dropna(subset=["sku"])
-
-print(f"[INFO] Total combinado: {len(merged)} registros antes da consolidação")
-
-# === Consolida duplicações (SKU / canal / ano / mes) ===
-consolidado = (
-    merged.groupby(["sku", "produto", "canal", "ano", "mes"], as_index=False)
-          .agg({"vendas": "sum", "valor_total": "sum"})
-)
-consolidado["valor_unitario_medio"] = consolidado["valor_total"] / consolidado["vendas"]
-
-# === Exporta resultado final ===
-consolidado.to_csv(OUT_FILE, index=False, encoding="utf-8")
-print(f"[OK] Base final integrada salva em: {OUT_FILE}")
-print(f"[OK] Total final: {len(consolidado)} linhas consolidadas")
-print(consolidado.head(10))
+    return df[cols_base]
+
+
+def consolidar(bases):
+    """Soma as bases (já preparadas, na ordem de BASES) por SKU / produto / canal / ano / mes."""
+    merged = esquema.concatenar(bases, ignore_index=True)
+
+    # === SKU -> sku_id (dimensão de SKUs, ver dim_sku.py): consolidação em inteiros ===
+    # (ids novos saem na ordem das bases, por isso ela é fixa)
+    merged["sku_id"] = dim_sku.codificar(merged.pop("sku"))
+    merged = esquema.compactar(merged.dropna(subset=["sku_id"]), "dados_gerais")
+    dim_sku.salvar()
+    print(f"[INFO] Total combinado: {len(merged)} registros antes da consolidação")
+
+    # o groupby descarta chaves vazias; melhor avisar do que sumir calado
+    sem_chave = int(merged[CHAVES].isna().any(axis=1).sum())
+    if sem_chave:
+        print(f"[AVISO] {sem_chave} registro(s) sem produto/canal/ano/mês ficaram fora da consolidação")
+
+    # === Consolida duplicações (SKU / canal / ano / mes) ===
+    with medir("consolidar"):
+        consolidado = (
+            merged.groupby(CHAVES, as_index=False, observed=True)
+                  .agg({"vendas": "sum", "valor_total": "sum"})
+        )
+    consolidado.insert(0, "sku", dim_sku.decodificar(consolidado.pop("sku_id")))
+    consolidado["valor_unitario_medio"] = consolidado["valor_total"] / consolidado["vendas"]
+    return consolidado
+
+
+def salvar(consolidado, formato=None):
+    """Exporta o resultado final (só as partições canal/ano/mes que mudaram, ver particoes.py)."""
+    destino, mudancas = particoes.salvar(consolidado, OUT_FILE, formato)
+    print(f"[OK] Base final integrada salva em: {destino}")
+    print(f"[OK] Partições: {particoes.resumo(mudancas)}")
+    print(f"[OK] Total final: {len(consolidado)} linhas consolidadas")
+    print(consolidado.head(10))
+    return destino
+
+
+def main():
+    print(f"[INFO] Iniciando merge geral...")
+    print(f"[INFO] Diretório base: {PROC_DIR}")
+    salvar(consolidar([preparar(carregar(nome)) for nome in BASES]))
+
+
+if __name__ == "__main__":
+    instrumentacao.iniciar("merge_csv_marketplaces")
+    main()
@@ -1,15 +1,117 @@
+import argparse
+
 import pandas as pd
 from pathlib import Path
 
+import dim_sku
+import esquema
+import instrumentacao
+import saida
+from instrumentacao import medir
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 PROC_DIR = BASE_DIR / "processados"
 OUT_FILE = PROC_DIR / "dados_gerais.csv"
 
+# Acima disso (linhas do merge legado / linhas de marketplaces) o aviso de explosão é mostrado
+LIMITE_EXPLOSAO = 5.0
+
+
+def estimar_merge_legado(market: pd.DataFrame, tiny: pd.DataFrame) -> dict:
+    """
+    Tamanho do merge item a item (market x tiny por sku_id, how="left") sem
+    executá-lo: cada linha de marketplaces vira tantas linhas quantos itens do
+    Tiny houver para o SKU (ou uma, se não houver).
+    """
+    por_sku_market = market["sku_id"].value_counts()
+    por_sku_tiny = tiny["sku_id"].value_counts()
+    pares = por_sku_market.mul(por_sku_tiny.reindex(por_sku_market.index).fillna(1))
+    linhas = int(pares.sum()) + int(market["sku_id"].isna().sum())
+
+    bytes_linha = 0.0
+    if len(market):
+        bytes_linha += esquema.memoria_mb(market) * 2**20 / len(market)
+    if len(tiny):
+        bytes_linha += esquema.memoria_mb(tiny) * 2**20 / len(tiny)
+    maior = pares.idxmax() if len(pares) else None
+    return {
+        "linhas": linhas,
+        "fator": linhas / len(market) if len(market) else 0.0,
+        "memoria_mb": linhas * bytes_linha / 2**20,
+        "sku_mais_pesado": maior,
+        "linhas_sku_mais_pesado": int(pares.max()) if len(pares) else 0,
+    }
+
+
+def agregar_tiny(tiny: pd.DataFrame) -> pd.DataFrame:
+    """Itens do Tiny somados no grão dos marketplaces: sku_id, ano, mes."""
+    emissao = pd.to_datetime(tiny["data_emissao"].astype(str).str[:10], format="%Y-%m-%d", errors="coerce")
+    valor = "valor_total_item" if "valor_total_item" in tiny.columns else "valor_total"
+    base = pd.DataFrame({
+        "sku_id": tiny["sku_id"],
+        "ano": emissao.dt.year,
+        "mes": emissao.dt.month,
+        "quantidade": pd.to_numeric(tiny["quantidade"], errors="coerce"),
+        "valor": pd.to_numeric(tiny[valor], errors="coerce"),
+        "id_nota": tiny["id_nota"] if "id_nota" in tiny.columns else pd.NA,
+    })
+    base = esquema.compactar(base.dropna(subset=["sku_id"]))
+    return base.groupby(["sku_id", "ano", "mes"], as_index=False, observed=True).agg(
+        vendas_tiny=("quantidade", "sum"),
+        receita_tiny=("valor", "sum"),
+        notas_tiny=("id_nota", "nunique"),
+    )
+
+
+def merge_agregado(market: pd.DataFrame, tiny: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por linha de marketplaces, com o Tiny do mesmo SKU/mês ao lado."""
+    with medir("agregar_tiny"):
+        tiny_mensal = agregar_tiny(tiny)
+    print(f"[INFO] Tiny agregado por SKU/ano/mês: {len(tiny)} -> {len(tiny_mensal)} linhas")
+
+    market = esquema.compactar(market.rename(columns={"valor_total": "valor_total_market"}))
+    with medir("merge"):
+        merged = market.merge(tiny_mensal, on=["sku_id", "ano", "mes"], how="left", validate="many_to_one")
+    merged[["vendas_tiny", "receita_tiny", "notas_tiny"]] = (
+        merged[["vendas_tiny", "receita_tiny", "notas_tiny"]].fillna(0))
+    if "valor_total_market" in merged.columns:
+        merged["receita_total"] = merged["valor_total_market"].fillna(0)
+        merged["faturamento_total_canais"] = merged.groupby("sku_id")["valor_total_market"].transform("sum")
+    return merged
+
+
+def merge_legado(market: pd.DataFrame, tiny: pd.DataFrame) -> pd.DataFrame:
+    """Merge item a item (uma linha por par marketplaces x item do Tiny)."""
+    with medir("merge"):
+        merged = pd.merge(market, tiny, on="sku_id", how="left", suffixes=("_market", "_tiny"))
+
+    # Cria métricas consolidadas
+    if "valor_total_market" in merged.columns:
+        merged["receita_total"] = merged["valor_total_market"].fillna(0)
+    if "valor_total_tiny" in merged.columns:
+        merged["receita_tiny"] = merged["valor_total_tiny"].fillna(0)
+
+    # Fatura total por SKU
+    if "valor_total_market" in merged.columns:
+        merged["faturamento_total_canais"] = merged.groupby("sku_id")["valor_total_market"].transform("sum")
+    return merged
+
+
+ap = argparse.ArgumentParser(description="Cruza marketplaces.csv com o Tiny (tiny_merged.csv) por SKU.")
+ap.add_argument("--modo", choices=["agregado", "legado"], default="agregado",
+                help="agregado: Tiny somado por SKU/ano/mês antes do merge (padrão); "
+                     "legado: merge item a item, que multiplica as linhas")
+ap.add_argument("--formato", choices=saida.FORMATOS, default=None,
+                help="formato de saída (padrão: FORMATO_SAIDA ou csv)")
+args = ap.parse_args()
+
+instrumentacao.iniciar("merge_marketplaces_tiny")
+
 print("[INFO] Carregando bases...")
 
 try:
-    tiny = pd.read_csv(PROC_DIR / "tiny_merged.csv", encoding="utf-8", low_memory=False)
-    market = pd.read_csv(PROC_DIR / "marketplaces.csv", encoding="utf-8", low_memory=False)
+    tiny = saida.ler_tabela(PROC_DIR / "tiny_merged.csv")
+    market = saida.ler_tabela(PROC_DIR / "marketplaces.csv")
 except Exception as e:
     print(f"[ERRO] Falha ao carregar arquivos: {e}")
     exit()
@@ -34,32 +136,38 @@ else:
     print(f"[INFO] Coluna de SKU detectada no Tiny: '{col_sku_tiny}'")
     tiny.rename(columns={col_sku_tiny: "sku"}, inplace=True)
 
-# Normalização de SKU
-tiny["sku"] = tiny["sku"].astype(str).str.strip().str.upper()
-market["sku"] = market["sku"].astype(str).str.strip().str.upper()
+# SKU -> sku_id (dimensão de SKUs): o merge e o groupby usam a chave inteira
+tiny["sku_id"] = dim_sku.codificar(tiny.pop("sku"))
+market["sku_id"] = dim_sku.codificar(market["sku"])
+market["sku"] = dim_sku.decodificar(market["sku_id"])
+dim_sku.salvar()
 
-# Merge
-print("[INFO] Realizando merge por SKU...")
-merged = pd.merge(market, tiny, on="sku", how="left", suffixes=("_market", "_tiny"))
+# Estimativa do merge item a item antes de rodar qualquer coisa
+est = estimar_merge_legado(market, tiny)
+instrumentacao.contar("linhas_estimadas_legado", est["linhas"])
+aviso = "[AVISO]" if est["fator"] > LIMITE_EXPLOSAO else "[INFO]"
+print(f"{aviso} Merge item a item geraria ~{est['linhas']:,} linhas ({est['fator']:.1f}x marketplaces, "
+      f"~{est['memoria_mb']:,.0f} MB)")
+if est["sku_mais_pesado"] is not None and est["fator"] > LIMITE_EXPLOSAO:
+    print(f"        SKU mais pesado: {dim_sku.decodificar(pd.Series([est['sku_mais_pesado']])).iloc[0]} "
+          f"({est['linhas_sku_mais_pesado']:,} linhas)")
+    if args.modo == "legado":
+        print("        Considere --modo agregado (Tiny somado por SKU/ano/mês).")
 
-# Cria métricas consolidadas
-if "valor_total_market" in merged.columns:
-    merged["receita_total"] = merged["valor_total_market"].fillna(0)
-if "valor_total_tiny" in merged.columns:
-    merged["receita_tiny"] = merged["valor_total_tiny"].fillna(0)
-
-# Fatura total por SKU
-if "valor_total_market" in merged.columns:
-    faturamento_canais = merged.groupby("sku")["valor_total_market"].sum().reset_index(name="faturamento_total_canais")
-    merged = merged.merge(faturamento_canais, on="sku", how="left")
+print(f"[INFO] Realizando merge por SKU (modo {args.modo})...")
+if args.modo == "agregado":
+    merged = merge_agregado(market, tiny)
+else:
+    merged = merge_legado(market, tiny)
+merged = merged.drop(columns="sku_id")
 
 # Exporta resultado
-merged.to_csv(OUT_FILE, index=False, encoding="utf-8")
-print(f"Base consolidada salva em: {OUT_FILE}")
+destino = saida.salvar_tabela(merged, OUT_FILE, args.formato)
+print(f"Base consolidada salva em: {destino}")
 print(f"Total de linhas: {len(merged)}")
 
 # Relatório rápido por canal
 if "valor_total_market" in merged.columns and "canal" in merged.columns:
-    resumo = merged.groupby("canal")["valor_total_market"].sum().reset_index()
+    resumo = merged.groupby("canal", observed=True)["valor_total_market"].sum().reset_index()
     print("\nResumo de faturamento por canal:")
     print(resumo.to_string(index=False))
@@ -1,96 +1,51 @@
 import os
 import pandas as pd
-from unidecode import unidecode
-import dateparser
+
+import cache_excel
+import colunas
+import instrumentacao
+from datas import normalizar_datas, relatorio
 
 # === CONFIGURAÇÕES ===
 CAMINHO_ENTRADA = r'dados/csv_marketplaces/mercadolivre.xlsx'
 CAMINHO_SAIDA = r'processados/mercadolivre_agrupado.csv'
 
 # === FUNÇÕES AUXILIARES ===
-def limpar_nome_coluna(col):
-    return unidecode(col).lower().replace(" ", "").replace("(", "").replace(")", "").replace(".", "").replace("-", "").replace("/", "")
-
 def limpar_sku(sku):
     if pd.isna(sku):
         return None
     return str(sku).strip().replace("'", "")
 
-def converter_data_flex(texto):
-    if pd.isna(texto):
-        return None
-    texto = str(texto).strip().lower()
-    if not texto:
+# === LEITURA E LIMPEZA ===
+def carregar(caminho=CAMINHO_ENTRADA):
+    """Planilha limpa (data, sku, produto, vendas, valor_total) ou None se não der para ler."""
+    if not os.path.exists(caminho):
+        print(f"[ERRO] Arquivo não encontrado: {caminho}")
         return None
 
-    # Remove "hs", "hrs", etc.
-    texto = texto.replace("hs.", "").replace("hs", "").replace("hrs.", "").replace("hrs", "").strip()
-
-    # Caso venha "08/10/2025 19:34"
-    if " " in texto and "/" in texto:
-        texto = texto.split()[0]
-
-    # Tenta formato dd/mm/yyyy
-    try:
-        if "/" in texto:
-            dia, mes, ano = texto.split("/")[:3]
-            return f"{int(dia):02d}/{int(mes):02d}/{ano}"
-    except Exception:
-        pass
-
-    # Tenta parsing com linguagem portuguesa
-    try:
-        data = dateparser.parse(texto, languages=['pt'])
-        if data:
-            return data.strftime('%d/%m/%Y')
-    except Exception:
-        pass
-
-    return None
-
-# === PROCESSAMENTO ===
-def main():
-    print("[INFO] Iniciando agrupamento do arquivo Mercado Livre...")
+    # === LER PLANILHA (só as colunas do esquema 'mercadolivre' de colunas.py) ===
+    print("[INFO] Lendo planilha...")
+    proj = colunas.projecao("mercadolivre", cache_excel.colunas_excel(caminho, dtype=str))
 
-    if not os.path.exists(CAMINHO_ENTRADA):
-        print(f"[ERRO] Arquivo não encontrado: {CAMINHO_ENTRADA}")
-        return
+    if proj["faltando"]:
+        print(f"[ERRO] Colunas faltando: {proj['faltando']}")
+        return None
 
-    # === LER PLANILHA ===
-    print("[INFO] Lendo planilha...")
-    df = pd.read_excel(CAMINHO_ENTRADA, dtype=str)
-    print(f"[OK] Planilha carregada com {len(df)} linhas e {len(df.columns)} colunas.")
-
-    # === LIMPAR NOMES DE COLUNAS ===
-    df.columns = [limpar_nome_coluna(c) for c in df.columns]
-
-    # === MAPEAR COLUNAS ===
-    mapa = {
-        'datadavenda': 'data',
-        'sku': 'sku',
-        'titulodoanuncio': 'produto',
-        'unidades': 'vendas',
-        'totalbrl': 'valor_total'
-    }
-
-    colunas_encontradas = [c for c in mapa.keys() if c in df.columns]
-    faltando = [c for c in mapa.keys() if c not in df.columns]
-
-    if faltando:
-        print(f"[ERRO] Colunas faltando: {faltando}")
-        return
+    df = cache_excel.ler_excel(caminho, dtype=str, colunas=proj["usecols"])
+    print(f"[OK] Planilha carregada com {len(df)} linhas e {len(df.columns)} colunas (cache: {cache_excel.relatorio()}).")
 
-    df = df[colunas_encontradas].rename(columns=mapa)
+    df = df.rename(columns=proj["renomear"])
     print(f"[OK] Colunas padronizadas: {list(df.columns)}")
 
     # === LIMPEZA DOS DADOS ===
     print("[INFO] Limpando dados...")
 
-    df['data'] = df['data'].apply(converter_data_flex)
+    df['data'] = normalizar_datas(df['data'])
     df['sku'] = df['sku'].apply(limpar_sku)
     df['vendas'] = pd.to_numeric(df['vendas'], errors='coerce').fillna(0)
     df['valor_total'] = pd.to_numeric(df['valor_total'], errors='coerce').fillna(0.0)
 
+    print(f"[INFO] Datas por estágio: {relatorio()}")
     print("[DEBUG] Amostras de data convertidas:")
     print(df['data'].head(10).to_list())
 
@@ -101,6 +56,15 @@ def main():
 
     if len(df) == 0:
         print("[ERRO] Nenhuma linha válida encontrada. Verifique o formato das datas.")
+        return None
+    return df
+
+# === PROCESSAMENTO ===
+def main():
+    print("[INFO] Iniciando agrupamento do arquivo Mercado Livre...")
+
+    df = carregar()
+    if df is None:
         return
 
     # === AGRUPAMENTO ===
@@ -127,4 +91,5 @@ def main():
 
 # Executar o script
 if __name__ == '__main__':
+    instrumentacao.iniciar("merge_meli")
     main()
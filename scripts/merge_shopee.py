@@ -1,61 +1,93 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+import cache_excel
+import colunas as colunas_esquema
+import dim_sku
+import esquema
+import instrumentacao
+from numeros import para_numero
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 SHOPEE_DIR = BASE_DIR / "dados" / "csv_marketplaces" / "shopee"
 OUT_DIR = BASE_DIR / "processados"
 OUT_DIR.mkdir(exist_ok=True)
 
-print(f"[INFO] Lendo arquivos da Shopee em {SHOPEE_DIR}")
-
-# === Lista todos os .xlsx nas subpastas (2024, 2025 etc.) ===
-arquivos = list(SHOPEE_DIR.rglob("*.xlsx"))
-if not arquivos:
-    print("[AVISO] Nenhum arquivo .xlsx encontrado nas pastas da Shopee.")
-    exit()
-
-print(f"[INFO] {len(arquivos)} arquivos encontrados.")
-
-dados = []
-
-for file in arquivos:
+CHAVES = ["sku", "produto", "ano", "mes", "canal"]
+
+
+def mapear_colunas(colunas):
+    """
+    Identifica colunas relevantes (esquema 'shopee' de colunas.py).
+    Devolve {campo: índice da coluna} ou None se faltar alguma essencial.
+    """
+    col_mapeadas = colunas_esquema.indices("shopee", colunas)
+    if set(colunas_esquema.compilar("shopee")["obrigatorias"]) - set(col_mapeadas):
+        return None
+    return col_mapeadas
+
+
+def ler_colunas(file):
+    """
+    Lê só as colunas mapeadas da primeira aba. Se a aba já estiver no cache
+    de planilhas (cache_excel, ex. convertida pelo tratamento_marketplaces),
+    lê só essas colunas do Parquet; senão usa o openpyxl em modo read-only
+    (streaming das linhas, sem converter a aba inteira), que é o caminho de
+    todo export novo.
+    """
+    nomes = cache_excel.colunas_em_cache(file)
+    if nomes is not None:
+        col_mapeadas = mapear_colunas([str(c).strip() for c in nomes])
+        if col_mapeadas is None:
+            return None
+        df = cache_excel.ler_cache(file, colunas=[nomes[i] for i in col_mapeadas.values()])
+        if df is not None:
+            df.columns = list(col_mapeadas)
+            return df
+    return ler_colunas_openpyxl(file)
+
+
+def ler_colunas_openpyxl(file):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
     try:
-        df = pd.read_excel(file, engine="openpyxl")
-
-        # Verifica se contém as colunas esperadas
-        colunas = df.columns.str.strip()
-
-        # Identifica colunas relevantes (com tolerância a variações de nome)
-        col_mapeadas = {
-            "sku": None,
-            "produto": None,
-            "vendas": None,
-            "valor_total": None,
-            "data": None
-        }
-
-        for c in colunas:
-            c_lower = c.lower()
-            if "sku" in c_lower and "principal" in c_lower:
-                col_mapeadas["sku"] = c
-            elif c_lower.startswith("sku") and not col_mapeadas["sku"]:
-                col_mapeadas["sku"] = c
-            elif "produto" in c_lower:
-                col_mapeadas["produto"] = c
-            elif "quantidade" in c_lower:
-                col_mapeadas["vendas"] = c
-            elif "valor total" in c_lower:
-                col_mapeadas["valor_total"] = c
-            elif "data de criação" in c_lower:
-                col_mapeadas["data"] = c
-
-        # Se alguma coluna essencial estiver ausente, pula o arquivo
-        if not all(col_mapeadas.values()):
-            print(f"[AVISO] Colunas principais não encontradas em {file.name}. Pulando.")
-            continue
-
-        df_limpo = df[list(col_mapeadas.values())].copy()
-        df_limpo.columns = ["sku", "produto", "vendas", "valor_total", "data"]
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None) or ()
+        colunas = ["" if c is None else str(c).strip() for c in cabecalho]
+        col_mapeadas = mapear_colunas(colunas)
+        if col_mapeadas is None:
+            return None
+
+        campos, indices = list(col_mapeadas), list(col_mapeadas.values())
+        registros = []
+        for linha in linhas:
+            valores = tuple(linha[i] if i < len(linha) else None for i in indices)
+            if any(v is not None for v in valores):
+                registros.append(valores)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame(registros, columns=campos)
+    # células vazias como NaN, igual ao read_excel
+    return df.where(df.notna(), np.nan)
+
+
+def processar_arquivo(file):
+    """
+    Lê e limpa um workbook e já agrega por sku/produto/ano/mês, para que só
+    o resumo do arquivo volte do processo de trabalho.
+    Devolve (nome, agregado ou None, mensagem).
+    """
+    try:
+        df_limpo = ler_colunas(file)
+        if df_limpo is None:
+            return file.name, None, f"[AVISO] Colunas principais não encontradas em {file.name}. Pulando."
 
         # Extrai ano e mês da coluna de data
         df_limpo["data"] = pd.to_datetime(df_limpo["data"], errors="coerce")
@@ -63,43 +95,74 @@ for file in arquivos:
         df_limpo["mes"] = df_limpo["data"].dt.month
 
         # Limpeza e conversões
-        df_limpo["sku"] = df_limpo["sku"].astype(str).str.strip().str.upper()
+        df_limpo["sku"] = dim_sku.normalizar(df_limpo["sku"])
         df_limpo["produto"] = df_limpo["produto"].astype(str).str.strip()
         df_limpo["vendas"] = pd.to_numeric(df_limpo["vendas"], errors="coerce").fillna(0)
-        df_limpo["valor_total"] = (
-            df_limpo["valor_total"]
-            .astype(str)
-            .str.replace("[^0-9,.-]", "", regex=True)
-            .str.replace(",", ".")
-            .astype(float)
-            .fillna(0)
-        )
+        df_limpo["valor_total"] = para_numero(df_limpo["valor_total"], padrao=0.0)
 
         df_limpo["canal"] = "shopee"
+        df_limpo = esquema.compactar(df_limpo.drop(columns="data"))
 
-        dados.append(df_limpo)
-
-        print(f"[OK] {file.name}: {len(df_limpo)} linhas importadas.")
+        parcial = (df_limpo.groupby(CHAVES, as_index=False, observed=True)
+                   .agg({"vendas": "sum", "valor_total": "sum"}))
+        return file.name, parcial, f"[OK] {file.name}: {len(df_limpo)} linhas importadas."
 
     except Exception as e:
-        print(f"[ERRO] Falha ao ler {file.name}: {e}")
-
-# === Consolidação ===
-if not dados:
-    print("[AVISO] Nenhum dado consolidado.")
-    exit()
-
-df_final = pd.concat(dados, ignore_index=True)
-
-# Agrupar por SKU / Produto / Ano / Mês
-df_grouped = (
-    df_final.groupby(["sku", "produto", "ano", "mes", "canal"], as_index=False)
-    .agg({"vendas": "sum", "valor_total": "sum"})
-)
-df_grouped["valor_unitario_medio"] = df_grouped["valor_total"] / df_grouped["vendas"]
-
-# Salva resultado
-OUT_FILE = OUT_DIR / "shopee_merged.csv"
-df_grouped.to_csv(OUT_FILE, index=False, encoding="utf-8")
-print(f"[OK] Shopee consolidado: {len(df_grouped)} linhas salvas em {OUT_FILE}")
-print(df_grouped.head(10))
+        return file.name, None, f"[ERRO] Falha ao ler {file.name}: {e}"
+
+
+def ler_arquivos(arquivos, workers=1):
+    if workers > 1:
+        print(f"[INFO] Modo paralelo: {workers} processos.")
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            yield from ex.map(processar_arquivo, arquivos)
+    else:
+        for file in arquivos:
+            yield processar_arquivo(file)
+
+
+def main(workers=1):
+    print(f"[INFO] Lendo arquivos da Shopee em {SHOPEE_DIR}")
+
+    # === Lista todos os .xlsx nas subpastas (2024, 2025 etc.) ===
+    arquivos = list(SHOPEE_DIR.rglob("*.xlsx"))
+    if not arquivos:
+        print("[AVISO] Nenhum arquivo .xlsx encontrado nas pastas da Shopee.")
+        return
+
+    print(f"[INFO] {len(arquivos)} arquivos encontrados.")
+
+    dados = []
+    for _, parcial, mensagem in ler_arquivos(arquivos, workers):
+        print(mensagem)
+        if parcial is not None:
+            dados.append(parcial)
+
+    # === Consolidação ===
+    if not dados:
+        print("[AVISO] Nenhum dado consolidado.")
+        return
+
+    df_final = esquema.concatenar(dados, ignore_index=True)
+
+    # Agrupar por SKU / Produto / Ano / Mês (soma dos agregados de cada arquivo)
+    df_grouped = (
+        df_final.groupby(CHAVES, as_index=False, observed=True)
+        .agg({"vendas": "sum", "valor_total": "sum"})
+    )
+    df_grouped["valor_unitario_medio"] = df_grouped["valor_total"] / df_grouped["vendas"]
+
+    # Salva resultado
+    OUT_FILE = OUT_DIR / "shopee_merged.csv"
+    df_grouped.to_csv(OUT_FILE, index=False, encoding="utf-8")
+    print(f"[OK] Shopee consolidado: {len(df_grouped)} linhas salvas em {OUT_FILE}")
+    print(df_grouped.head(10))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Consolida as planilhas mensais da Shopee.")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processos para ler as planilhas (1 = serial; 0 = todos os núcleos)")
+    args = ap.parse_args()
+    instrumentacao.iniciar("merge_shopee")
+    main(workers=args.workers or (os.cpu_count() or 1))
@@ -0,0 +1,145 @@
+"""
+Conversão vetorizada de valores monetários/numéricos exportados pelos canais.
+
+Os relatórios chegam com números em vários formatos ('1.234,56',
+'R$ 1234.56', 'R$\xa01.234,56', '-10,00', 1234.5 já numérico). Em vez de
+limpar célula a célula com .apply, para_numero converte a Series inteira
+com a mesma regra para todos os canais:
+
+- tudo que não for dígito, ',' ou '.' é ignorado (R$, espaços, NBSP...);
+- o número é negativo se o primeiro desses caracteres for '-';
+- o ÚLTIMO separador (',' ou '.') é o decimal e os demais são de milhar:
+  '1.234,56' e '1,234.56' -> 1234.56; '1.234' -> 1.234.
+
+Com decimal="," (formato brasileiro estrito) todo ponto é milhar e a
+vírgula é o decimal, ex. quantidades '1.234' -> 1234.
+
+Os textos viram uma matriz de code points (NumPy) e os dígitos são
+acumulados em int64 por coluna, sem laço em Python por linha. Células longas
+demais (ou com mais de 15 dígitos) seguem por operações de string do pandas.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+LARGURA_MAX = 32   # caracteres por célula no caminho NumPy
+DIGITOS_MAX = 15   # cabe em int64 e é exato em float64
+LOTE = 250_000     # linhas por matriz (limita a memória temporária)
+
+_NAO_NUMERICO = r"[^\d,.\-]"
+_SEP_NAO_FINAL = r"[.,](?=[\d.,]*[.,])"  # separadores antes do último
+_POT10 = 10.0 ** np.arange(DIGITOS_MAX + 1)
+
+
+def para_numero(
+    valores: Union[pd.Series, Iterable[Any]],
+    padrao: float = np.nan,
+    decimal: str = "auto",
+    casas: Optional[int] = None,
+) -> pd.Series:
+    """
+    Converte uma Series (ou lista) para float64.
+
+    padrao: valor para vazios e textos sem número (0.0 ou NaN).
+    decimal: 'auto' (último separador é o decimal), ',' (BR estrito) ou '.'.
+    casas: arredonda o resultado, se informado.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(list(valores), dtype=object)
+    if decimal not in ("auto", ",", "."):
+        raise ValueError(f"decimal inválido: {decimal!r} (use 'auto', ',' ou '.')")
+
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        out = serie.astype("float64")
+    else:
+        # resultado preenchido por posição: o índice pode ter rótulos repetidos (concat)
+        valores = serie.to_numpy(dtype=object)
+        presentes = serie.notna().to_numpy()
+        tipo = pd.api.types.infer_dtype(valores, skipna=True)
+        if tipo in ("string", "empty"):
+            textos = presentes
+        elif tipo in ("mixed", "mixed-integer"):
+            # texto junto com células numéricas (ex. Excel): só o texto passa pelo parser
+            textos = pd.Series(valores, dtype=object).str.len().notna().to_numpy()
+        else:  # números, bool, datas... nativos
+            textos = np.zeros(len(valores), dtype=bool)
+        nativos = presentes & ~textos
+
+        res = np.full(len(valores), np.nan)
+        if nativos.any():
+            res[nativos] = pd.to_numeric(pd.Series(valores[nativos], dtype=object), errors="coerce").to_numpy(
+                dtype="float64", na_value=np.nan)
+        if textos.any():
+            res[textos] = _converter(valores[textos], decimal)
+        out = pd.Series(res, index=serie.index, dtype="float64")
+
+    if not pd.isna(padrao):
+        out = out.fillna(padrao)
+    if casas is not None:
+        out = out.round(casas)
+    return out
+
+
+def _converter(textos: np.ndarray, decimal: str) -> np.ndarray:
+    res = np.full(len(textos), np.nan)
+    tamanhos = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    curtos = np.flatnonzero(tamanhos <= LARGURA_MAX)
+    for ini in range(0, len(curtos), LOTE):
+        idx = curtos[ini:ini + LOTE]
+        res[idx] = _converter_matriz(textos[idx].astype("U"), decimal)
+
+    # longos ou com dígitos demais para o int64
+    resto = np.flatnonzero((tamanhos > LARGURA_MAX) | (np.isnan(res) & (tamanhos > DIGITOS_MAX)))
+    if len(resto):
+        res[resto] = _converter_texto(pd.Series(textos[resto], dtype=object), decimal).to_numpy()
+    return res
+
+
+def _converter_matriz(arr: np.ndarray, decimal: str) -> np.ndarray:
+    n = len(arr)
+    largura = max(arr.dtype.itemsize // 4, 1)
+    cp = arr.view(np.uint32).reshape(n, largura) if arr.dtype.itemsize else np.zeros((n, 1), np.uint32)
+
+    digito = (cp >= 48) & (cp <= 57)
+    virgula, ponto = cp == 44, cp == 46
+    relevante = digito | virgula | ponto | (cp == 45)
+    primeiro = relevante.argmax(axis=1)
+    negativo = cp[np.arange(n), primeiro] == 45
+
+    sep = virgula | ponto if decimal == "auto" else (virgula if decimal == "," else ponto)
+    tem_sep = sep.any(axis=1)
+    ultimo = np.where(tem_sep, largura - 1 - sep[:, ::-1].argmax(axis=1), largura)
+
+    # mantissa inteira com todos os dígitos (Horner, coluna a coluna) e nº de
+    # casas decimais = dígitos depois do último separador
+    mantissa = np.zeros(n, dtype=np.int64)
+    casas = np.zeros(n, dtype=np.int64)
+    for j in range(largura):
+        d = digito[:, j]
+        if not d.any():
+            continue
+        mantissa = np.where(d, mantissa * 10 + (cp[:, j].astype(np.int64) - 48), mantissa)
+        casas += d & (j > ultimo)
+    n_dig = digito.sum(axis=1)
+
+    res = mantissa / _POT10[np.minimum(casas, DIGITOS_MAX)]
+    res[negativo] = -res[negativo]
+    res[(n_dig == 0) | (n_dig > DIGITOS_MAX)] = np.nan
+    return res
+
+
+def _converter_texto(texto: pd.Series, decimal: str) -> pd.Series:
+    limpo = texto.str.replace(_NAO_NUMERICO, "", regex=True)
+    negativo = limpo.str.startswith("-")
+    limpo = limpo.str.replace("-", "", regex=False)
+
+    if decimal == ",":
+        limpo = limpo.str.replace(".", "", regex=False)
+    elif decimal == ".":
+        limpo = limpo.str.replace(",", "", regex=False)
+    limpo = limpo.str.replace(_SEP_NAO_FINAL, "", regex=True).str.replace(",", ".", regex=False)
+
+    num = pd.to_numeric(limpo, errors="coerce")
+    return num.where(~negativo, -num)
@@ -1,94 +1,47 @@
-import xml.etree.ElementTree as ET
+import argparse
+
 import pandas as pd
 from pathlib import Path
-import re
+
+import dim_sku
+import esquema
+import indice_nfe
+import instrumentacao
+import saida
+from numeros import para_numero
+import xml_backend
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 XML_DIR = BASE_DIR / "dados" / "tiktok_certo"
 OUT_DIR = BASE_DIR / "processados"
 OUT_DIR.mkdir(exist_ok=True)
 
-def detect_default_namespace(root_tag: str):
-    if root_tag.startswith("{") and "}" in root_tag:
-        return root_tag[1:].split("}", 1)[0]
-    return None
-
-def strip_namespace_inplace(elem: ET.Element):
-    for e in elem.iter():
-        if '}' in e.tag:
-            e.tag = e.tag.split('}', 1)[1]
-
-def to_float(x):
-    if x is None:
-        return 0.0
-    s = str(x)
-    s = re.sub(r"[^\d,.\-]", "", s).replace(",", ".")
-    try:
-        return float(s)
-    except ValueError:
-        return 0.0
-
-def extract_with_namespace(tree: ET.ElementTree):
-    root = tree.getroot()
-    ns_uri = detect_default_namespace(root.tag)
-    if not ns_uri:
-        return []
-    ns = {"ns": ns_uri}
-    data_node = root.find(".//ns:ide/ns:dhEmi", ns)
-    if (data_node is None) or (data_node.text is None):
-        data_node = root.find(".//ns:ide/ns:dEmi", ns)
-    data = data_node.text[:10] if (data_node is not None and data_node.text) else None
-
-    registros = []
-    for det in root.findall(".//ns:det", ns):
-        prod = det.find("ns:prod", ns)
-        if prod is None:
-            continue
-        sku = prod.findtext("ns:cProd", default=None, namespaces=ns)
-        produto = prod.findtext("ns:xProd", default=None, namespaces=ns)
-        qtd = prod.findtext("ns:qCom", default=None, namespaces=ns)
-        vunit = prod.findtext("ns:vUnCom", default=None, namespaces=ns)
-        vprod = prod.findtext("ns:vProd", default=None, namespaces=ns)
-
-        registros.append({
-            "sku": (str(sku).strip().upper() if sku else None),
-            "produto": produto,
-            "vendas": to_float(qtd),
-            "valor_total": to_float(vprod),
-            "valor_unitario": to_float(vunit),
-            "ano": int(data[:4]) if data else None,
-            "mes": int(data[5:7]) if data else None,
-            "visualizacoes": 0,
-            "devolucoes": 0,
-            "canal": "tiktok"
-        })
-    return registros
-
-def extract_without_namespace(tree: ET.ElementTree):
-    root = tree.getroot()
-    strip_namespace_inplace(root)
-    data_node = root.find(".//dhEmi")
-    if data_node is None:
-        data_node = root.find(".//dEmi")
-    data = data_node.text[:10] if (data_node is not None and data_node.text) else None
+def extract_registros(root):
+    """
+    Extrai os itens (<det>) de uma NF-e já carregada. As buscas ignoram o
+    namespace (xml_backend), então XMLs com e sem namespace passam pelo mesmo
+    caminho, sem remover namespaces da árvore nem buscar uma segunda vez.
+    """
+    data = xml_backend.campo(root, "dhEmi") or xml_backend.campo(root, "dEmi")
+    data = data[:10] if data else None
 
     registros = []
-    for det in root.findall(".//det"):
-        prod = det.find("prod")
+    for det in xml_backend.findall(root, xml_backend.NFE["det"]):
+        prod = xml_backend.find(det, xml_backend.NFE["prod"])
         if prod is None:
             continue
-        sku = prod.findtext("cProd")
-        produto = prod.findtext("xProd")
-        qtd = prod.findtext("qCom")
-        vunit = prod.findtext("vUnCom")
-        vprod = prod.findtext("vProd")
+        sku = xml_backend.campo(prod, "cProd")
+        produto = xml_backend.campo(prod, "xProd")
+        qtd = xml_backend.campo(prod, "qCom")
+        vunit = xml_backend.campo(prod, "vUnCom")
+        vprod = xml_backend.campo(prod, "vProd")
 
         registros.append({
             "sku": (str(sku).strip().upper() if sku else None),
             "produto": produto,
-            "vendas": to_float(qtd),
-            "valor_total": to_float(vprod),
-            "valor_unitario": to_float(vunit),
+            "vendas": qtd,
+            "valor_total": vprod,
+            "valor_unitario": vunit,
             "ano": int(data[:4]) if data else None,
             "mes": int(data[5:7]) if data else None,
             "visualizacoes": 0,
@@ -97,28 +50,20 @@ def extract_without_namespace(tree: ET.ElementTree):
         })
     return registros
 
-def main():
-    if not XML_DIR.exists():
-        print(f"[ERRO] Pasta não encontrada: {XML_DIR}")
-        return
-
-    files = list(XML_DIR.rglob("*.xml"))
-    print(f"[INFO] Lendo XMLs em: {XML_DIR} | arquivos encontrados: {len(files)}")
-    if not files:
-        print("[AVISO] Nenhum .xml encontrado nessa pasta.")
-        return
+def arquivos():
+    return list(XML_DIR.rglob("*.xml"))
 
+def ler_arquivos(files, nome=None):
+    """Itens das notas (uma linha por <det>), com números e SKU já normalizados (nome: mede a memória)."""
     all_rows = []
     for xml_path in files:
         try:
-            tree = ET.parse(xml_path)
+            root = xml_backend.parse(xml_path)
         except Exception as e:
             print(f"[ERRO] Falha ao abrir {xml_path.name}: {e}")
             continue
 
-        rows = extract_with_namespace(tree)
-        if not rows:
-            rows = extract_without_namespace(tree)
+        rows = extract_registros(root)
 
         if not rows:
             print(f"[AVISO] Sem itens detectados em: {xml_path.name}")
@@ -126,29 +71,67 @@ def main():
             all_rows.extend(rows)
 
     if not all_rows:
-        print("[AVISO] Nenhum dado extraído dos XMLs do TikTok. Verifique estrutura/tags.")
-        return
+        return None
 
     df = pd.DataFrame(all_rows)
+    # textos do XML -> float de uma vez só, na coluna inteira
+    for col in ["vendas", "valor_total", "valor_unitario"]:
+        df[col] = para_numero(df[col], padrao=0.0)
+    df["sku"] = dim_sku.normalizar(df["sku"])
     df = df.dropna(subset=["sku"])
-    df["sku"] = df["sku"].astype(str).str.strip().str.upper()
-
-    # === NOVO BLOCO: CONSOLIDAÇÃO POR SKU / MÊS / ANO ===
+    return esquema.compactar(df, nome)
+
+def agrupar(df):
+    """Consolidação por SKU / produto / ano / mês (a base do tiktok_market.csv)."""
+    chaves = ["sku", "produto", "ano", "mes", "canal"]
+    sem_chave = int(df[chaves].isna().any(axis=1).sum())
+    if sem_chave:
+        print(f"[AVISO] {sem_chave} item(ns) sem produto/ano/mês ficaram fora da consolidação")
     df_grouped = (
-        df.groupby(["sku", "produto", "ano", "mes", "canal"], as_index=False)
+        df.groupby(chaves, as_index=False, observed=True)
           .agg({
               "vendas": "sum",
               "valor_total": "sum"
           })
     )
     df_grouped["valor_unitario_medio"] = df_grouped["valor_total"] / df_grouped["vendas"]
+    return df_grouped
+
+def main(filtros=None):
+    if not XML_DIR.exists():
+        print(f"[ERRO] Pasta não encontrada: {XML_DIR}")
+        return
+
+    files = arquivos()
+    destino = OUT_DIR / "tiktok_market.csv"
+    print(f"[INFO] Lendo XMLs em: {XML_DIR} | arquivos encontrados: {len(files)} | backend XML: {xml_backend.BACKEND}")
+    if filtros:
+        # só as notas que o índice de NF-e aponta (indice_nfe.py)
+        selecionados = {str(fp) for fp in indice_nfe.selecionar(XML_DIR, **filtros)}
+        files = [fp for fp in files if str(fp.resolve()) in selecionados]
+        print(f"[INFO] Seleção pelo índice ({filtros}): {len(files)} arquivo(s)")
+        destino = indice_nfe.caminho_recorte(destino)  # não substitui a base completa
+    if not files:
+        print("[AVISO] Nenhum .xml encontrado nessa pasta.")
+        return
+
+    df = ler_arquivos(files, "tiktok")
+    if df is None:
+        print("[AVISO] Nenhum dado extraído dos XMLs do TikTok. Verifique estrutura/tags.")
+        return
+
+    # === NOVO BLOCO: CONSOLIDAÇÃO POR SKU / MÊS / ANO ===
+    df_grouped = agrupar(df)
 
-    # salva o CSV final já consolidado
-    OUT_FILE = OUT_DIR / "tiktok_market.csv"
-    df_grouped.to_csv(OUT_FILE, index=False, encoding="utf-8")
+    # salva a base final já consolidada (CSV ou Parquet, ver saida.py)
+    OUT_FILE = saida.salvar_tabela(df_grouped, destino)
 
     print(f"[OK] TikTok consolidado: {len(df_grouped)} linhas (por SKU/mês) salvas em {OUT_FILE}")
     print(df_grouped.head(10))
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Consolida as NF-e do TikTok Shop em processados/tiktok_market.csv")
+    indice_nfe.adicionar_argumentos(ap)
+    args = ap.parse_args()
+    instrumentacao.iniciar("parse_xml_tiktok")
+    main(filtros=indice_nfe.filtros_dos_argumentos(args))
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from dateutil import parser as dtparser
 import pandas as pd
 
+import esquema
+import indice_nfe
+import instrumentacao
+import saida
+import xml_backend
+from instrumentacao import medir
+
 
 # ---------- Config ----------
 BASE_DIR = Path(__file__).resolve().parents[1]  # raiz do projeto
@@ -23,6 +37,12 @@ VENDAS_CSV = OUT_DIR / "vendas.csv"
 PRODUTOS_CSV = OUT_DIR / "produtos.csv"
 CLIENTES_CSV = OUT_DIR / "clientes.csv"
 MERGED_CSV = OUT_DIR / "tiny_merged.csv"
+MANIFEST_DB = OUT_DIR / "tiny_manifest.db"  # XMLs já processados + linhas geradas
+
+CHUNK_SIZE = 256  # arquivos por tarefa no modo paralelo
+# versão da extração gravada no manifesto: suba ao mudar o que os extratores
+# produzem (ou corrigir um erro de leitura) para os XMLs em cache serem relidos
+VERSAO_PARSER = 1
 
 
 # ---------- Helpers XML ----------
@@ -30,16 +50,13 @@ WILDCARD = "{*}"  # permite ignorar namespaces em buscas
 
 def ftext(elem: ET.Element, path: str, default: Optional[str] = None) -> Optional[str]:
     """
-    findtext com wildcard de namespace.
+    findtext com wildcard de namespace (via xml_backend: XPath compilado no lxml).
     path ex: './/{*}infNFe/{*}ide/{*}dhEmi'
     """
-    if elem is None:
-        return default
-    val = elem.findtext(path)
-    return val if val is not None else default
+    return xml_backend.findtext(elem, path, default)
 
 def find(elem: ET.Element, path: str) -> Optional[ET.Element]:
-    return elem.find(path) if elem is not None else None
+    return xml_backend.find(elem, path)
 
 def first_nonempty(*vals: Optional[str]) -> Optional[str]:
     for v in vals:
@@ -179,7 +196,7 @@ def parse_items(root: ET.Element, id_nota: Optional[str]) -> List[Dict[str, Any]
         return []
 
     items = []
-    for det in infNFe.findall(f".//{WILDCARD}det"):
+    for det in xml_backend.findall(infNFe, f".//{WILDCARD}det"):
         prod = find(det, f".//{WILDCARD}prod")
         imposto = find(det, f".//{WILDCARD}imposto")
         icms = find(imposto, f".//{WILDCARD}ICMS") if imposto is not None else None
@@ -203,12 +220,12 @@ def parse_items(root: ET.Element, id_nota: Optional[str]) -> List[Dict[str, Any]
     return items
 
 
+@medir("parse_xml_file")
 def parse_xml_file(path: Path) -> Dict[str, Any]:
     """
     Retorna dicionários: header, customer, items(list)
     """
-    tree = ET.parse(path)
-    root = tree.getroot()
+    root = xml_backend.parse(path)
 
     header = parse_header(root)
     cid = header.get("id_nota")
@@ -218,6 +235,233 @@ def parse_xml_file(path: Path) -> Dict[str, Any]:
     return {"header": header, "customer": customer, "items": items}
 
 
+# ---------- Extrator em passada única (iterparse) ----------
+# Campos por seção (nome local das tags). Cada seção guarda só a primeira
+# ocorrência de cada tag, como o findtext('.//{*}tag') das funções acima,
+# mas o documento é percorrido uma única vez.
+SECTIONS = {
+    "ide": {"nNF", "serie", "mod", "dhEmi", "dEmi"},
+    "emit": {"CNPJ", "xNome"},
+    "dest": {"CPF", "CNPJ", "xNome"},
+    "enderDest": {"xLgr", "nro", "xBairro", "xMun", "UF", "CEP"},
+    "ICMSTot": {"vNF", "vProd", "vFrete", "vICMS", "vIPI", "vDesc"},
+}
+PROD_FIELDS = {"cProd", "xProd", "NCM", "CFOP", "qCom", "vUnCom", "vProd"}
+ICMS_FIELDS = {"CST", "pICMS"}
+
+
+@medir("extract_nfe_stream")
+def extract_nfe_stream(path: Path) -> Dict[str, Any]:
+    """
+    Mesmo resultado de parse_xml_file (header, customer, items), mas com um
+    único iterparse: despacha pelo nome local da tag e preenche os registros
+    durante a varredura, sem as buscas './/{*}...' repetidas por campo.
+    No lxml o custo por evento em Python supera o do parse em C; lá só os
+    <det> são percorridos (ver _extract_nfe_lxml).
+    """
+    if xml_backend.BACKEND == "lxml":
+        return _extract_nfe_lxml(path)
+
+    stack: List[str] = []
+    # seções abertas no momento: (profundidade, nome, campos capturados, tags aceitas)
+    open_secs: List[Tuple[int, str, Dict[str, str], set]] = []
+    secs: Dict[str, Dict[str, str]] = {}
+    pag: Dict[str, str] = {}
+
+    inf_depth = 0
+    inf_done = False
+    id_nota = None
+
+    raw_items: List[Dict[str, str]] = []
+    det: Dict[str, str] = {}
+    det_depth = 0
+    det_seen: set = set()
+    imposto_depth = 0
+
+    for event, elem in xml_backend.iterparse(path, events=("start", "end")):
+        tag = elem.tag
+        local = tag[tag.rfind("}") + 1:]
+
+        if event == "start":
+            stack.append(local)
+            depth = len(stack)
+            if not inf_depth:
+                # './/{*}infNFe' a partir da raiz: a própria raiz não conta
+                if local == "infNFe" and not inf_done and depth > 1:
+                    inf_depth = depth
+                    id_nota = elem.get("Id")
+                continue
+
+            if local in SECTIONS:
+                if local in secs:
+                    continue
+                if local == "enderDest" and not any(name == "dest" for _, name, _, _ in open_secs):
+                    continue
+                if local == "ICMSTot" and stack[-2] != "total":
+                    continue
+                secs[local] = {}
+                open_secs.append((depth, local, secs[local], SECTIONS[local]))
+            elif local == "det":
+                if not det_depth:
+                    det, det_depth, det_seen, imposto_depth = {}, depth, set(), 0
+            elif det_depth and local not in det_seen:
+                if local == "prod":
+                    det_seen.add(local)
+                    open_secs.append((depth, local, det, PROD_FIELDS))
+                elif local == "imposto":
+                    det_seen.add(local)
+                    imposto_depth = depth
+                elif local == "ICMS" and imposto_depth:
+                    det_seen.add(local)
+                    open_secs.append((depth, local, det, ICMS_FIELDS))
+            continue
+
+        # event == "end"
+        depth = len(stack)
+        if inf_depth:
+            # findtext devolve "" para tag presente sem texto
+            text = elem.text if elem.text is not None else ""
+            for _, _, target, fields in open_secs:
+                if local in fields and local not in target:
+                    target[local] = text
+            if local == "tPag":
+                if stack[-3:-1] == ["pag", "detPag"]:
+                    pag.setdefault("detPag", text)
+                elif stack[-2] == "pag":
+                    pag.setdefault("pag", text)
+
+            while open_secs and open_secs[-1][0] == depth:
+                open_secs.pop()
+            if depth == imposto_depth:
+                imposto_depth = 0
+            if depth == det_depth:
+                raw_items.append(det)
+                det_depth = 0
+                elem.clear()
+            if depth == inf_depth:
+                inf_depth = 0
+                inf_done = True
+        stack.pop()
+
+    if id_nota and id_nota.startswith("NFe"):
+        id_nota = id_nota.replace("NFe", "")
+
+    ide = secs.get("ide", {})
+    emit = secs.get("emit", {})
+    dest = secs.get("dest", {})
+    ender = secs.get("enderDest", {})
+    total = secs.get("ICMSTot", {})
+
+    header = {
+        "id_nota": id_nota,
+        "modelo": ide.get("mod"),
+        "serie": ide.get("serie"),
+        "numero_nota": ide.get("nNF"),
+        "data_emissao": to_date_iso(first_nonempty(ide.get("dhEmi"), ide.get("dEmi"))),
+        "cnpj_emitente": emit.get("CNPJ"),
+        "nome_emitente": emit.get("xNome"),
+        "cpf_cliente": dest.get("CPF"),
+        "cnpj_cliente": dest.get("CNPJ"),
+        "valor_total": to_float(total.get("vNF")),
+        "valor_produtos": to_float(total.get("vProd")),
+        "valor_frete": to_float(total.get("vFrete")),
+        "valor_icms": to_float(total.get("vICMS")),
+        "valor_ipi": to_float(total.get("vIPI")),
+        "valor_desconto": to_float(total.get("vDesc")),
+        "forma_pgto": first_nonempty(pag.get("detPag"), pag.get("pag")),
+    }
+
+    customer = {
+        "id_nota": id_nota,
+        "nome_cliente": dest.get("xNome"),
+        "cpf_cnpj": first_nonempty(dest.get("CPF"), dest.get("CNPJ")),
+        "endereco": ender.get("xLgr"),
+        "numero": ender.get("nro"),
+        "bairro": ender.get("xBairro"),
+        "cidade": ender.get("xMun"),
+        "uf": ender.get("UF"),
+        "cep": ender.get("CEP"),
+    }
+
+    items = [_item(id_nota, d) for d in raw_items]
+    return {"header": header, "customer": customer, "items": items}
+
+
+def _item(id_nota: Optional[str], d: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "id_nota": id_nota,
+        "codigo_produto": d.get("cProd"),
+        "nome_produto": d.get("xProd"),
+        "ncm": d.get("NCM"),
+        "cfop": d.get("CFOP"),
+        "quantidade": to_float(d.get("qCom")),
+        "valor_unitario": to_float(d.get("vUnCom")),
+        "valor_total_item": to_float(d.get("vProd")),
+        "cst_icms": d.get("CST"),
+        "aliquota_icms": to_float(d.get("pICMS")),
+    }
+
+
+def _first_fields(elem: Any, fields: set, target: Dict[str, str]) -> None:
+    """Primeira ocorrência de cada campo na subárvore (texto '' se vazio, como o findtext)."""
+    for e in elem.iter():
+        tag = e.tag
+        if not isinstance(tag, str):  # comentários / instruções de processamento
+            continue
+        local = tag[tag.rfind("}") + 1:]
+        if local in fields and local not in target:
+            target[local] = e.text if e.text is not None else ""
+
+
+def _extract_nfe_lxml(path: Path) -> Dict[str, Any]:
+    """
+    Versão lxml do extrator: o iterparse só devolve o fim de cada <det>
+    (filtro de tag em C), cada item é lido da sua subárvore e descartado; o
+    cabeçalho sai do que sobra da árvore (pequena) com parse_header.
+    """
+    eventos = xml_backend.iterparse(path, events=("end",), tag=f"{WILDCARD}det")
+    raw_items: List[Dict[str, str]] = []
+    lido = None
+    for _, det in eventos:
+        # mesmos <det> do extrator por eventos: dentro do infNFe, sem <det> aninhado
+        dentro = False
+        for anc in det.iterancestors():
+            nome = anc.tag[anc.tag.rfind("}") + 1:]
+            if nome in ("det", "infNFe"):
+                dentro = nome == "infNFe"
+                break
+        if not dentro:
+            continue
+
+        d: Dict[str, str] = {}
+        prod = next(det.iter(f"{WILDCARD}prod"), None)
+        if prod is not None:
+            _first_fields(prod, PROD_FIELDS, d)
+        imposto = next(det.iter(f"{WILDCARD}imposto"), None)
+        icms = next(imposto.iter(f"{WILDCARD}ICMS"), None) if imposto is not None else None
+        if icms is not None:
+            _first_fields(icms, ICMS_FIELDS, d)
+        raw_items.append(d)
+
+        # itens já lidos saem da árvore (o último fica, vazio)
+        det.clear()
+        if lido is not None:
+            lido.getparent().remove(lido)
+        lido = det
+
+    root = eventos.root
+    header = parse_header(root)
+    id_nota = header.get("id_nota")
+    return {"header": header, "customer": parse_customer(root, id_nota),
+            "items": [_item(id_nota, d) for d in raw_items]}
+
+
+EXTRACTORS = {
+    "stream": extract_nfe_stream,  # padrão: passada única
+    "dom": parse_xml_file,         # caminho de compatibilidade (ElementTree + find)
+}
+
+
 # ---------- Pipeline ----------
 def collect_xml_files() -> List[Path]:
     files: List[Path] = []
@@ -226,45 +470,306 @@ def collect_xml_files() -> List[Path]:
             files += sorted(d.rglob("*.xml"))
     return files
 
-def run():
-    xml_files = collect_xml_files()
-    if not xml_files:
-        print("[parse_xml_tiny] Nenhum XML encontrado em dados/xml_tiny/{2024,2025}.")
-        sys.exit(0)
 
-    print(f"[parse_xml_tiny] Encontrados {len(xml_files)} arquivos XML.")
+def append_row(batch: Dict[str, List[Any]], row: Dict[str, Any]) -> None:
+    """
+    Acrescenta um registro (dict) a um lote colunar {coluna: [valores]}.
+    """
+    for k, v in row.items():
+        batch.setdefault(k, []).append(v)
+
 
-    headers: List[Dict[str, Any]] = []
-    customers: List[Dict[str, Any]] = []
-    items_all: List[Dict[str, Any]] = []
+def extend_batch(batch: Dict[str, List[Any]], other: Dict[str, List[Any]]) -> None:
+    for k, vals in other.items():
+        batch.setdefault(k, []).extend(vals)
 
+
+def parse_chunk(paths: List[Path], extractor: str = "stream") -> Dict[str, Any]:
+    """
+    Processa um bloco de arquivos e devolve lotes colunares (headers,
+    customers, items) em vez de listas de dicts por linha. No modo paralelo
+    é o worker de cada processo, o que reduz o custo de serialização; no
+    modo serial recebe a lista inteira.
+    """
+    extract = EXTRACTORS[extractor]
+    headers: Dict[str, List[Any]] = {}
+    customers: Dict[str, List[Any]] = {}
+    items: Dict[str, List[Any]] = {}
+    files: List[str] = []      # arquivos válidos, na ordem das linhas
+    n_items: List[int] = []    # itens gerados por cada arquivo válido
+    no_id: List[str] = []      # arquivos lidos mas sem id_nota
+    failed: List[str] = []     # arquivos com erro de leitura
     skipped = 0
 
-    for fp in xml_files:
+    for fp in paths:
         try:
-            parsed = parse_xml_file(fp)
+            parsed = extract(fp)
             h = parsed["header"]
-            c = parsed["customer"]
-            it = parsed["items"]
 
             # validação mínima: precisa ter id_nota
             if not h.get("id_nota"):
                 skipped += 1
+                no_id.append(str(fp))
                 continue
 
-            headers.append(h)
-            customers.append(c)
-            items_all.extend(it)
+            append_row(headers, h)
+            append_row(customers, parsed["customer"])
+            for it in parsed["items"]:
+                append_row(items, it)
+            files.append(str(fp))
+            n_items.append(len(parsed["items"]))
 
         except Exception:
             skipped += 1
+            failed.append(str(fp))
             print(f"[WARN] Falha ao ler {fp.name}")
             traceback.print_exc()
 
+    return {
+        "headers": headers, "customers": customers, "items": items,
+        "files": files, "n_items": n_items, "no_id": no_id, "failed": failed,
+        "skipped": skipped,
+    }
+
+
+def empty_result() -> Dict[str, Any]:
+    return {
+        "headers": {}, "customers": {}, "items": {},
+        "files": [], "n_items": [], "no_id": [], "failed": [], "skipped": 0,
+    }
+
+
+def merge_result(out: Dict[str, Any], res: Dict[str, Any]) -> None:
+    """
+    Junta o resultado de um bloco (parse_chunk) ao acumulado, na ordem.
+    """
+    for key in ("headers", "customers", "items"):
+        extend_batch(out[key], res[key])
+    for key in ("files", "n_items", "no_id", "failed"):
+        out[key].extend(res[key])
+    out["skipped"] += res["skipped"]
+
+
+def split_by_file(res: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, List[Any]]]]:
+    """
+    Fatia os lotes colunares de um resultado em lotes por arquivo, usando
+    files/n_items como limites: {caminho: {"headers", "customers", "items"}}.
+    """
+    out: Dict[str, Dict[str, Dict[str, List[Any]]]] = {}
+    pos = 0
+    for i, (fp, n) in enumerate(zip(res["files"], res["n_items"])):
+        out[fp] = {
+            "headers": {k: v[i:i + 1] for k, v in res["headers"].items()},
+            "customers": {k: v[i:i + 1] for k, v in res["customers"].items()},
+            "items": {k: v[pos:pos + n] for k, v in res["items"].items()},
+        }
+        pos += n
+    return out
+
+
+def parse_parallel(xml_files: List[Path], workers: int, chunk_size: int = CHUNK_SIZE,
+                   extractor: str = "stream") -> Dict[str, Any]:
+    """
+    Distribui os arquivos em blocos por um pool de processos. executor.map
+    preserva a ordem dos blocos, então as linhas saem na mesma ordem do modo
+    serial e os CSVs ficam idênticos.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size deve ser >= 1 (recebido {chunk_size})")
+    chunks = [xml_files[i:i + chunk_size] for i in range(0, len(xml_files), chunk_size)]
+
+    out = empty_result()
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for res in ex.map(partial(parse_chunk, extractor=extractor), chunks):
+            merge_result(out, res)
+
+    return out
+
+
+# ---------- Manifesto incremental ----------
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+MANIFEST_COLS = ["caminho", "tamanho", "mtime_ns", "sha1", "extrator", "versao", "status", "linhas"]
+
+
+def open_manifest(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    atuais = [r[1] for r in conn.execute("PRAGMA table_info(arquivos)")]
+    if atuais and atuais != MANIFEST_COLS:
+        # manifesto antigo (sem extrator/versão): não dá para confiar nas linhas
+        print("[parse_xml_tiny] Manifesto com esquema antigo; recriando.")
+        with conn:
+            conn.execute("DROP TABLE arquivos")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS arquivos (
+            caminho   TEXT PRIMARY KEY,
+            tamanho   INTEGER NOT NULL,
+            mtime_ns  INTEGER NOT NULL,
+            sha1      TEXT NOT NULL,
+            extrator  TEXT NOT NULL,     -- stream | dom
+            versao    INTEGER NOT NULL,  -- VERSAO_PARSER de quando foi lido
+            status    TEXT NOT NULL,     -- ok | sem_id | erro
+            linhas    TEXT               -- JSON com os lotes do arquivo (status ok)
+        )
+    """)
+    return conn
+
+
+def plan_incremental(conn: sqlite3.Connection, xml_files: List[Path],
+                     extractor: str = "stream") -> Tuple[List[Path], List[str]]:
+    """
+    Compara os arquivos atuais com o manifesto. Retorna (pendentes, removidos).
+    Arquivos lidos por outro extrator ou outra VERSAO_PARSER (inclusive os que
+    deram erro) voltam a ser lidos. Tamanho+mtime iguais bastam para considerar
+    o arquivo em cache; se algum mudou, o hash do conteúdo decide (ex.: arquivo
+    copiado de novo, mesmo XML).
+    """
+    known = {
+        row[0]: row[1:]
+        for row in conn.execute("SELECT caminho, tamanho, mtime_ns, sha1, extrator, versao FROM arquivos")
+    }
+    pending: List[Path] = []
+    touched = []
+    for fp in xml_files:
+        st = fp.stat()
+        prev = known.get(str(fp))
+        if prev is None or prev[3:] != (extractor, VERSAO_PARSER):
+            pending.append(fp)
+            continue
+        size, mtime_ns, sha1 = prev[:3]
+        if size == st.st_size and mtime_ns == st.st_mtime_ns:
+            continue
+        if size == st.st_size and file_sha1(fp) == sha1:
+            touched.append((st.st_mtime_ns, str(fp)))
+            continue
+        pending.append(fp)
+
+    if touched:
+        with conn:
+            conn.executemany("UPDATE arquivos SET mtime_ns = ? WHERE caminho = ?", touched)
+
+    current = {str(fp) for fp in xml_files}
+    removed = [c for c in known if c not in current]
+    return pending, removed
+
+
+def save_manifest(conn: sqlite3.Connection, res: Dict[str, Any], removed: List[str],
+                  extractor: str = "stream") -> None:
+    """
+    Grava no manifesto os arquivos recém-processados (com suas linhas) e
+    apaga os que sumiram da pasta. Arquivos com erro também são registrados:
+    só voltam a ser lidos quando o conteúdo, o extrator ou a VERSAO_PARSER mudar.
+    """
+    rows = []
+    for fp, batch in split_by_file(res).items():
+        rows.append((fp, "ok", json.dumps(batch, ensure_ascii=False)))
+    rows += [(fp, "sem_id", None) for fp in res["no_id"]]
+    rows += [(fp, "erro", None) for fp in res["failed"]]
+
+    records = []
+    for fp, status, linhas in rows:
+        st = Path(fp).stat()
+        records.append((fp, st.st_size, st.st_mtime_ns, file_sha1(Path(fp)), extractor, VERSAO_PARSER,
+                        status, linhas))
+
+    with conn:
+        conn.executemany("DELETE FROM arquivos WHERE caminho = ?", [(c,) for c in removed])
+        conn.executemany(f"INSERT OR REPLACE INTO arquivos ({', '.join(MANIFEST_COLS)}) "
+                         f"VALUES ({', '.join('?' * len(MANIFEST_COLS))})", records)
+
+
+def load_from_manifest(conn: sqlite3.Connection, xml_files: List[Path]) -> Dict[str, Any]:
+    """
+    Remonta o resultado completo a partir do manifesto, na ordem de xml_files
+    (a mesma do processamento completo, então os CSVs saem idênticos).
+    """
+    cached = {
+        row[0]: row[1:] for row in conn.execute("SELECT caminho, status, linhas FROM arquivos")
+    }
+    out = empty_result()
+    for fp in map(str, xml_files):
+        status, linhas = cached[fp]
+        if status != "ok":
+            out["no_id" if status == "sem_id" else "failed"].append(fp)
+            out["skipped"] += 1
+            continue
+        batch = json.loads(linhas)
+        for key in ("headers", "customers", "items"):
+            extend_batch(out[key], batch[key])
+        out["files"].append(fp)
+        out["n_items"].append(len(next(iter(batch["items"].values()), [])))
+    return out
+
+
+def parse_files(xml_files: List[Path], workers: int, chunk_size: int, extractor: str) -> Dict[str, Any]:
+    if workers > 1:
+        print(f"[parse_xml_tiny] Modo paralelo: {workers} processos, blocos de {chunk_size} arquivos.")
+        return parse_parallel(xml_files, workers, chunk_size, extractor)
+    return parse_chunk(xml_files, extractor)
+
+
+def select_xml_files(xml_files: List[Path], filtros: Dict[str, Any]) -> List[Path]:
+    """Só os XMLs que o índice de NF-e (indice_nfe.py) aponta para os filtros."""
+    selected = {str(fp) for d in RAW_DIRS if d.exists() for fp in indice_nfe.selecionar(d, **filtros)}
+    return [fp for fp in xml_files if str(fp.resolve()) in selected]
+
+
+def run(workers: int = 1, chunk_size: int = CHUNK_SIZE, full: bool = False, extractor: str = "stream",
+        formato: Optional[str] = None, filtros: Optional[Dict[str, Any]] = None):
+    xml_files = collect_xml_files()
+    if not xml_files:
+        print("[parse_xml_tiny] Nenhum XML encontrado em dados/xml_tiny/{2024,2025}.")
+        sys.exit(0)
+
+    print(f"[parse_xml_tiny] Encontrados {len(xml_files)} arquivos XML.")
+    vendas_csv, produtos_csv, clientes_csv, merged_csv = VENDAS_CSV, PRODUTOS_CSV, CLIENTES_CSV, MERGED_CSV
+    if filtros:
+        xml_files = select_xml_files(xml_files, filtros)
+        # recorte: processa só esses arquivos, sem mexer no manifesto do conjunto
+        # completo, e grava em *_recorte.csv (vendas.csv etc. ficam intactos)
+        full = True
+        vendas_csv, produtos_csv, clientes_csv, merged_csv = map(
+            indice_nfe.caminho_recorte, (VENDAS_CSV, PRODUTOS_CSV, CLIENTES_CSV, MERGED_CSV))
+        print(f"[parse_xml_tiny] Seleção pelo índice ({filtros}): {len(xml_files)} arquivo(s).")
+        if not xml_files:
+            sys.exit(0)
+
+    if full:
+        parsed = parse_files(xml_files, workers, chunk_size, extractor)
+    else:
+        conn = open_manifest(MANIFEST_DB)
+        try:
+            pending, removed = plan_incremental(conn, xml_files, extractor)
+            outputs = (VENDAS_CSV, PRODUTOS_CSV, CLIENTES_CSV)
+            if (not pending and not removed and all(p.exists() for p in outputs)
+                    and saida.existe(MERGED_CSV, formato)):
+                print("[parse_xml_tiny] Nenhum XML novo ou alterado; CSVs já estão atualizados.")
+                return
+
+            print(f"[parse_xml_tiny] Incremental: {len(pending)} novo(s)/alterado(s), "
+                  f"{len(xml_files) - len(pending)} em cache, {len(removed)} removido(s).")
+            if pending:
+                save_manifest(conn, parse_files(pending, workers, chunk_size, extractor), removed, extractor)
+            else:
+                save_manifest(conn, empty_result(), removed, extractor)
+            parsed = load_from_manifest(conn, xml_files)
+        finally:
+            conn.close()
+
+    skipped = parsed["skipped"]
+
     # DataFrames
-    df_vendas = pd.DataFrame(headers).drop_duplicates(subset=["id_nota"])
-    df_clientes = pd.DataFrame(customers).drop_duplicates(subset=["id_nota", "cpf_cnpj"])
-    df_produtos = pd.DataFrame(items_all)
+    df_vendas = pd.DataFrame(parsed["headers"]).drop_duplicates(subset=["id_nota"])
+    df_clientes = pd.DataFrame(parsed["customers"]).drop_duplicates(subset=["id_nota", "cpf_cnpj"])
+    df_produtos = esquema.compactar(pd.DataFrame(parsed["items"]), "produtos")
+    df_clientes = esquema.compactar(df_clientes, "clientes")
 
     # Ordenações úteis
     if "data_emissao" in df_vendas.columns:
@@ -272,24 +777,49 @@ def run():
         df_vendas = df_vendas.sort_values("data_emissao")
 
     # Salvar CSVs individuais
-    df_vendas.to_csv(VENDAS_CSV, index=False, encoding="utf-8")
-    df_clientes.to_csv(CLIENTES_CSV, index=False, encoding="utf-8")
-    df_produtos.to_csv(PRODUTOS_CSV, index=False, encoding="utf-8")
+    df_vendas.to_csv(vendas_csv, index=False, encoding="utf-8")
+    df_clientes.to_csv(clientes_csv, index=False, encoding="utf-8")
+    df_produtos.to_csv(produtos_csv, index=False, encoding="utf-8")
 
     # Merge nível item: (produtos ⟂ vendas ⟂ clientes)
-    merged = df_produtos.merge(df_vendas, on="id_nota", how="left", suffixes=("", "_venda"))
-    merged = merged.merge(df_clientes, on="id_nota", how="left", suffixes=("", "_cliente"))
+    with medir("merge"):
+        merged = df_produtos.merge(df_vendas, on="id_nota", how="left", suffixes=("", "_venda"))
+        merged = merged.merge(df_clientes, on="id_nota", how="left", suffixes=("", "_cliente"))
+    instrumentacao.contar("linhas_tiny_merged", len(merged))
 
-    merged.to_csv(MERGED_CSV, index=False, encoding="utf-8")
+    merged_path = saida.salvar_tabela(merged, merged_csv, formato)
 
     print(f"[parse_xml_tiny] OK!")
-    print(f" - vendas:      {VENDAS_CSV}")
-    print(f" - produtos:    {PRODUTOS_CSV}")
-    print(f" - clientes:    {CLIENTES_CSV}")
-    print(f" - tiny_merged: {MERGED_CSV}")
+    print(f" - vendas:      {vendas_csv}")
+    print(f" - produtos:    {produtos_csv}")
+    print(f" - clientes:    {clientes_csv}")
+    print(f" - tiny_merged: {merged_path}")
     if skipped:
         print(f"[parse_xml_tiny] Aviso: {skipped} arquivo(s) foram pulados por erro ou falta de id_nota.")
 
 
+def inteiro_positivo(valor: str) -> int:
+    n = int(valor)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"precisa ser >= 1 (recebido {valor})")
+    return n
+
+
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser(description="Extrai vendas/produtos/clientes dos XMLs do Tiny ERP.")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processos para o parsing (1 = serial; 0 = todos os núcleos)")
+    ap.add_argument("--chunk-size", type=inteiro_positivo, default=CHUNK_SIZE,
+                    help="arquivos por bloco enviado a cada processo")
+    ap.add_argument("--full", action="store_true",
+                    help="ignora o manifesto e reprocessa todos os XMLs")
+    ap.add_argument("--extrator", choices=sorted(EXTRACTORS), default="stream",
+                    help="stream = iterparse em passada única; dom = parse_header/customer/items")
+    ap.add_argument("--formato", choices=saida.FORMATOS, default=None,
+                    help="formato do tiny_merged (padrão: FORMATO_SAIDA ou csv)")
+    indice_nfe.adicionar_argumentos(ap)
+    args = ap.parse_args()
+    instrumentacao.iniciar("parse_xml_tiny")
+    run(workers=args.workers or (os.cpu_count() or 1), chunk_size=args.chunk_size,
+        full=args.full, extractor=args.extrator, formato=args.formato,
+        filtros=indice_nfe.filtros_dos_argumentos(args))
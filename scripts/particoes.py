@@ -0,0 +1,262 @@
+"""
+Gravação das tabelas consolidadas (dados_gerais, dados_gerais_corrigido)
+partição por partição, com hash de conteúdo e registro do que mudou.
+
+Antes cada execução regravava o arquivo inteiro, e o Power BI (e quem mais
+lê a tabela) recarregava tudo mesmo quando só um canal tinha mudado. Com
+salvar:
+
+- a tabela é dividida em partições canal x ano x mes (as colunas de
+  saida.PARTICOES que existirem) e cada partição ganha uma sha1 do seu
+  conteúdo, como seria gravado em CSV (cabeçalho incluso);
+- os hashes ficam em processados/particoes.db; na próxima execução só as
+  partições novas, alteradas ou removidas são gravadas. Em Parquet isso é
+  literal: só os diretórios canal=/ano=/mes= dessas partições são
+  reescritos. Em CSV (arquivo único) o arquivo só é regravado se alguma
+  partição mudou; senão fica intocado;
+- cada mudança entra na tabela changelog do mesmo banco (execução, tabela,
+  partição, ação, linhas), para quem consome a tabela reprocessar só o que
+  mudou:
+
+    for canal, ano, mes in particoes.mudancas(OUT_FILE, desde=ultima_carga)[["canal", "ano", "mes"]].itertuples(index=False):
+        ...
+
+    python scripts/particoes.py processados/dados_gerais.csv          # changelog da tabela
+    python scripts/particoes.py processados/dados_gerais.csv --ultima # só a última execução
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+import saida
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "processados" / "particoes.db"
+
+PARTICAO_NULA = "__HIVE_DEFAULT_PARTITION__"  # mesmo nome que o pyarrow usa para vazios
+
+Chave = Tuple[str, ...]
+
+
+# ---------- Manifesto ----------
+def _abrir(caminho: Path = DB_PATH) -> sqlite3.Connection:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS particoes (
+            tabela TEXT NOT NULL, chave TEXT NOT NULL, hash TEXT NOT NULL, linhas INTEGER NOT NULL,
+            PRIMARY KEY (tabela, chave)
+        );
+        CREATE TABLE IF NOT EXISTS tabelas (
+            tabela TEXT PRIMARY KEY, colunas TEXT NOT NULL, mtime_ns INTEGER NOT NULL, verificado_ns INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS changelog (
+            execucao TEXT NOT NULL, tabela TEXT NOT NULL, canal TEXT, ano TEXT, mes TEXT,
+            acao TEXT NOT NULL, linhas INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_changelog ON changelog (tabela, execucao);
+    """)
+    return conn
+
+
+def _nome(alvo: Path) -> str:
+    """Tabela no manifesto: caminho físico relativo à raiz (ex. processados/dados_gerais.csv)."""
+    try:
+        return str(alvo.resolve().relative_to(BASE_DIR)).replace("\\", "/")
+    except ValueError:
+        return str(alvo.resolve())
+
+
+def _mtime(alvo: Path) -> int:
+    if not alvo.exists():
+        return 0
+    if alvo.is_dir():
+        return max((f.stat().st_mtime_ns for f in alvo.rglob("*") if f.is_file()), default=0)
+    return alvo.stat().st_mtime_ns
+
+
+# ---------- Partições ----------
+def _chaves(df: pd.DataFrame, nomes: List[str]) -> pd.DataFrame:
+    """Valores de partição como texto ('' para vazio; ano/mes sem '.0')."""
+    out = {}
+    for n in nomes:
+        if n in ("ano", "mes"):
+            s = pd.to_numeric(df[n], errors="coerce").round().astype("Int64").astype("string")
+        else:
+            s = df[n].astype("string")
+        out[n] = s.fillna("")
+    return pd.DataFrame(out, index=df.index)
+
+
+def dividir(df: pd.DataFrame) -> Tuple[List[str], Dict[Chave, pd.DataFrame]]:
+    """(colunas de partição, {chave: linhas da partição}) na ordem em que aparecem."""
+    nomes = [c for c in saida.PARTICOES if c in df.columns]
+    chaves = _chaves(df, nomes)
+    grupos = df.groupby([chaves[n] for n in nomes], sort=False, dropna=False, observed=True).indices
+    return nomes, {(k if isinstance(k, tuple) else (k,)): df.iloc[idx] for k, idx in grupos.items()}
+
+
+def hash_particao(parte: pd.DataFrame) -> str:
+    return hashlib.sha1(parte.to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def _diretorio(alvo: Path, nomes: List[str], chave: Chave) -> Path:
+    return alvo.joinpath(*[f"{n}={quote(v, safe='') if v else PARTICAO_NULA}" for n, v in zip(nomes, chave)])
+
+
+def _gravar_particao(alvo: Path, nomes: List[str], chave: Chave, parte: pd.DataFrame) -> None:
+    """Regrava o diretório de uma partição do dataset Parquet (mesmo layout hive do saida.py)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pasta = _diretorio(alvo, nomes, chave)
+    if pasta.exists():
+        shutil.rmtree(pasta)
+    pasta.mkdir(parents=True)
+    df = saida.tipar(parte).drop(columns=nomes)
+    # mesmo esquema em todas as partições (ver GravadorTabela)
+    for col in df.columns:
+        if col not in saida.COLUNAS_VALOR:
+            df[col] = df[col].astype("string")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), pasta / "part-0.parquet")
+
+
+def _remover_particao(alvo: Path, nomes: List[str], chave: Chave) -> None:
+    pasta = _diretorio(alvo, nomes, chave)
+    if pasta.exists():
+        shutil.rmtree(pasta)
+    # diretórios de nível acima que ficaram vazios
+    for pai in pasta.parents:
+        if pai == alvo or not pai.exists() or any(pai.iterdir()):
+            break
+        pai.rmdir()
+
+
+# ---------- Gravação ----------
+def salvar(df: pd.DataFrame, destino: Path, formato: Optional[str] = None) -> Tuple[Path, pd.DataFrame]:
+    """
+    Grava só o que mudou desde a última execução. Devolve o caminho e as
+    mudanças (colunas canal, ano, mes, acao, linhas; vazio se nada mudou).
+    """
+    formato = saida._formato(formato)
+    alvo = saida.caminho(destino, formato)
+    nomes, partes = dividir(df)
+    if not nomes:  # sem colunas de partição: grava inteira, como antes
+        return saida.salvar_tabela(df, destino, formato), pd.DataFrame(columns=["canal", "ano", "mes", "acao", "linhas"])
+
+    tabela = _nome(alvo)
+    conn = _abrir()
+    try:
+        anteriores = {tuple(c.split("\x1f")): h for c, h in
+                      conn.execute("SELECT chave, hash FROM particoes WHERE tabela = ?", [tabela])}
+        registro = conn.execute("SELECT colunas, mtime_ns FROM tabelas WHERE tabela = ?", [tabela]).fetchone()
+        # arquivo sumiu, foi gravado por outro caminho ou as colunas de partição mudaram: tudo é novo
+        if registro is None or registro != (",".join(nomes), _mtime(alvo)):
+            anteriores = {}
+
+        hashes = {chave: hash_particao(parte) for chave, parte in partes.items()}
+        mudancas = []
+        for chave, h in hashes.items():
+            if chave not in anteriores:
+                mudancas.append((chave, "nova", len(partes[chave])))
+            elif anteriores[chave] != h:
+                mudancas.append((chave, "alterada", len(partes[chave])))
+        mudancas += [(chave, "removida", 0) for chave in anteriores if chave not in hashes]
+
+        if formato == "csv":
+            if mudancas or not alvo.exists():
+                df.to_csv(alvo, index=False, encoding="utf-8")
+        else:
+            saida._exigir_pyarrow()
+            if not anteriores and alvo.exists():  # dataset de outra origem: começa do zero
+                shutil.rmtree(alvo) if alvo.is_dir() else alvo.unlink()
+            alvo.mkdir(parents=True, exist_ok=True)
+            for chave, acao, _ in mudancas:
+                if acao == "removida":
+                    _remover_particao(alvo, nomes, chave)
+                else:
+                    _gravar_particao(alvo, nomes, chave, partes[chave])
+
+        execucao = datetime.now().isoformat(timespec="microseconds")
+        with conn:
+            conn.execute("DELETE FROM particoes WHERE tabela = ?", [tabela])
+            conn.executemany("INSERT INTO particoes VALUES (?, ?, ?, ?)",
+                             [(tabela, "\x1f".join(c), h, len(partes[c])) for c, h in hashes.items()])
+            conn.execute("INSERT OR REPLACE INTO tabelas VALUES (?, ?, ?, ?)",
+                         [tabela, ",".join(nomes), _mtime(alvo), time.time_ns()])
+            conn.executemany("INSERT INTO changelog VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(execucao, tabela, *_por_coluna(nomes, c), acao, n) for c, acao, n in mudancas])
+    finally:
+        conn.close()
+
+    resultado = pd.DataFrame([(*_por_coluna(nomes, c), acao, n) for c, acao, n in mudancas],
+                             columns=["canal", "ano", "mes", "acao", "linhas"])
+    resultado.attrs["particoes"] = len(partes)
+    return alvo, resultado
+
+
+def _por_coluna(nomes: List[str], chave: Chave) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Chave -> (canal, ano, mes), None para as colunas que a tabela não tem."""
+    valores = dict(zip(nomes, chave))
+    return tuple(valores.get(n) for n in ("canal", "ano", "mes"))
+
+
+def resumo(mudancas: pd.DataFrame) -> str:
+    contagem = mudancas["acao"].value_counts()
+    iguais = mudancas.attrs.get("particoes", 0) - int(contagem.get("nova", 0) + contagem.get("alterada", 0))
+    return (f"{contagem.get('alterada', 0)} alterada(s), {contagem.get('nova', 0)} nova(s), "
+            f"{contagem.get('removida', 0)} removida(s), {iguais} igual(is)")
+
+
+# ---------- Consulta ----------
+def mudancas(destino: Path, formato: Optional[str] = None, desde: Optional[str] = None,
+             ultima: bool = False) -> pd.DataFrame:
+    """Changelog da tabela (desde: execução ISO 'aaaa-mm-ddThh:mm:ss[.ffffff]', exclusivo)."""
+    tabela = _nome(saida.caminho(destino, formato))
+    conn = _abrir()
+    try:
+        if ultima:
+            desde = None
+            linha = conn.execute("SELECT MAX(execucao) FROM changelog WHERE tabela = ?", [tabela]).fetchone()
+            sql, params = "tabela = ? AND execucao = ?", [tabela, linha[0]]
+        else:
+            sql, params = "tabela = ? AND execucao > ?", [tabela, desde or ""]
+        return pd.read_sql(f"SELECT execucao, canal, ano, mes, acao, linhas FROM changelog WHERE {sql} "
+                           "ORDER BY execucao, canal, CAST(ano AS INTEGER), CAST(mes AS INTEGER)", conn, params=params)
+    finally:
+        conn.close()
+
+
+def verificado_ns(alvo: Path) -> int:
+    """Quando a tabela foi conferida pela última vez (ns), mesmo que nada tenha sido regravado; 0 se nunca."""
+    if not DB_PATH.exists():
+        return 0
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        linha = conn.execute("SELECT verificado_ns FROM tabelas WHERE tabela = ?", [_nome(Path(alvo))]).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+    return linha[0] if linha else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Mostra o changelog de partições de uma tabela consolidada.")
+    ap.add_argument("tabela", type=Path, help="ex.: processados/dados_gerais.csv")
+    ap.add_argument("--formato", choices=saida.FORMATOS, default=None)
+    ap.add_argument("--desde", default=None, help="só execuções depois desta (aaaa-mm-ddThh:mm:ss[.ffffff])")
+    ap.add_argument("--ultima", action="store_true", help="só a última execução com mudanças")
+    args = ap.parse_args()
+    destino = args.tabela if args.tabela.is_absolute() else BASE_DIR / args.tabela
+    print(mudancas(destino, args.formato, args.desde, args.ultima).to_string(index=False))
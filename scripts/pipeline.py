@@ -0,0 +1,278 @@
+"""
+Orquestrador do pipeline completo (dados/ -> processados/ -> database/).
+
+Cada etapa declara o script, as entradas (globs relativos à raiz do projeto)
+e as saídas. As dependências saem daí: uma etapa depende de quem produz
+alguma das suas entradas. Regras de execução:
+
+- como no make, a etapa é pulada se todas as saídas existem e são mais novas
+  que todas as entradas (o próprio script conta como entrada);
+- etapas independentes (os canais) rodam em paralelo, cada uma no seu
+  processo Python; merges e banco rodam quando as dependências terminam;
+- se uma etapa falha, as que dependem dela não rodam.
+
+Para cada etapa ficam registrados status, tempo de parede, linhas de cada
+saída e o relatório de tempos/memória do script (instrumentacao.py) em
+processados/pipeline_relatorio.json; a saída dos scripts vai para
+processados/logs/<etapa>.log.
+
+Uso:
+    python scripts/pipeline.py                  # roda o que estiver desatualizado
+    python scripts/pipeline.py --forcar         # roda tudo
+    python scripts/pipeline.py --plano          # só mostra o que rodaria
+    python scripts/pipeline.py --apenas merge_shopee merge_meli
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import instrumentacao
+import particoes
+import saida
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = BASE_DIR / "scripts"
+LOG_DIR = BASE_DIR / "processados" / "logs"
+RELATORIO = BASE_DIR / "processados" / "pipeline_relatorio.json"
+
+MAX_PARALELO = 4
+
+# etapa -> script, entradas (globs) e saídas (tabelas de processados/ são
+# declaradas como .csv e valem também no formato Parquet, ver saida.py)
+ETAPAS: Dict[str, Dict[str, Any]] = {
+    "parse_xml_tiny": {
+        "script": "parse_xml_tiny.py",
+        "entradas": ["dados/xml_tiny/2024/**/*.xml", "dados/xml_tiny/2025/**/*.xml"],
+        "saidas": ["processados/vendas.csv", "processados/produtos.csv",
+                   "processados/clientes.csv", "processados/tiny_merged.csv"],
+    },
+    "merge_shopee": {
+        "script": "merge_shopee.py",
+        "entradas": ["dados/csv_marketplaces/shopee/**/*.xlsx"],
+        "saidas": ["processados/shopee_merged.csv"],
+    },
+    "merge_meli": {
+        "script": "merge_meli.py",
+        "entradas": ["dados/csv_marketplaces/mercadolivre.xlsx"],
+        "saidas": ["processados/mercadolivre_agrupado.csv"],
+    },
+    "merge_amazon": {
+        "script": "merge_amazon.py",
+        "entradas": ["dados/csv_marketplaces/amz.csv"],
+        "saidas": ["processados/amazon_merged.csv"],
+    },
+    "padronizador_final": {
+        "script": "padronizador_final.py",
+        "entradas": ["dados/csv_marketplaces/padronizados/*.*"],
+        "saidas": ["processados/dados_gerais_corrigido.csv"],
+    },
+    # dados_gerais direto dos arquivos dos canais, em paralelo (mesma consolidação
+    # do merge_csv_marketplaces.py). Os arquivos são lidos só aqui: o
+    # tratamento_marketplaces.py e o parse_xml_tiktok.py não são etapas, rode-os
+    # à parte quando precisar do marketplaces.csv ou do tiktok_market.csv. Os
+    # scripts cujas funções a ingestão usa também contam como entrada.
+    "ingestao": {
+        "script": "ingestao.py",
+        "entradas": ["processados/tiny_merged.csv", "dados/csv_marketplaces/dados/*.*",
+                     "dados/csv_marketplaces/shopee/*.xlsx", "dados/tiktok_certo/**/*.xml",
+                     "scripts/merge_csv_marketplaces.py", "scripts/tratamento_marketplaces.py",
+                     "scripts/parse_xml_tiktok.py"],
+        "saidas": ["processados/dados_gerais.csv"],
+    },
+    "update_database": {
+        "script": "update_database.py",
+        "entradas": ["processados/vendas.csv", "processados/produtos.csv",
+                     "processados/clientes.csv", "processados/tiny_merged.csv"],
+        "saidas": ["database/tiny_data.db"],
+    },
+    "cubo_mensal": {
+        "script": "cubo_mensal.py",
+        "entradas": ["processados/dados_gerais.csv", "processados/tiny_merged.csv"],
+        "saidas": ["database/cubos.db"],
+    },
+}
+
+
+# ---------- Arquivos ----------
+def _existentes(rel: str) -> List[Path]:
+    """Arquivos de uma entrada/saída; tabelas .csv também no formato Parquet."""
+    caminho = BASE_DIR / rel
+    if caminho.suffix == ".csv" and caminho.parent.name == "processados":
+        return [p for p in (saida.caminho(caminho, f) for f in saida.FORMATOS) if p.exists()]
+    return [Path(p) for p in glob.glob(str(caminho), recursive=True) if Path(p).is_file()]
+
+
+def _mtime(p: Path) -> int:
+    if p.is_dir():  # dataset Parquet: o arquivo mais novo
+        return max((f.stat().st_mtime_ns for f in p.rglob("*") if f.is_file()), default=0)
+    return p.stat().st_mtime_ns
+
+
+def _mtime_saida(p: Path) -> int:
+    """Tabela gravada por particoes.salvar conta como em dia desde a última conferência, mesmo sem regravar."""
+    return max(_mtime(p), particoes.verificado_ns(p))
+
+
+def dependencias(nome: str) -> Set[str]:
+    """Etapas que produzem alguma entrada de 'nome'."""
+    entradas = set(ETAPAS[nome]["entradas"])
+    return {outra for outra, e in ETAPAS.items()
+            if outra != nome and entradas.intersection(e["saidas"])}
+
+
+def motivo_para_rodar(nome: str) -> Optional[str]:
+    """None se a etapa está em dia; senão o motivo (texto curto)."""
+    etapa = ETAPAS[nome]
+    entradas = [p for rel in etapa["entradas"] for p in _existentes(rel)]
+    if not entradas:
+        return None if not dependencias(nome) else "entradas ainda não geradas"
+    mais_nova = max(max(_mtime(p) for p in entradas), _mtime(SCRIPTS_DIR / etapa["script"]))
+    for rel in etapa["saidas"]:
+        saidas = _existentes(rel)
+        if not saidas:
+            return f"sem {rel}"
+        if max(_mtime_saida(p) for p in saidas) < mais_nova:
+            return f"{rel} desatualizada"
+    return None
+
+
+def contar_linhas(rel: str) -> Optional[int]:
+    """Linhas de uma saída (CSV, dataset Parquet ou tabelas do SQLite)."""
+    for p in _existentes(rel):
+        if p.suffix == ".csv":
+            with open(p, "rb") as f:
+                return max(sum(bloco.count(b"\n") for bloco in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
+        if p.suffix == ".parquet":
+            return saida._dataset(p).count_rows()
+        if p.suffix == ".db":
+            conn = sqlite3.connect(p)
+            try:
+                tabelas = [t for (t,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\'")]
+                return sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tabelas)
+            finally:
+                conn.close()
+    return None
+
+
+# ---------- Execução ----------
+def rodar_etapa(nome: str, formato: Optional[str], perfil: Optional[str] = None) -> Dict[str, Any]:
+    etapa = ETAPAS[nome]
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log = LOG_DIR / f"{nome}.log"
+    env = dict(os.environ)
+    if formato:
+        env["FORMATO_SAIDA"] = formato
+    if perfil:
+        env["PERFIL"] = perfil
+
+    inicio = time.perf_counter()
+    with open(log, "w", encoding="utf-8") as f:
+        proc = subprocess.run([sys.executable, str(SCRIPTS_DIR / etapa["script"])],
+                              cwd=BASE_DIR, env=env, stdout=f, stderr=subprocess.STDOUT)
+    duracao = time.perf_counter() - inicio
+
+    resultado = {
+        "status": "ok" if proc.returncode == 0 else "erro",
+        "codigo_saida": proc.returncode,
+        "duracao_s": round(duracao, 3),
+        "linhas": {rel: contar_linhas(rel) for rel in etapa["saidas"]},
+        "log": str(log.relative_to(BASE_DIR)),
+    }
+    # relatório de tempos/memória gravado pelo próprio script (instrumentacao.py)
+    instr = instrumentacao.RELATORIO_DIR / f"{nome}.json"
+    if instr.exists() and instr.stat().st_mtime >= time.time() - duracao - 1:
+        resultado["instrumentacao"] = json.loads(instr.read_text(encoding="utf-8"))
+    return resultado
+
+
+def executar(etapas: Optional[List[str]] = None, forcar: bool = False, paralelo: int = MAX_PARALELO,
+             formato: Optional[str] = None, plano: bool = False,
+             perfil: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    selecionadas = list(etapas or ETAPAS)
+    desconhecidas = [e for e in selecionadas if e not in ETAPAS]
+    if desconhecidas:
+        raise ValueError(f"Etapas desconhecidas: {desconhecidas} (disponíveis: {list(ETAPAS)})")
+
+    # dependências fora da seleção são consideradas prontas
+    deps = {e: dependencias(e).intersection(selecionadas) for e in selecionadas}
+    resultado: Dict[str, Dict[str, Any]] = {}
+    pendentes = set(selecionadas)
+    rodando = {}
+    inicio_total = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(paralelo, 1)) as ex:
+        while pendentes or rodando:
+            for nome in sorted(pendentes):
+                if any(d in pendentes or d in rodando.values() for d in deps[nome]):
+                    continue
+                pendentes.discard(nome)
+                falhas = [d for d in deps[nome] if resultado[d]["status"] in ("erro", "bloqueada")]
+                if falhas:
+                    resultado[nome] = {"status": "bloqueada", "motivo": f"falha em {', '.join(falhas)}"}
+                    print(f"[pipeline] {nome}: bloqueada ({resultado[nome]['motivo']})")
+                    continue
+                motivo = "forçada" if forcar else motivo_para_rodar(nome)
+                if plano:
+                    # no plano, etapas que dependem de algo que rodaria também rodariam
+                    if motivo is None and any(resultado[d]["status"] == "rodaria" for d in deps[nome]):
+                        motivo = "dependência desatualizada"
+                    resultado[nome] = {"status": "rodaria" if motivo else "em dia", "motivo": motivo}
+                    print(f"[pipeline] {nome}: {resultado[nome]['status']}" + (f" ({motivo})" if motivo else ""))
+                    continue
+                if motivo is None:
+                    resultado[nome] = {"status": "em dia", "linhas": {r: contar_linhas(r) for r in ETAPAS[nome]["saidas"]}}
+                    print(f"[pipeline] {nome}: em dia, pulando")
+                    continue
+                print(f"[pipeline] {nome}: iniciando ({motivo})")
+                rodando[ex.submit(rodar_etapa, nome, formato, perfil)] = nome
+
+            if not rodando:
+                continue
+            feitas, _ = wait(list(rodando), return_when=FIRST_COMPLETED)
+            for fut in feitas:
+                nome = rodando.pop(fut)
+                try:
+                    resultado[nome] = fut.result()
+                except Exception as e:
+                    resultado[nome] = {"status": "erro", "motivo": str(e)}
+                r = resultado[nome]
+                linhas = ", ".join(f"{Path(k).name}={v}" for k, v in r.get("linhas", {}).items())
+                print(f"[pipeline] {nome}: {r['status']} em {r.get('duracao_s', 0):.1f}s"
+                      + (f" | {linhas}" if linhas else "") + (f" | log: {r['log']}" if r["status"] == "erro" else ""))
+
+    if not plano:
+        RELATORIO.parent.mkdir(parents=True, exist_ok=True)
+        RELATORIO.write_text(json.dumps({
+            "gerado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duracao_total_s": round(time.perf_counter() - inicio_total, 3),
+            "etapas": {nome: resultado[nome] for nome in selecionadas},
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[pipeline] Relatório salvo em {RELATORIO}")
+    return resultado
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Roda o pipeline completo respeitando as dependências.")
+    ap.add_argument("--apenas", nargs="+", metavar="ETAPA", help=f"etapas a considerar ({', '.join(ETAPAS)})")
+    ap.add_argument("--forcar", action="store_true", help="roda mesmo as etapas em dia")
+    ap.add_argument("--paralelo", type=int, default=MAX_PARALELO,
+                    help=f"etapas simultâneas (padrão {MAX_PARALELO})")
+    ap.add_argument("--formato", choices=saida.FORMATOS, default=None,
+                    help="formato de saída repassado aos scripts (FORMATO_SAIDA)")
+    ap.add_argument("--plano", action="store_true", help="só mostra o que rodaria")
+    ap.add_argument("--perfil", choices=["cprofile", "pyinstrument"], default=None,
+                    help="grava o perfil de cada etapa em processados/perfis/")
+    args = ap.parse_args()
+    res = executar(args.apenas, args.forcar, args.paralelo, args.formato, args.plano, args.perfil)
+    sys.exit(1 if any(r["status"] in ("erro", "bloqueada") for r in res.values()) else 0)
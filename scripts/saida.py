@@ -0,0 +1,247 @@
+"""
+Formato de saída da camada processados/: CSV (padrão) ou Parquet.
+
+Os scripts continuam declarando o caminho CSV de cada tabela
+(ex.: processados/marketplaces.csv). Em Parquet a mesma tabela vira um
+dataset em processados/marketplaces.parquet/, particionado por
+canal/ano/mes (as colunas que existirem) e com tipos explícitos:
+canal categórico, ano/mes int16 e colunas de valores em float64.
+
+Escolha do formato: variável de ambiente FORMATO_SAIDA=csv|parquet ou o
+parâmetro formato das funções. Na leitura, se a tabela não existir no
+formato pedido, usa o outro; em ambos os formatos a tabela volta com os
+tipos compactos de esquema.py.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+import esquema
+
+FORMATOS = ("csv", "parquet")
+FORMATO_PADRAO = os.environ.get("FORMATO_SAIDA", "csv").lower()
+
+PARTICOES = ["canal", "ano", "mes"]
+
+COLUNAS_VALOR = [
+    "vendas", "valor_total", "valor_unitario", "valor_unitario_medio",
+    "quantidade", "valor_total_item", "valor_produtos", "valor_frete",
+    "valor_icms", "valor_ipi", "valor_desconto", "aliquota_icms",
+    "visualizacoes", "devolucoes",
+]
+
+
+def _formato(formato: Optional[str]) -> str:
+    formato = (formato or FORMATO_PADRAO).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída inválido: {formato} (use {FORMATOS})")
+    return formato
+
+
+def _exigir_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Formato parquet requer o pacote pyarrow (pip install pyarrow).") from e
+
+
+def caminho(destino: Path, formato: Optional[str] = None) -> Path:
+    """Caminho físico da tabela no formato escolhido."""
+    destino = Path(destino)
+    if _formato(formato) == "parquet":
+        return destino.with_suffix(".parquet")
+    return destino.with_suffix(".csv")
+
+
+def existe(destino: Path, formato: Optional[str] = None) -> bool:
+    return caminho(destino, formato).exists()
+
+
+def tipar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos explícitos da camada processada: canal categórico, ano/mes inteiros
+    de 16 bits (Int16 quando houver vazios) e valores em float64.
+    """
+    df = df.copy()
+    if "canal" in df.columns:
+        df["canal"] = df["canal"].astype("category")
+    for col in ("ano", "mes"):
+        if col in df.columns:
+            s = pd.to_numeric(df[col], errors="coerce")
+            df[col] = s.astype("Int16") if s.isna().any() else s.astype("int16")
+    for col in COLUNAS_VALOR:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+def salvar_tabela(df: pd.DataFrame, destino: Path, formato: Optional[str] = None) -> Path:
+    """
+    Grava a tabela. CSV: exatamente como antes (utf-8, sem índice).
+    Parquet: dataset particionado por canal/ano/mes, substituindo o anterior.
+    """
+    formato = _formato(formato)
+    alvo = caminho(destino, formato)
+    if formato == "csv":
+        df.to_csv(alvo, index=False, encoding="utf-8")
+        return alvo
+
+    _exigir_pyarrow()
+    particoes = [c for c in PARTICOES if c in df.columns]
+    if alvo.exists():
+        shutil.rmtree(alvo) if alvo.is_dir() else alvo.unlink()
+    df = tipar(df)
+    if particoes:
+        df.to_parquet(alvo, engine="pyarrow", index=False, partition_cols=particoes)
+    else:
+        alvo.mkdir(parents=True)
+        df.to_parquet(alvo / "part-0.parquet", engine="pyarrow", index=False)
+    return alvo
+
+
+class GravadorTabela:
+    """
+    Gravação incremental, bloco a bloco, para quem não quer montar a tabela
+    inteira em memória. CSV: o primeiro bloco cria o arquivo com cabeçalho,
+    os seguintes são anexados. Parquet: cada bloco vira um arquivo novo
+    dentro das partições canal/ano/mes do dataset; as colunas que não são
+    de valor nem de partição vão como texto, para todos os blocos terem o
+    mesmo esquema (um SKU numérico num bloco e alfanumérico no outro).
+
+        with saida.GravadorTabela(OUT_DIR / "x.csv", colunas) as g:
+            for bloco in blocos:
+                g.adicionar(bloco)
+    """
+
+    def __init__(self, destino: Path, colunas: Sequence[str], formato: Optional[str] = None):
+        self.formato = _formato(formato)
+        self.alvo = caminho(destino, self.formato)
+        self.colunas = list(colunas)
+        self.linhas = 0
+        self.blocos = 0
+        if self.formato == "parquet":
+            _exigir_pyarrow()
+        if self.alvo.exists():
+            shutil.rmtree(self.alvo) if self.alvo.is_dir() else self.alvo.unlink()
+
+    def adicionar(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        df = df.reindex(columns=self.colunas)
+        if self.formato == "csv":
+            df.to_csv(self.alvo, index=False, encoding="utf-8",
+                      mode="w" if self.blocos == 0 else "a", header=self.blocos == 0)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            particoes = [c for c in PARTICOES if c in self.colunas]
+            df = tipar(df)
+            for col in df.columns:
+                if col not in COLUNAS_VALOR and col not in particoes:
+                    df[col] = df[col].astype("string")
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            nome = f"part-{self.blocos}-{{i}}.parquet"
+            if particoes:
+                pq.write_to_dataset(tabela, self.alvo, partition_cols=particoes, basename_template=nome)
+            else:
+                self.alvo.mkdir(parents=True, exist_ok=True)
+                pq.write_table(tabela, self.alvo / nome.format(i=0))
+        self.blocos += 1
+        self.linhas += len(df)
+
+    def fechar(self) -> Path:
+        if self.blocos == 0 and self.formato == "csv":
+            # nenhuma linha: ao menos o cabeçalho, como o to_csv de um df vazio
+            pd.DataFrame(columns=self.colunas).to_csv(self.alvo, index=False, encoding="utf-8")
+        return self.alvo
+
+    def __enter__(self) -> "GravadorTabela":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+def colunas_disponiveis(destino: Path, formato: Optional[str] = None) -> List[str]:
+    """Colunas da tabela sem carregar os dados."""
+    alvo = caminho(destino, formato)
+    if _formato(formato) == "csv":
+        return list(pd.read_csv(alvo, nrows=0, encoding="utf-8").columns)
+    return _dataset(alvo).schema.names
+
+
+def ler_tabela(
+    destino: Path,
+    colunas: Optional[Sequence[str]] = None,
+    filtros: Optional[Iterable[tuple]] = None,
+    formato: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Lê a tabela só com as colunas pedidas (as que não existirem são
+    ignoradas). filtros segue o formato do pyarrow, ex.
+    [("canal", "==", "shopee"), ("ano", ">=", 2025)]: em Parquet descarta
+    partições inteiras sem lê-las; em CSV é aplicado depois da leitura.
+    """
+    formato = _formato(formato)
+    if not existe(destino, formato):
+        outro = "csv" if formato == "parquet" else "parquet"
+        if existe(destino, outro):
+            formato = outro
+
+    filtros = list(filtros or [])
+    alvo = caminho(destino, formato)
+    cols = None
+    if colunas is not None:
+        disponiveis = set(colunas_disponiveis(destino, formato))
+        cols = [c for c in colunas if c in disponiveis]
+        # colunas usadas nos filtros precisam ser lidas (CSV)
+        extras = [f[0] for f in filtros if f[0] in disponiveis and f[0] not in cols]
+    else:
+        extras = []
+
+    if formato == "parquet":
+        return _ler_parquet(alvo, cols, filtros)
+
+    usecols = None if cols is None else cols + extras
+    df = pd.read_csv(alvo, encoding="utf-8", low_memory=False, usecols=usecols,
+                     dtype=esquema.dtypes_leitura(usecols or colunas_disponiveis(destino, formato)))
+    df = esquema.compactar(df)
+    for col, op, valor in filtros:
+        df = df[_comparar(df[col], op, valor)]
+    if cols is not None:
+        df = df[cols]
+    return df.reset_index(drop=True) if filtros else df
+
+
+def _dataset(alvo: Path):
+    _exigir_pyarrow()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    # lê só o cabeçalho para saber quais colunas de partição existem
+    nomes = ds.dataset(alvo, format="parquet", partitioning="hive").partitioning
+    campos = {"canal": pa.string(), "ano": pa.int16(), "mes": pa.int16()}
+    presentes = [n for n in (nomes.schema.names if nomes is not None else []) if n in campos]
+    particao = ds.partitioning(pa.schema([(n, campos[n]) for n in presentes]), flavor="hive")
+    return ds.dataset(alvo, format="parquet", partitioning=particao)
+
+
+def _ler_parquet(alvo: Path, cols: Optional[List[str]], filtros: List[tuple]) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+    dataset = _dataset(alvo)
+    expr = pq.filters_to_expression(filtros) if filtros else None
+    tabela = dataset.to_table(columns=cols, filter=expr)
+    return esquema.compactar(tipar(tabela.to_pandas()))
+
+
+def _comparar(serie: pd.Series, op: str, valor):
+    ops = {
+        "==": serie.__eq__, "=": serie.__eq__, "!=": serie.__ne__,
+        "<": serie.__lt__, "<=": serie.__le__, ">": serie.__gt__, ">=": serie.__ge__,
+        "in": serie.isin, "not in": lambda v: ~serie.isin(v),
+    }
+    return ops[op](valor)
@@ -1,9 +1,9 @@
-import pandas as pd
+import cache_excel
 
 CAMINHO = r'dados/csv_marketplaces/mercadolivre.xlsx'
 
 print("[INFO] Lendo planilha para teste...")
-df = pd.read_excel(CAMINHO, dtype=str)
+df = cache_excel.ler_excel(CAMINHO, dtype=str)
 
 # Mostrar colunas disponíveis
 print("\n[INFO] Colunas encontradas:")
@@ -1,13 +1,26 @@
+import argparse
 import pandas as pd
 from pathlib import Path
 import re
 import numpy as np
 
+import cache_excel
+import colunas
+import dialeto_csv
+import esquema
+import instrumentacao
+import saida
+from instrumentacao import medir
+from numeros import para_numero
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 MARKET_DIR = BASE_DIR / "dados" / "csv_marketplaces"
 OUT_DIR = BASE_DIR / "processados"
 OUT_DIR.mkdir(exist_ok=True)
 
+CHUNK_LINHAS = 50_000  # linhas por bloco no modo streaming
+COLUNAS_SAIDA = ["sku", "produto", "vendas", "valor_total", "visualizacoes", "devolucoes", "ano", "mes", "canal"]
+
 #Funções utilitárias
 
 
@@ -22,33 +35,14 @@ def log(msg, tipo="info"):
     print(f"{cores.get(tipo, '')}{prefix} {msg}{cores['end']}")
 
 def normalizar_colunas(df):
-    mapping = {
-        'sku': ['sku', 'SKU', 'Código', 'Cod Produto', 'Product ID', 'product_id', 'cod_produto', 'codigo do produto'],
-        'produto': ['produto', 'Product Name', 'nome', 'Descrição', 'product_title', 'nome do produto'],
-        'vendas': ['vendas', 'Qtde Vendida', 'Quantidade', 'units_sold', 'Qtd', 'qtd vendida'],
-        'valor_total': ['valor_total', 'faturamento', 'receita', 'Valor Total', 'valor_bruto', 'total_revenue', 'total'],
-        'visualizacoes': ['visualizacoes', 'views', 'impressions', 'Visualizações', 'visualizações'],
-        'devolucoes': ['devolucoes', 'returns', 'cancelamentos', 'Cancelamentos']
-    }
-
-    df.columns = df.columns.str.strip()
-    for padrao, variantes in mapping.items():
-        for var in variantes:
-            if var in df.columns:
-                df.rename(columns={var: padrao}, inplace=True)
-                break
-    return df
+    """Nomes padrão pelo esquema 'marketplaces' de colunas.py (as demais colunas ficam)."""
+    return colunas.aplicar(df, "marketplaces", manter=True)
 
+@medir("limpar_valores")
 def limpar_valores(df):
     for col in ['vendas', 'valor_total', 'visualizacoes', 'devolucoes']:
         if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace(r'[^\d,.-]', '', regex=True)
-                .str.replace(',', '.', regex=False)
-            )
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = para_numero(df[col])
     return df
 
 def extrair_ano_mes(nome):
@@ -79,90 +73,232 @@ def identificar_canal(nome):
         return "shopee"
     return None
 
+def abas_validas(nomes, canal):
+    """Abas a ler de uma planilha (no Mercado Livre só a de negócios)."""
+    if canal == "mercadolivre":
+        return [aba for aba in nomes if "negócio" in aba.lower()]
+    return list(nomes)
+
+@medir("carregar_arquivo")
 def carregar_arquivo(arquivo, canal):
     """Le CSV ou XLSX"""
     if arquivo.suffix in [".xlsx", ".xls"]:
-        xls = pd.ExcelFile(arquivo)
         frames = []
-        for aba in xls.sheet_names:
-            aba_nome = aba.lower()
-            if canal == "mercadolivre" and "negócio" not in aba_nome:
-                continue
+        for aba in abas_validas(cache_excel.abas_excel(arquivo), canal):
             try:
-                df = pd.read_excel(xls, sheet_name=aba)
-                frames.append(df)
+                frames.append(ler_aba(arquivo, aba))
             except Exception as e:
                 log(f"Erro na aba {aba}: {e}", "warn")
         if frames:
             return pd.concat(frames, ignore_index=True)
     else:
-        try:
-            df = pd.read_csv(arquivo, sep=None, engine="python", encoding="utf-8", low_memory=False)
-            return df
-        except Exception:
-            # tenta com ponto e vírgula
-            df = pd.read_csv(arquivo, sep=";", encoding="utf-8", low_memory=False)
-            return df
+        # dialeto (separador, encoding, cabeçalho) detectado numa amostra: uma leitura, parser em C,
+        # só das colunas que o esquema conhece
+        proj = colunas.projecao("marketplaces", dialeto_csv.cabecalho(arquivo))
+        return dialeto_csv.ler_csv(arquivo, usecols=proj["usecols"], dtype=proj["dtype"])
     return pd.DataFrame()
 
+def ler_aba(arquivo, aba):
+    """Uma aba; com o cache de planilhas, só as colunas mapeadas saem do Parquet."""
+    if cache_excel.ATIVO:
+        proj = colunas.projecao("marketplaces", cache_excel.colunas_excel(arquivo, sheet_name=aba))
+        return cache_excel.ler_excel(arquivo, sheet_name=aba, colunas=proj["usecols"])
+    return cache_excel.ler_excel(arquivo, sheet_name=aba)
 
-# Leitura e padronização dos dados
+def nomes_cabecalho(cabecalho):
+    """Mesmos nomes que o read_excel daria (vazios -> 'Unnamed: i', repetidos -> 'x.1')."""
+    nomes, vistos = [], {}
+    for i, nome in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if nome is None or str(nome).strip() == "" else str(nome)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+def blocos_excel(arquivo, canal, tamanho):
+    """Lê as abas em lotes de linhas, com o openpyxl em modo read-only."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        for aba in abas_validas(wb.sheetnames, canal):
+            try:
+                linhas = wb[aba].iter_rows(values_only=True)
+                cabecalho = next(linhas, None)
+                if cabecalho is None:
+                    continue
+                # só as colunas que o esquema conhece, já com o nome padrão
+                pos = colunas.indices("marketplaces", nomes_cabecalho(cabecalho))
+                nomes, idx = list(pos), list(pos.values())
+                lote = []
+                for linha in linhas:
+                    if all(v is None for v in linha):
+                        continue
+                    lote.append(tuple(linha[i] if i < len(linha) else None for i in idx))
+                    if len(lote) >= tamanho:
+                        yield pd.DataFrame(lote, columns=nomes, dtype=object)
+                        lote = []
+                if lote:
+                    yield pd.DataFrame(lote, columns=nomes, dtype=object)
+            except Exception as e:
+                log(f"Erro na aba {aba}: {e}", "warn")
+    finally:
+        wb.close()
 
-frames_total = []
+def blocos_csv(arquivo, tamanho):
+    """CSV em pedaços de 'tamanho' linhas (dialeto detectado por dialeto_csv)."""
+    proj = colunas.projecao("marketplaces", dialeto_csv.cabecalho(arquivo))
+    with dialeto_csv.ler_csv(arquivo, usecols=proj["usecols"], dtype=proj["dtype"], chunksize=tamanho) as leitor:
+        yield from leitor
 
-# Pastas
-pasta_dados = MARKET_DIR / "dados"
-pasta_shopee = MARKET_DIR / "shopee"
+def carregar_em_blocos(arquivo, canal, tamanho=CHUNK_LINHAS):
+    """Versão em blocos do carregar_arquivo: memória limitada a um bloco por vez."""
+    if arquivo.suffix == ".xlsx":
+        yield from blocos_excel(arquivo, canal, tamanho)
+    elif arquivo.suffix == ".xls":
+        # formato antigo não tem leitura em streaming; fatia a planilha lida
+        df = carregar_arquivo(arquivo, canal)
+        for ini in range(0, len(df), tamanho):
+            yield df.iloc[ini:ini + tamanho]
+    else:
+        yield from blocos_csv(arquivo, tamanho)
 
-for arquivo in list(pasta_dados.glob("*.*")) + list(pasta_shopee.glob("*.xlsx")):
-    canal = identificar_canal(arquivo.name)
-    if not canal:
-        log(f"Ignorando {arquivo.name} (canal não reconhecido)", "warn")
-        continue
+def padronizar(df, arquivo, canal, nome=None):
+    """
+    Normaliza um bloco (ou arquivo inteiro) para as colunas finais, com os
+    tipos compactos de esquema.py (nome: mede e imprime a memória).
+    """
+    df = normalizar_colunas(df)
+    df = limpar_valores(df)
+    ano, mes = extrair_ano_mes(arquivo.name)
+    df["ano"] = ano
+    df["mes"] = mes
+    df["canal"] = canal
 
-    # ignora arquivos sem ano (ex: guias, campanhas)
-    if not re.search(r'20\d{2}', arquivo.name):
-        log(f"Ignorando {arquivo.name} (sem ano no nome)", "warn")
-        continue
+    # Garante colunas mínimas, numéricas sempre em float
+    for col in ["sku", "produto", "vendas", "valor_total", "visualizacoes", "devolucoes"]:
+        if col not in df.columns:
+            df[col] = np.nan
+    for col in ["vendas", "valor_total", "visualizacoes", "devolucoes"]:
+        df[col] = df[col].astype("float64")
+    return esquema.compactar(df[COLUNAS_SAIDA], nome)
 
-    log(f"Lendo {arquivo.name} ({canal.upper()})", "info")
+def arquivos_entrada():
+    """Arquivos reconhecidos (canal + ano no nome), na ordem de leitura."""
+    pasta_dados = MARKET_DIR / "dados"
+    pasta_shopee = MARKET_DIR / "shopee"
 
-    try:
-        df = carregar_arquivo(arquivo, canal)
-        if df.empty:
-            log(f"{arquivo.name} sem dados válidos", "warn")
+    for arquivo in list(pasta_dados.glob("*.*")) + list(pasta_shopee.glob("*.xlsx")):
+        canal = identificar_canal(arquivo.name)
+        if not canal:
+            log(f"Ignorando {arquivo.name} (canal não reconhecido)", "warn")
             continue
 
-        df = normalizar_colunas(df)
-        df = limpar_valores(df)
-        ano, mes = extrair_ano_mes(arquivo.name)
-        df["ano"] = ano
-        df["mes"] = mes
-        df["canal"] = canal
+        # ignora arquivos sem ano (ex: guias, campanhas)
+        if not re.search(r'20\d{2}', arquivo.name):
+            log(f"Ignorando {arquivo.name} (sem ano no nome)", "warn")
+            continue
 
-        # Garante colunas mínimas
-        for col in ["sku", "produto", "vendas", "valor_total", "visualizacoes", "devolucoes"]:
-            if col not in df.columns:
-                df[col] = np.nan
+        yield arquivo, canal
 
-        frames_total.append(df)
-        log(f"{arquivo.name}: {len(df)} linhas importadas", "ok")
 
-    except Exception as e:
-        log(f"Falha ao processar {arquivo.name}: {e}", "erro")
+# Leitura e padronização dos dados
+
+def ler_padronizado(arquivo, canal, nome=None):
+    """Um arquivo já nas colunas finais (None se não tiver dados); usado também pelo ingestao.py."""
+    df = carregar_arquivo(arquivo, canal)
+    if df.empty:
+        return None
+    return padronizar(df, arquivo, canal, nome=nome)
 
-# Consolidação final
+def consolidar(formato=None):
+    """Modo original: lê tudo, concatena e grava de uma vez."""
+    frames_total = []
 
-if not frames_total:
-    log("Nenhum arquivo foi processado com sucesso.", "erro")
-else:
-    df_final = pd.concat(frames_total, ignore_index=True)
-    colunas_ordenadas = ["sku", "produto", "vendas", "valor_total", "visualizacoes", "devolucoes", "ano", "mes", "canal"]
-    df_final = df_final[colunas_ordenadas]
-    df_final.to_csv(OUT_DIR / "marketplaces.csv", index=False, encoding="utf-8")
+    for arquivo, canal in arquivos_entrada():
+        log(f"Lendo {arquivo.name} ({canal.upper()})", "info")
 
-    log(f"Arquivo consolidado salvo em: {OUT_DIR / 'marketplaces.csv'}", "ok")
+        try:
+            df = ler_padronizado(arquivo, canal, nome=arquivo.name)
+            if df is None:
+                log(f"{arquivo.name} sem dados válidos", "warn")
+                continue
+
+            frames_total.append(df)
+            log(f"{arquivo.name}: {len(df)} linhas importadas", "ok")
+
+        except Exception as e:
+            log(f"Falha ao processar {arquivo.name}: {e}", "erro")
+
+    # Consolidação final
+
+    if not frames_total:
+        log("Nenhum arquivo foi processado com sucesso.", "erro")
+        return None
+
+    df_final = esquema.concatenar(frames_total, ignore_index=True)
+    destino = saida.salvar_tabela(df_final, OUT_DIR / "marketplaces.csv", formato)
+
+    log(f"Arquivo consolidado salvo em: {destino}", "ok")
     log(f"Total de linhas: {len(df_final)}", "info")
+    return df_final.groupby("canal", observed=True).size()
+
+def consolidar_em_blocos(tamanho=CHUNK_LINHAS, formato=None):
+    """
+    Modo streaming: cada bloco é padronizado e gravado na hora, então o pico
+    de memória é de um bloco, não da soma de todos os exports.
+    """
+    linhas_por_canal = {}
+
+    with saida.GravadorTabela(OUT_DIR / "marketplaces.csv", COLUNAS_SAIDA, formato) as gravador:
+        for arquivo, canal in arquivos_entrada():
+            log(f"Lendo {arquivo.name} ({canal.upper()}) em blocos de {tamanho}", "info")
+            antes = gravador.linhas
+
+            try:
+                for bloco in carregar_em_blocos(arquivo, canal, tamanho):
+                    gravador.adicionar(padronizar(bloco, arquivo, canal))
+            except Exception as e:
+                # o que já foi gravado deste arquivo fica (não há como desfazer no CSV)
+                log(f"Falha ao processar {arquivo.name}: {e}", "erro")
+
+            n = gravador.linhas - antes
+            if n == 0:
+                log(f"{arquivo.name} sem dados válidos", "warn")
+                continue
+            linhas_por_canal[canal] = linhas_por_canal.get(canal, 0) + n
+            log(f"{arquivo.name}: {n} linhas importadas", "ok")
+
+    if not linhas_por_canal:
+        log("Nenhum arquivo foi processado com sucesso.", "erro")
+        return None
+
+    log(f"Arquivo consolidado salvo em: {gravador.alvo}", "ok")
+    log(f"Total de linhas: {gravador.linhas}", "info")
+    return pd.Series(linhas_por_canal).sort_index()
+
+def main(streaming=False, tamanho=CHUNK_LINHAS, formato=None):
+    if streaming:
+        por_canal = consolidar_em_blocos(tamanho, formato)
+    else:
+        por_canal = consolidar(formato)
+
+    if por_canal is not None:
+        resumo = por_canal.rename_axis("canal").reset_index(name="linhas")
+        print("\nResumo por canal:\n", resumo)
+
 
-    resumo = df_final.groupby("canal").size().reset_index(name="linhas")
-    print("\nResumo por canal:\n", resumo)
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Consolida os exports dos marketplaces em processados/marketplaces.csv")
+    ap.add_argument("--streaming", action="store_true",
+                    help="lê e grava em blocos (memória limitada), em vez de concatenar tudo")
+    ap.add_argument("--chunk", type=int, default=CHUNK_LINHAS,
+                    help=f"linhas por bloco no modo streaming (padrão {CHUNK_LINHAS})")
+    ap.add_argument("--formato", choices=saida.FORMATOS, default=None,
+                    help="formato de saída (padrão: FORMATO_SAIDA ou csv)")
+    args = ap.parse_args()
+    instrumentacao.iniciar("tratamento_marketplaces")
+    main(streaming=args.streaming, tamanho=args.chunk, formato=args.formato)
@@ -1,13 +1,24 @@
-import pandas as pd
+from __future__ import annotations
+
+import argparse
+import hashlib
 import sqlite3
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import instrumentacao
+import saida
+from instrumentacao import medir
 
 # Caminhos
 BASE_DIR = Path(__file__).resolve().parents[1]
 DB_PATH = BASE_DIR / "database" / "tiny_data.db"
 DATA_DIR = BASE_DIR / "processados"
 
-# Arquivos CSV
+# Arquivos de origem (tiny_merged pode estar em CSV ou Parquet, ver saida.py)
 csv_files = {
     "vendas": DATA_DIR / "vendas.csv",
     "produtos": DATA_DIR / "produtos.csv",
@@ -15,18 +26,242 @@ csv_files = {
     "tiny_merged": DATA_DIR / "tiny_merged.csv"
 }
 
-# Conectar ao SQLite
-conn = sqlite3.connect(DB_PATH)
-print(f"[DB] Conectado a {DB_PATH}")
+BATCH_SIZE = 50_000  # linhas por executemany
+
+
+# ---------- Esquema ----------
+# (coluna, tipo SQLite). Tudo que é código/documento é TEXT para não perder
+# zeros à esquerda (CEP, CPF) nem estourar INTEGER (chave de 44 dígitos).
+COLS_VENDAS = [
+    ("id_nota", "TEXT"), ("modelo", "TEXT"), ("serie", "TEXT"), ("numero_nota", "TEXT"),
+    ("data_emissao", "TEXT"), ("cnpj_emitente", "TEXT"), ("nome_emitente", "TEXT"),
+    ("cpf_cliente", "TEXT"), ("cnpj_cliente", "TEXT"), ("valor_total", "REAL"),
+    ("valor_produtos", "REAL"), ("valor_frete", "REAL"), ("valor_icms", "REAL"),
+    ("valor_ipi", "REAL"), ("valor_desconto", "REAL"), ("forma_pgto", "TEXT"),
+]
+COLS_CLIENTES = [
+    ("id_nota", "TEXT"), ("nome_cliente", "TEXT"), ("cpf_cnpj", "TEXT"), ("endereco", "TEXT"),
+    ("numero", "TEXT"), ("bairro", "TEXT"), ("cidade", "TEXT"), ("uf", "TEXT"), ("cep", "TEXT"),
+]
+COLS_PRODUTOS = [
+    ("id_nota", "TEXT"), ("n_item", "INTEGER"), ("codigo_produto", "TEXT"), ("nome_produto", "TEXT"),
+    ("ncm", "TEXT"), ("cfop", "TEXT"), ("quantidade", "REAL"), ("valor_unitario", "REAL"),
+    ("valor_total_item", "REAL"), ("cst_icms", "TEXT"), ("aliquota_icms", "REAL"),
+]
+COLS_TINY_MERGED = COLS_PRODUTOS + COLS_VENDAS[1:] + COLS_CLIENTES[1:]
+
+# tabela -> (colunas, chave primária, colunas indexadas)
+SCHEMA: Dict[str, Tuple[List[Tuple[str, str]], List[str], List[str]]] = {
+    "vendas": (COLS_VENDAS, ["id_nota"], ["data_emissao"]),
+    "clientes": (COLS_CLIENTES, ["id_nota"], ["cpf_cnpj", "uf"]),
+    "produtos": (COLS_PRODUTOS, ["id_nota", "n_item"], ["codigo_produto"]),
+    "tiny_merged": (COLS_TINY_MERGED, ["id_nota", "n_item"], ["data_emissao", "codigo_produto", "cpf_cnpj"]),
+}
+
+
+def create_sql(nome: str) -> List[str]:
+    cols, pk, indexes = SCHEMA[nome]
+    defs = ",\n    ".join(f"{c} {t}" for c, t in cols)
+    stmts = [f"CREATE TABLE IF NOT EXISTS {nome} (\n    {defs},\n    PRIMARY KEY ({', '.join(pk)})\n)"]
+    for col in indexes:
+        stmts.append(f"CREATE INDEX IF NOT EXISTS idx_{nome}_{col} ON {nome} ({col})")
+    return stmts
+
+
+def upsert_sql(nome: str) -> str:
+    cols, pk, _ = SCHEMA[nome]
+    names = [c for c, _ in cols]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in names if c not in pk)
+    return (
+        f"INSERT INTO {nome} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+        f"ON CONFLICT ({', '.join(pk)}) DO UPDATE SET {updates}"
+    )
+
+
+def ensure_schema(conn: sqlite3.Connection, nome: str) -> None:
+    """
+    Cria a tabela com o esquema declarado. Tabelas antigas (criadas pelo
+    to_sql, sem chave primária) ou com colunas diferentes são recriadas.
+    """
+    cols, pk, _ = SCHEMA[nome]
+    info = conn.execute(f"PRAGMA table_info({nome})").fetchall()
+    if info:
+        atuais = [r[1] for r in info]
+        pk_atual = [r[1] for r in sorted(info, key=lambda r: r[5]) if r[5]]
+        if atuais != [c for c, _ in cols] or pk_atual != pk:
+            print(f"[DB] Tabela '{nome}' com esquema antigo; recriando.")
+            conn.execute(f"DROP TABLE {nome}")
+            conn.execute("DELETE FROM _carga WHERE tabela = ?", (nome,))
+    for stmt in create_sql(nome):
+        conn.execute(stmt)
+
+
+# ---------- Controle de carga ----------
+def file_signature(path: Path) -> Tuple[int, int, str]:
+    """(tamanho, mtime_ns, sha1) do arquivo ou, para datasets Parquet, da pasta."""
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    h = hashlib.sha1()
+    size = mtime = 0
+    for fp in files:
+        st = fp.stat()
+        size += st.st_size
+        mtime = max(mtime, st.st_mtime_ns)
+        h.update(str(fp.relative_to(path) if path.is_dir() else fp.name).encode())
+        with open(fp, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return size, mtime, h.hexdigest()
+
+
+def unchanged(conn: sqlite3.Connection, nome: str, path: Path) -> Tuple[bool, Optional[Tuple[int, int, str]]]:
+    """
+    Compara a origem com a última carga: tamanho+mtime iguais bastam; se
+    só o mtime mudou (arquivo regravado), decide pelo sha1.
+    """
+    row = conn.execute("SELECT arquivo, tamanho, mtime_ns, sha1 FROM _carga WHERE tabela = ?", (nome,)).fetchone()
+    if row is not None and row[0] == str(path) and not path.is_dir():
+        st = path.stat()
+        if (row[1], row[2]) == (st.st_size, st.st_mtime_ns):
+            return True, None
+    sig = file_signature(path)
+    return (row is not None and row[3] == sig[2]), sig
 
-# Importar cada CSV como tabela
-for nome, caminho in csv_files.items():
-    if caminho.exists():
-        df = pd.read_csv(caminho)
-        df.to_sql(nome, conn, if_exists="replace", index=False)
-        print(f"[DB] Tabela '{nome}' importada ({len(df)} registros).")
+
+# ---------- Leitura ----------
+def read_source(nome: str, path: Path) -> pd.DataFrame:
+    """
+    Lê a origem com os tipos do esquema (TEXT como string, REAL numérico) e
+    acrescenta n_item (posição do item dentro da nota) nas tabelas de itens.
+    """
+    cols, _, _ = SCHEMA[nome]
+    text_cols = [c for c, t in cols if t == "TEXT"]
+    if path.suffix == ".parquet":
+        # tiny_merged em Parquet (FORMATO_SAIDA=parquet): tipos vêm do dataset
+        df = saida.ler_tabela(path)
     else:
-        print(f"[AVISO] Arquivo não encontrado: {caminho}")
+        df = pd.read_csv(path, dtype={c: str for c in text_cols}, encoding="utf-8")
+
+    if "n_item" in [c for c, _ in cols]:
+        df["n_item"] = df.groupby("id_nota", sort=False).cumcount() + 1
+    if nome == "clientes":
+        df = df.drop_duplicates(subset=["id_nota"], keep="last")
+
+    for c, t in cols:
+        if c not in df.columns:
+            df[c] = None
+        elif t == "REAL":
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        elif t == "TEXT" and pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = df[c].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df[[c for c, _ in cols]]
+
+
+def rows(df: pd.DataFrame):
+    """Tuplas prontas para o sqlite3 (NaN/NA -> None)."""
+    obj = df.astype(object)
+    return obj.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+# ---------- Carga ----------
+def tune_for_bulk(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # ~256 MB
+    conn.execute("PRAGMA mmap_size = 268435456")
+
+
+def restore_after_bulk(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA optimize")
+
+
+@medir("load_table")
+def load_table(conn: sqlite3.Connection, nome: str, path: Path, force: bool = False) -> Optional[int]:
+    """
+    Upsert da tabela inteira numa única transação; notas que não estão mais
+    na origem são apagadas (force: a tabela é esvaziada antes). Retorna o nº
+    de linhas gravadas ou None se a origem não mudou desde a última carga.
+    """
+    ensure_schema(conn, nome)
+    same, sig = unchanged(conn, nome, path)
+    if same and not force:
+        if sig is not None:  # mesmo conteúdo, só o mtime mudou
+            with conn:
+                conn.execute("UPDATE _carga SET tamanho = ?, mtime_ns = ? WHERE tabela = ?", (sig[0], sig[1], nome))
+        return None
+    sig = sig or file_signature(path)
+
+    df = read_source(nome, path)
+    sql = upsert_sql(nome)
+    with conn:  # BEGIN ... COMMIT (ou ROLLBACK em caso de erro)
+        if force:
+            conn.execute(f"DELETE FROM {nome}")
+        else:
+            # notas que saíram da origem (e linhas sem id_nota, que o upsert não casa)
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _ids_origem (id_nota TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM _ids_origem")
+            conn.executemany("INSERT OR IGNORE INTO _ids_origem VALUES (?)",
+                             ((i,) for i in df["id_nota"].dropna().astype(str).unique()))
+            conn.execute(f"DELETE FROM {nome} WHERE id_nota IS NULL "
+                         "OR id_nota NOT IN (SELECT id_nota FROM _ids_origem)")
+        data = rows(df)
+        while True:
+            batch = [r for _, r in zip(range(BATCH_SIZE), data)]
+            if not batch:
+                break
+            conn.executemany(sql, batch)
+        if "n_item" in df.columns:
+            # itens que sumiram de uma nota reprocessada
+            qtd = df.groupby("id_nota", sort=False)["n_item"].max()
+            conn.executemany(
+                f"DELETE FROM {nome} WHERE id_nota = ? AND n_item > ?",
+                list(zip(qtd.index, qtd.astype(int).tolist())),
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO _carga VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (nome, str(path), sig[0], sig[1], sig[2], len(df), time.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+    return len(df)
+
+
+def main(force: bool = False):
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    # Conectar ao SQLite
+    conn = sqlite3.connect(DB_PATH)
+    print(f"[DB] Conectado a {DB_PATH}")
+    tune_for_bulk(conn)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS _carga (
+            tabela TEXT PRIMARY KEY, arquivo TEXT, tamanho INTEGER,
+            mtime_ns INTEGER, sha1 TEXT, linhas INTEGER, carregado_em TEXT
+        )
+    """)
+
+    # Importar cada origem na sua tabela
+    for nome, caminho in csv_files.items():
+        if nome == "tiny_merged" and not caminho.exists() and saida.existe(caminho, "parquet"):
+            caminho = saida.caminho(caminho, "parquet")
+        if not caminho.exists():
+            print(f"[AVISO] Arquivo não encontrado: {caminho}")
+            continue
+        inicio = time.perf_counter()
+        n = load_table(conn, nome, caminho, force)
+        if n is None:
+            print(f"[DB] Tabela '{nome}' sem alterações desde a última carga.")
+        else:
+            print(f"[DB] Tabela '{nome}' importada ({n} registros, {time.perf_counter() - inicio:.1f}s).")
+
+    restore_after_bulk(conn)
+    conn.close()
+    print("[DB] Banco atualizado com sucesso!")
+
 
-conn.close()
-print("[DB] Banco atualizado com sucesso!")
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Carrega as tabelas do Tiny no SQLite (tiny_data.db).")
+    ap.add_argument("--forcar", action="store_true",
+                    help="recarrega mesmo que os arquivos não tenham mudado")
+    args = ap.parse_args()
+    instrumentacao.iniciar("update_database")
+    main(force=args.forcar)
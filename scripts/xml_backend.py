@@ -0,0 +1,167 @@
+"""
+Camada comum de leitura de XML (NF-e) para os scripts do projeto.
+
+Usa lxml quando estiver instalado e cai para xml.etree.ElementTree caso
+contrário. As buscas são escritas no formato do ElementPath com wildcard de
+namespace ('.//{*}ide/{*}nNF'); no lxml cada caminho é convertido uma única
+vez (por namespace) para uma expressão XPath compilada, avaliada em C.
+
+Para forçar um backend: variável de ambiente XML_BACKEND=stdlib|lxml ou
+use_backend("stdlib").
+"""
+from __future__ import annotations
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    from lxml import etree as LET
+except ImportError:  # lxml é opcional
+    LET = None
+
+PathLike = Union[str, Path]
+
+AVAILABLE = ["stdlib"] + (["lxml"] if LET is not None else [])
+BACKEND = "lxml" if LET is not None else "stdlib"
+
+# Campos da NF-e usados pelos scripts (caminhos relativos ao elemento indicado)
+NFE = {
+    "infNFe": ".//{*}infNFe",
+    "nNF": ".//{*}ide/{*}nNF",
+    "dhEmi": ".//{*}ide/{*}dhEmi",
+    "dEmi": ".//{*}ide/{*}dEmi",
+    "cnpj_emit": ".//{*}emit/{*}CNPJ",
+    "det": ".//{*}det",
+    # relativos a <det>
+    "prod": "{*}prod",
+    # relativos a <prod>
+    "cProd": "{*}cProd",
+    "xProd": "{*}xProd",
+    "qCom": "{*}qCom",
+    "vUnCom": "{*}vUnCom",
+    "vProd": "{*}vProd",
+}
+
+
+def use_backend(name: Optional[str]) -> str:
+    """
+    Escolhe o backend ('lxml' ou 'stdlib'). None mantém o padrão.
+    """
+    global BACKEND
+    if name:
+        if name not in AVAILABLE:
+            raise ValueError(f"Backend XML indisponível: {name} (disponíveis: {AVAILABLE})")
+        BACKEND = name
+    return BACKEND
+
+
+use_backend(os.environ.get("XML_BACKEND"))
+
+
+@lru_cache(maxsize=None)
+def _lxml_parser():
+    return LET.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+
+_WILDCARD = re.compile(r"\{\*\}([\w.-]+)")
+
+
+@lru_cache(maxsize=None)
+def compile_path(path: str, ns: Optional[str] = ""):
+    """
+    Converte um caminho ElementPath com '{*}' em XPath compilado (lxml).
+    Com ns (namespace do documento) vira './/n:ide/n:nNF', que o libxml2
+    resolve muito mais rápido; ns=None gera a forma genérica por
+    local-name(), equivalente ao '{*}' (qualquer namespace).
+    """
+    if ns is None:
+        xpath = _WILDCARD.sub(r"*[local-name()='\1']", path)
+    elif ns:
+        xpath = _WILDCARD.sub(r"n:\1", path)
+    else:
+        xpath = _WILDCARD.sub(r"\1", path)
+    if not xpath.startswith("."):
+        xpath = "./" + xpath
+    return LET.XPath(xpath, namespaces={"n": ns} if ns else None)
+
+
+def _lxml_findall(elem: Any, path: str) -> List[Any]:
+    # tenta primeiro no namespace do próprio elemento (caso normal da NF-e,
+    # tudo no namespace do portal fiscal); se nada for encontrado, repete com
+    # a forma genérica para manter a semântica do '{*}'
+    tag = elem.tag
+    ns = tag[1:tag.index("}")] if tag[:1] == "{" else ""
+    found = compile_path(path, ns)(elem)
+    if not found:
+        found = compile_path(path, None)(elem)
+    return found
+
+
+# ---------- Leitura ----------
+def parse(path: PathLike) -> Any:
+    """Lê o arquivo inteiro e devolve o elemento raiz."""
+    if BACKEND == "lxml":
+        return LET.parse(str(path), _lxml_parser()).getroot()
+    return ET.parse(path).getroot()
+
+
+def iterparse(path: PathLike, events: Sequence[str] = ("end",), tag: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    iterparse do backend ativo (apenas eventos de elementos). tag (só lxml,
+    aceita '{*}det'): eventos apenas dessas tags, filtrados em C.
+    """
+    if BACKEND == "lxml":
+        return LET.iterparse(str(path), events=tuple(events), tag=tag, resolve_entities=False,
+                             no_network=True, huge_tree=True)
+    if tag is not None:
+        raise ValueError("iterparse com tag só no backend lxml")
+    return ET.iterparse(path, events=events)
+
+
+def pull_parser(events: Sequence[str] = ("end",)) -> Any:
+    """XMLPullParser do backend ativo: feed(bytes) e read_events(), sem ler o arquivo todo."""
+    if BACKEND == "lxml":
+        return LET.XMLPullParser(events=tuple(events), resolve_entities=False, no_network=True, huge_tree=True)
+    return ET.XMLPullParser(events=events)
+
+
+def local_name(tag: str) -> str:
+    return tag[tag.rfind("}") + 1:]
+
+
+# ---------- Buscas ----------
+def findall(elem: Any, path: str) -> List[Any]:
+    if elem is None:
+        return []
+    if BACKEND == "lxml":
+        return _lxml_findall(elem, path)
+    return elem.findall(path)
+
+
+def find(elem: Any, path: str) -> Optional[Any]:
+    if elem is None:
+        return None
+    if BACKEND == "lxml":
+        found = _lxml_findall(elem, path)
+        return found[0] if found else None
+    return elem.find(path)
+
+
+def findtext(elem: Any, path: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Mesma semântica do findtext do ElementTree: texto do primeiro elemento
+    encontrado ('' se ele não tiver texto) ou default se não houver nenhum.
+    """
+    found = find(elem, path)
+    if found is None:
+        return default
+    return found.text if found.text is not None else ""
+
+
+def campo(elem: Any, nome: str, default: Optional[str] = None) -> Optional[str]:
+    """findtext de um campo nomeado da NF-e (ver NFE)."""
+    return findtext(elem, NFE[nome], default)
@@ -1,6 +1,10 @@
 import os
 import shutil
-import xml.etree.ElementTree as ET
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import indice_nfe  # noqa: E402
 
 # === CONFIGURAÇÕES ===
 pasta_origem = r'C:\Users\new big\Desktop\projeto_ecommerce_dados\tiktok'
@@ -10,10 +14,7 @@ arquivo_nfes = r'C:\Users\new big\Desktop\projeto_ecommerce_dados\scripts_comple
 dry_run = False  # coloque False quando quiser mover de verdade
 
 # === FUNÇÃO PARA NORMALIZAR NÚMEROS ===
-def normalizar_numero(n):
-    if not n:
-        return ""
-    return n.strip().lstrip("0") or "0"
+normalizar_numero = indice_nfe.normalizar_numero
 
 # === LER TXT ===
 with open(arquivo_nfes, 'r', encoding='utf-8') as f:
@@ -26,29 +27,21 @@ print(f"Exemplo: {list(nfes_alvo_set)[:10]}")
 # === GARANTIR PASTA DESTINO ===
 os.makedirs(pasta_destino, exist_ok=True)
 
-# === FUNÇÃO PARA PEGAR nNF COM NAMESPACE ===
-def extrair_numero_nfe(caminho_xml):
-    try:
-        tree = ET.parse(caminho_xml)
-        root = tree.getroot()
-        ns = {'nfe': root.tag.split('}')[0].strip('{')}
-        tag = root.find('.//nfe:nNF', ns)
-        if tag is not None and tag.text:
-            return normalizar_numero(tag.text)
-    except Exception:
-        return None
-    return None
+# === ÍNDICE DA PASTA (nNF de cada XML; só arquivos novos/alterados são lidos) ===
+contagem = indice_nfe.atualizar(pasta_origem)
+print(f"📇 Índice: {contagem['arquivos']} XMLs, {contagem['lidos']} lidos agora")
+origem = Path(pasta_origem).resolve()
 
 # === LOOP PRINCIPAL ===
 movidos = 0
 checados = 0
 
-for arquivo in os.listdir(pasta_origem):
-    if not arquivo.lower().endswith('.xml'):
+for registro in indice_nfe.consultar(pasta_origem, atualizar_antes=False):
+    caminho_xml = Path(registro["caminho"])
+    if caminho_xml.parent != origem:  # como antes, só os arquivos direto na pasta
         continue
-
-    caminho_xml = os.path.join(pasta_origem, arquivo)
-    numero_nfe = extrair_numero_nfe(caminho_xml)
+    arquivo = caminho_xml.name
+    numero_nfe = registro["nnf"]
     checados += 1
 
     if not numero_nfe:
@@ -58,7 +51,9 @@ for arquivo in os.listdir(pasta_origem):
     if numero_nfe in nfes_alvo_set:
         print(f"✔ Match exato: {arquivo} — NFe {numero_nfe} {'(simulado)' if dry_run else '(movida)'}")
         if not dry_run:
-            shutil.move(caminho_xml, os.path.join(pasta_destino, arquivo))
+            destino_xml = os.path.join(pasta_destino, arquivo)
+            shutil.move(caminho_xml, destino_xml)
+            indice_nfe.registrar_movido(caminho_xml, destino_xml, pasta_destino)
         movidos += 1
     else:
         print(f"→ Sem match: {arquivo} — NFe {numero_nfe}")
@@ -1,6 +1,12 @@
-import pandas as pd
 import os
 import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import dialeto_csv  # noqa: E402
+import dim_sku  # noqa: E402
+from cache_excel import ler_excel  # noqa: E402
 
 arquivo_banco = r"C:\Users\new big\Desktop\projeto_ecommerce_dados\scripts_complementar\banco_de_dados_produtos.csv"
 arquivo_destino = r"C:\Users\new big\Desktop\projeto_ecommerce_dados\dados\csv_marketplaces\mercadolivre_agrupado.csv"
@@ -20,24 +26,15 @@ def ler_arquivo_flexivel(caminho):
     ext = os.path.splitext(caminho)[1].lower()
 
     if ext == ".csv":
-        try:
-            df = pd.read_csv(caminho, sep=";", dtype=str)
-            if len(df.columns) == 1:  # caso tenha lido tudo numa coluna só
-                df = pd.read_csv(caminho, sep=",", dtype=str)
-        except:
-            df = pd.read_csv(caminho, sep=",", dtype=str)
-        return df
+        return dialeto_csv.ler_csv(caminho, dtype=str)
 
     elif ext in [".xls", ".xlsx"]:
         try:
-            df = pd.read_excel(caminho, dtype=str)
+            df = ler_excel(caminho, dtype=str)
             # se tiver só uma coluna e ela parecer um CSV, relê como CSV
-            if len(df.columns) == 1 and ',' in str(df.columns[0]):
-                print("Arquivo XLSX contém estrutura de CSV — relendo como CSV com vírgula.")
-                df = pd.read_csv(caminho, sep=",", dtype=str)
-            elif len(df.columns) == 1 and ';' in str(df.columns[0]):
-                print("Arquivo XLSX contém estrutura de CSV — relendo como CSV com ponto e vírgula.")
-                df = pd.read_csv(caminho, sep=";", dtype=str)
+            if len(df.columns) == 1 and (',' in str(df.columns[0]) or ';' in str(df.columns[0])):
+                print("Arquivo XLSX contém estrutura de CSV — relendo como CSV.")
+                df = dialeto_csv.ler_csv(caminho, dtype=str)
             return df
         except Exception as e:
             raise ValueError(f"Erro ao ler {caminho}: {e}")
@@ -73,8 +70,10 @@ if "sku" not in destino.columns or "produto" not in destino.columns:
     raise KeyError(f"Colunas esperadas no destino: 'produto' e 'sku'. Encontradas: {destino.columns.tolist()}")
 
 print("Mesclando informações...")
-mapa_sku = dict(zip(banco["sku"], banco["descricao"]))
-destino["produto"] = destino["sku"].apply(lambda s: mapa_sku.get(s, "REVISAR"))
+# descrições pela dimensão de SKUs: casa também as grafias alternativas (1234.0, ABC*)
+dim_sku.registrar_descricoes(banco["sku"], banco["descricao"])
+destino["produto"] = dim_sku.descricoes(destino["sku"]).fillna("REVISAR")
+dim_sku.salvar()
 
 print("Salvando alterações...")
 salvar_arquivo(destino, arquivo_destino)
@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from datas import normalizar_datas  # noqa: E402
+
+
+def test_indice_repetido():
+    serie = pd.Series(["01/02/2024", None, "2024-03-05 10:00:00"], index=[0, 0, 1], dtype=object)
+    out = normalizar_datas(serie)
+    assert out.tolist() == ["01/02/2024", None, "05/03/2024"]
+    assert out.index.tolist() == [0, 0, 1]
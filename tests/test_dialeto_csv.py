@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import dialeto_csv  # noqa: E402
+
+
+def _csv_latin1_depois_da_amostra(caminho: Path) -> None:
+    # amostra inteira em ASCII (decodifica como utf-8); 'ç' em latin-1 só no fim
+    linhas = ["sku;produto;vendas"] + [f"{i};produto {i};{i % 7}" for i in range(8000)]
+    linhas.append("9999;ação;3")
+    caminho.write_bytes(("\n".join(linhas) + "\n").encode("latin-1"))
+    assert caminho.stat().st_size > dialeto_csv.AMOSTRA_BYTES
+
+
+def test_blocos_com_latin1_depois_da_amostra(tmp_path, monkeypatch):
+    monkeypatch.setattr(dialeto_csv, "CACHE_JSON", tmp_path / "dialetos_csv.json")
+    monkeypatch.setattr(dialeto_csv, "_CACHE", {})
+    arq = tmp_path / "vendas.csv"
+    _csv_latin1_depois_da_amostra(arq)
+    assert dialeto_csv.detectar(arq)["encoding"] == "utf-8"
+
+    with dialeto_csv.ler_csv(arq, dtype=str, chunksize=1000) as leitor:
+        df = pd.concat(leitor, ignore_index=True)
+
+    assert len(df) == 8001
+    assert df["produto"].iloc[-1] == "ação"
+    assert dialeto_csv.detectar(arq)["encoding"] == "latin-1"
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from numeros import para_numero  # noqa: E402
+
+
+def test_indice_repetido():
+    serie = pd.Series(["1,5", "2"], index=[0, 0])
+    out = para_numero(serie)
+    assert out.tolist() == [1.5, 2.0]
+    assert out.index.tolist() == [0, 0]
+
+
+def test_indice_repetido_misto():
+    # como sai de um pd.concat sem ignore_index: texto e números do Excel juntos
+    serie = pd.Series(["1.234,56", 7, None, 2.5, "R$ 10,00", "x"], index=[1, 1, 2, 2, 3, 3], dtype=object)
+    out = para_numero(serie, padrao=0.0)
+    np.testing.assert_array_equal(out.to_numpy(), [1234.56, 7.0, 0.0, 2.5, 10.0, 0.0])
+    assert out.index.tolist() == [1, 1, 2, 2, 3, 3]